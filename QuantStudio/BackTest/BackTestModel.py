@@ -8,7 +8,7 @@ import webbrowser
 import numpy as np
 import pandas as pd
 from progressbar import ProgressBar
-from traits.api import List, Instance, Str
+from traits.api import List, Instance, Str, Float
 from traitsui.api import View, Item, Group
 from traitsui.menu import OKButton, CancelButton
 from lxml import etree
@@ -16,7 +16,7 @@ from lxml import etree
 from QuantStudio import __QS_Error__, __QS_Object__, __QS_MainPath__
 from QuantStudio.FactorDataBase.FactorDB import FactorDB
 from QuantStudio.Tools.AuxiliaryFun import startMultiProcess
-from QuantStudio.Tools.QSObjects import QSPipe
+from QuantStudio.Tools.QSObjects import QSPipe, QSCacheBudget
 
 class BaseModule(__QS_Object__):
     """回测模块"""
@@ -66,7 +66,8 @@ def _runModel(args):
     for j in args["module_inds"]:
         jDBs = args["mdl"].Modules[j].__QS_start__(mdl=args["mdl"], dts=args["mdl"]._QS_TestDateTimes)
         if jDBs is not None: FactorDBs.update(set(jDBs))
-    for jDB in FactorDBs: jDB.start(dts=args["mdl"]._QS_TestDateTimes)
+    CacheBudget = QSCacheBudget(args["mdl"].CacheBudget)# 每个进程内的遍历缓冲共享内存预算
+    for jDB in FactorDBs: jDB.start(dts=args["mdl"]._QS_TestDateTimes, cache_budget=CacheBudget)
     Sub2MainQueue.put(0)
     for i, iDT in enumerate(args["mdl"]._QS_TestDateTimes):
         args["mdl"]._TestDateTimeIndex = i
@@ -87,6 +88,7 @@ def _runModel(args):
 class BackTestModel(__QS_Object__):
     """回测模型"""
     Modules = List(BaseModule)# 已经添加的测试模块, [测试模块对象]
+    CacheBudget = Float(0, arg_type="Double", label="缓冲内存预算", order=0)# 以 MB 为单位, 所有因子表和风险表的遍历缓冲数据共享, 小于等于 0 表示不限制
     def __init__(self, sys_args={}, config_file=None, **kwargs):
         self._QS_TestDateTimes = []# 测试时间点序列, [datetime.datetime]
         self._TestDateTimeIndex = -1# 测试时间点索引
@@ -128,7 +130,8 @@ class BackTestModel(__QS_Object__):
         for jModule in self.Modules:
             jDBs = jModule.__QS_start__(mdl=self, dts=self._QS_TestDateTimes)
             if jDBs is not None: FactorDBs.update(set(jDBs))
-        for jDB in FactorDBs: jDB.start(dts=self._QS_TestDateTimes)
+        CacheBudget = QSCacheBudget(self.CacheBudget)# 所有因子表和风险表的遍历缓冲共享内存预算
+        for jDB in FactorDBs: jDB.start(dts=self._QS_TestDateTimes, cache_budget=CacheBudget)
         print(("耗时 : %.2f" % (time.perf_counter()-TotalStartT, )), "2. 循环计算", sep="\n", end="\n")
         StartT = time.perf_counter()
         with ProgressBar(max_value=len(self._QS_TestDateTimes)) as ProgBar:
@@ -12,13 +12,15 @@ import matplotlib.pyplot as plt
 import matplotlib.gridspec as gridspec
 from matplotlib.ticker import FuncFormatter
 
-from QuantStudio import __QS_Error__
+from QuantStudio import __QS_Error__, __QS_initMatplotlib__
 from QuantStudio.BackTest.BackTestModel import BaseModule
 from QuantStudio.Tools.AuxiliaryFun import getFactorList, searchNameInStrList
 from QuantStudio.Tools.DataTypeConversionFun import DummyVarTo01Var
 from QuantStudio.BackTest.SectionFactor.IC import _QS_formatMatplotlibPercentage, _QS_formatPandasPercentage
 from QuantStudio.BackTest.SectionFactor.Portfolio import _QS_plotStatistics
 
+__QS_initMatplotlib__()
+
 # 前提条件:
 # 1. 投资组合的权重之和为 1, 与 1 的差值部分归为现金
 # 2. 两个计算时点之间没有调整策略持仓
@@ -12,7 +12,7 @@ import matplotlib.pyplot as plt
 import matplotlib.gridspec as gridspec
 from matplotlib.ticker import FuncFormatter
 
-from QuantStudio import __QS_Error__
+from QuantStudio import __QS_Error__, __QS_initMatplotlib__
 from QuantStudio.BackTest.BackTestModel import BaseModule
 from QuantStudio.RiskDataBase.RiskDB import RiskTable
 from QuantStudio.RiskModel.RiskModelFun import dropRiskMatrixNA
@@ -21,6 +21,8 @@ from QuantStudio.Tools.DataTypeConversionFun import DummyVarTo01Var
 from QuantStudio.BackTest.SectionFactor.IC import _QS_formatMatplotlibPercentage, _QS_formatPandasPercentage
 from QuantStudio.BackTest.SectionFactor.Portfolio import _QS_plotStatistics
 
+__QS_initMatplotlib__()
+
 class FMPModel(BaseModule):
     """基于特征因子模拟组合的绩效分析模型"""
     #Portfolio = Enum(None, arg_type="SingleOption", label="策略组合", order=0)
@@ -12,12 +12,14 @@ import matplotlib.pyplot as plt
 import matplotlib.gridspec as gridspec
 from matplotlib.ticker import FuncFormatter
 
-from QuantStudio import __QS_Error__
+from QuantStudio import __QS_Error__, __QS_initMatplotlib__
 from QuantStudio.BackTest.BackTestModel import BaseModule
 from QuantStudio.BackTest.TimeSeriesFactor.Correlation import _calcReturn
 from QuantStudio.Tools.AuxiliaryFun import getFactorList
 from QuantStudio.Tools.MathFun import regressByCVX
 
+__QS_initMatplotlib__()
+
 
 class ReturnBasedStyleModel(BaseModule):
     """基于收益率回归的风格分析模型"""
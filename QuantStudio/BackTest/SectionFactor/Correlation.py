@@ -14,13 +14,15 @@ from matplotlib.ticker import FuncFormatter
 import matplotlib.dates as mdate
 import matplotlib
 
-from QuantStudio import __QS_Error__
+from QuantStudio import __QS_Error__, __QS_initMatplotlib__
 from QuantStudio.Tools.AuxiliaryFun import getFactorList
 from QuantStudio.RiskDataBase.RiskDB import RiskTable
 from QuantStudio.BackTest.BackTestModel import BaseModule
 from QuantStudio.RiskModel.RiskModelFun import dropRiskMatrixNA
 from QuantStudio.BackTest.SectionFactor.IC import _QS_formatMatplotlibPercentage, _QS_formatPandasPercentage
 
+__QS_initMatplotlib__()
+
 class SectionCorrelation(BaseModule):
     """因子截面相关性"""
     TestFactors = ListStr(arg_type="MultiOption", label="测试因子", order=0, option_range=())
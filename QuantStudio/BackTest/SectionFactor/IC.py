@@ -12,11 +12,13 @@ import matplotlib.pyplot as plt
 import matplotlib.gridspec as gridspec
 from matplotlib.ticker import FuncFormatter
 
-from QuantStudio import __QS_Error__
+from QuantStudio import __QS_Error__, __QS_initMatplotlib__
 from QuantStudio.Tools.AuxiliaryFun import getFactorList, searchNameInStrList
 from QuantStudio.Tools.DataPreprocessingFun import prepareRegressData
 from QuantStudio.BackTest.BackTestModel import BaseModule
 
+__QS_initMatplotlib__()
+
 def _QS_formatMatplotlibPercentage(x, pos):
     return '%.2f%%' % (x*100, )
 def _QS_formatPandasPercentage(x):
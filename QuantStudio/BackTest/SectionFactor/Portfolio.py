@@ -12,7 +12,7 @@ import matplotlib.gridspec as gridspec
 from matplotlib.ticker import FuncFormatter
 import matplotlib.dates as mdate
 
-from QuantStudio import __QS_Error__
+from QuantStudio import __QS_Error__, __QS_initMatplotlib__
 from QuantStudio.Tools.AuxiliaryFun import getFactorList, searchNameInStrList, distributeEqual
 from QuantStudio.Tools.DataPreprocessingFun import prepareRegressData
 from QuantStudio.Tools.StrategyTestFun import calcPortfolioReturn, calcTurnover, calcMaxDrawdownRate
@@ -20,6 +20,8 @@ from QuantStudio.BackTest.BackTestModel import BaseModule
 from QuantStudio.PortfolioConstructor import BasePC
 from QuantStudio.BackTest.SectionFactor.IC import _QS_formatMatplotlibPercentage, _QS_formatPandasPercentage
 
+__QS_initMatplotlib__()
+
 def _QS_plotStatistics(axes, x_data, x_ticklabels, left_data, left_formatter, right_data=None, right_formatter=None, right_axes=True):
     axes.yaxis.set_major_formatter(left_formatter)
     axes.bar(x_data, left_data.values, label=left_data.name, color="b")
@@ -13,12 +13,14 @@ import matplotlib.gridspec as gridspec
 from matplotlib.ticker import FuncFormatter
 import matplotlib.dates as mdate
 
-from QuantStudio import __QS_Error__
+from QuantStudio import __QS_Error__, __QS_initMatplotlib__
 from QuantStudio.Tools.AuxiliaryFun import getFactorList, searchNameInStrList
 from QuantStudio.Tools.DataTypeConversionFun import DummyVarTo01Var
 from QuantStudio.BackTest.BackTestModel import BaseModule
 from QuantStudio.BackTest.SectionFactor.IC import _QS_formatMatplotlibPercentage, _QS_formatPandasPercentage
 
+__QS_initMatplotlib__()
+
 class FamaMacBethRegression(BaseModule):
     """Fama-MacBeth 回归"""
     TestFactors = ListStr(arg_type="MultiOption", label="测试因子", order=0, option_range=())
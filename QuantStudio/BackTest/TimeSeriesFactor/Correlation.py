@@ -11,11 +11,13 @@ import matplotlib.pyplot as plt
 import matplotlib.gridspec as gridspec
 from matplotlib.ticker import FuncFormatter
 
-from QuantStudio import __QS_Error__
+from QuantStudio import __QS_Error__, __QS_initMatplotlib__
 from QuantStudio.Tools.AuxiliaryFun import getFactorList, searchNameInStrList
 from QuantStudio.Tools.DataPreprocessingFun import prepareRegressData
 from QuantStudio.BackTest.BackTestModel import BaseModule
 
+__QS_initMatplotlib__()
+
 def _calcReturn(price, return_type="简单收益率"):
     if return_type=="对数收益率":
         Return = np.log(1 + np.diff(price, axis=0) / np.abs(price[:-1]))
@@ -13,12 +13,14 @@ import matplotlib.pyplot as plt
 import matplotlib.gridspec as gridspec
 from matplotlib.ticker import FuncFormatter
 
-from QuantStudio import __QS_Error__
+from QuantStudio import __QS_Error__, __QS_initMatplotlib__
 from QuantStudio.Tools.AuxiliaryFun import getFactorList, searchNameInStrList
 from QuantStudio.Tools.MathFun import CartesianProduct
 from QuantStudio.BackTest.BackTestModel import BaseModule
 from .Correlation import _calcReturn
 
+__QS_initMatplotlib__()
+
 class QuantileDifference(BaseModule):
     """分位数法"""
     #TestFactor = Enum(None, arg_type="SingleOption", label="测试因子", order=0)
@@ -12,12 +12,14 @@ import matplotlib.pyplot as plt
 import matplotlib.gridspec as gridspec
 from matplotlib.ticker import FuncFormatter
 
-from QuantStudio import __QS_Error__
+from QuantStudio import __QS_Error__, __QS_initMatplotlib__
 from QuantStudio.Tools.AuxiliaryFun import getFactorList, searchNameInStrList
 from QuantStudio.Tools.MathFun import CartesianProduct
 from QuantStudio.BackTest.BackTestModel import BaseModule
 from .Correlation import _calcReturn
 
+__QS_initMatplotlib__()
+
 
 class OLS(BaseModule):
     """时间序列 OLS"""
@@ -13,11 +13,13 @@ import matplotlib.pyplot as plt
 import matplotlib.gridspec as gridspec
 from matplotlib.ticker import FuncFormatter
 
-from QuantStudio import __QS_Error__
+from QuantStudio import __QS_Error__, __QS_initMatplotlib__
 from QuantStudio.Tools.AuxiliaryFun import getFactorList, searchNameInStrList
 from QuantStudio.Tools.DataPreprocessingFun import prepareRegressData
 from QuantStudio.BackTest.BackTestModel import BaseModule
 
+__QS_initMatplotlib__()
+
 class Cointegration(BaseModule):
     """协整检验"""
     #PriceFactor = Enum(None, arg_type="SingleOption", label="价格因子", order=0)
@@ -1,28 +1,37 @@
 # coding=utf-8
+import sys
 import time
 import os
 import uuid
 import shutil
 import mmap
 import platform
-import pickle
 import gc
 import shelve
+import pickle
+import hashlib
+import inspect
+import dis
 import datetime as dt
 import tempfile
 from collections import OrderedDict
+import threading
+import queue
+from concurrent.futures import ThreadPoolExecutor
 from multiprocessing import Process, Queue, Lock, Event, cpu_count
+from multiprocessing.managers import BaseManager
 
 import numpy as np
 import pandas as pd
 from progressbar import ProgressBar
 from traits.api import Instance, Str, File, List, Int, Bool, Directory, Enum, ListStr
 
-from QuantStudio import __QS_Object__, __QS_Error__
+from QuantStudio import __QS_Object__, __QS_Error__, __version__
 from QuantStudio.Tools.IDFun import testIDFilterStr
 from QuantStudio.Tools.AuxiliaryFun import genAvailableName, startMultiProcess, partitionListMovingSampling
 from QuantStudio.Tools.FileFun import listDirDir, getShelveFileSuffix
 from QuantStudio.Tools.DataPreprocessingFun import fillNaByLookback
+from QuantStudio.Tools.QSObjects import QSCacheBudget
 
 
 # 因子库, 只读, 接口类
@@ -42,6 +51,15 @@ class FactorDB(__QS_Object__):
     # 检查数据库是否可用
     def isAvailable(self):
         return True
+    # 是否支持为线程创建独立的连接, 支持时多个线程可以并发读取该因子库的不同因子表
+    def isThreadConnectable(self):
+        return False
+    # 为当前线程创建独立的连接
+    def openThreadConnection(self):
+        return 0
+    # 关闭当前线程的独立连接
+    def closeThreadConnection(self):
+        return 0
     # -------------------------------表的操作---------------------------------
     # 表名, 返回: [表名]
     @property
@@ -50,6 +68,131 @@ class FactorDB(__QS_Object__):
     # 返回因子表对象
     def getTable(self, table_name, args={}):
         return None
+    # ------------------------------共享缓冲服务------------------------------
+    # 启动遍历模式的共享缓冲服务进程, 此后该因子库的因子表(包括回测子进程中的因子表)在遍历模式下通过服务进程读取缓冲数据, cache_size: 服务进程的缓存大小, 单位是 MB
+    # 服务进程以因子库的类和参数重新创建因子库对象, 读取的数据通过缓冲目录下的共享内存文件传回
+    def startCacheServer(self, cache_size=1024):
+        if getattr(self, "_CacheServer", None) is not None: return 0
+        Manager = _ErgodicCacheManager()
+        Manager.start()
+        CacheServer = Manager.ErgodicCacheService(type(self), self.Args, cache_size)
+        _CacheServerManagers[id(self)] = Manager
+        self._CacheServerDir = tempfile.mkdtemp(prefix="QSCacheServer")
+        self._CacheServer = CacheServer
+        return 0
+    # 关闭共享缓冲服务进程
+    def stopCacheServer(self):
+        self._CacheServer = None
+        Manager = _CacheServerManagers.pop(id(self), None)
+        if Manager is not None: Manager.shutdown()
+        CacheServerDir, self._CacheServerDir = getattr(self, "_CacheServerDir", None), None
+        if CacheServerDir: shutil.rmtree(CacheServerDir, ignore_errors=True)
+        return 0
+    # 共享缓冲服务的统计信息
+    def getCacheServerStatistics(self):
+        CacheServer = getattr(self, "_CacheServer", None)
+        if CacheServer is None: return None
+        return pd.Series(CacheServer.getStatistics())
+
+# 遍历模式的共享缓冲服务, 运行于独立的服务进程中, 同一因子库的多个因子表共享
+# 缓存以(因子表, 因子, ID 序列)为键, 每个缓存项保存已经读取的时点的数据, 窗口重叠的请求只读取缺失的时点
+# 同一因子表的请求串行处理, 使得并发的重叠请求能够复用数据, 不同因子表的请求并发处理
+class _ErgodicCacheService(object):
+    def __init__(self, fdb_class, fdb_args, cache_size):
+        self._FDBClass, self._FDBArgs = fdb_class, fdb_args
+        self._FactorDB = None# 服务进程中的因子库对象, 首次读取时创建
+        self._CacheSize = int(cache_size*2**20)# 缓存大小, 单位: 字节
+        self._Tables = {}# {(表名, 参数): 因子表对象}
+        self._CacheData = OrderedDict()# {(表名, 参数, 因子名, ID 序列): (DataFrame(index=[时点], columns=[ID]), 字节数)}, 按照最近访问的顺序排列
+        self._Usage = 0# 已用缓存大小, 单位: 字节
+        self._ReadNum, self._HitNum = 0, 0
+        self._Lock = threading.Lock()# 保护缓存的索引结构, 只在查找和更新缓存时持有, 读取数据时不持有
+        self._TableLocks = {}# {(表名, 参数): 锁}
+        self._DBLock = threading.Lock()# 因子库不支持线程独立连接时, 串行访问因子库
+    def _getTable(self, table_key, table_name, table_args):
+        with self._Lock:
+            if self._FactorDB is None:
+                self._FactorDB = self._FDBClass(sys_args=self._FDBArgs)
+                self._FactorDB.connect()
+            FT = self._Tables.get(table_key)
+            if FT is None: FT = self._Tables[table_key] = self._FactorDB.getTable(table_name, args=table_args)
+            return FT
+    def _calcData(self, table_key, table_name, table_args, factor_names, ids, dts):
+        FT = self._getTable(table_key, table_name, table_args)
+        if not self._FactorDB.isThreadConnectable():
+            with self._DBLock:
+                return FT.__QS_calcData__(raw_data=FT.__QS_prepareRawData__(factor_names=factor_names, ids=ids, dts=dts), factor_names=factor_names, ids=ids, dts=dts)
+        self._FactorDB.openThreadConnection()
+        try:
+            return FT.__QS_calcData__(raw_data=FT.__QS_prepareRawData__(factor_names=factor_names, ids=ids, dts=dts), factor_names=factor_names, ids=ids, dts=dts)
+        finally:
+            self._FactorDB.closeThreadConnection()
+    # 读取数据并写入客户端的共享内存文件 buffer_file, 返回数据头, 客户端以 _loadMMAPCacheData 映射出数据
+    def readData(self, table_name, table_args, factor_names, ids, dts, buffer_file):
+        TableKey = (table_name, repr(sorted(table_args.items())))
+        # 只起始日回溯的表, 窗口内的数据依赖于窗口起始日, 只补读缺失时点再拼接会得到错误的结果, 因而缓存项以整个窗口为键, 不复用重叠的窗口
+        WindowKey = ((tuple(dts),) if table_args.get("只起始日回溯", False) else ())
+        with self._Lock: TableLock = self._TableLocks.setdefault(TableKey, threading.Lock())
+        DTs, Data, MissingDTs = pd.Index(dts), {}, OrderedDict()# MissingDTs: {缺失的时点: [因子名]}
+        with TableLock:
+            with self._Lock:
+                for iFactorName in factor_names:
+                    iCacheData = self._CacheData.get(TableKey+(iFactorName, tuple(ids))+WindowKey)
+                    if iCacheData is None: iMissingDTs = dts
+                    else:
+                        self._CacheData.move_to_end(TableKey+(iFactorName, tuple(ids))+WindowKey)
+                        iMissingDTs = DTs[~DTs.isin(iCacheData[0].index)].tolist()
+                    if iMissingDTs: MissingDTs.setdefault(tuple(iMissingDTs), []).append(iFactorName)
+                    else: Data[iFactorName] = iCacheData[0].loc[DTs]
+                self._ReadNum += len(factor_names)
+                self._HitNum += len(Data)
+            for iMissingDTs, iFactorNames in MissingDTs.items():
+                iNewData = self._calcData(TableKey, table_name, table_args, iFactorNames, ids, list(iMissingDTs))
+                with self._Lock:
+                    for jFactorName in iFactorNames:
+                        jKey = TableKey+(jFactorName, tuple(ids))+WindowKey
+                        jCacheData = self._CacheData.pop(jKey, None)
+                        jData = iNewData[jFactorName]
+                        if jCacheData is not None:
+                            self._Usage -= jCacheData[1]
+                            jData = pd.concat([jCacheData[0], jData])
+                            jData = jData[~jData.index.duplicated(keep="last")].sort_index()
+                        Data[jFactorName] = jData.loc[DTs]
+                        if QSCacheBudget.getDataSize(jData)>self._CacheSize/2: jData = jData.loc[DTs[0]:]# 缓存项过大时只保留当前窗口开始之后的数据
+                        jSize = QSCacheBudget.getDataSize(jData)
+                        if jSize>self._CacheSize: continue
+                        self._CacheData[jKey] = (jData, jSize)
+                        self._Usage += jSize
+                    while self._Usage>self._CacheSize: self._Usage -= self._CacheData.popitem(last=False)[1][1]
+        return _writeCacheServerBuffer({iFactorName: Data[iFactorName] for iFactorName in factor_names}, buffer_file)
+    def getStatistics(self):
+        return {"读取次数": self._ReadNum, "命中次数": self._HitNum, "已用缓存(MB)": self._Usage/2**20}
+class _ErgodicCacheManager(BaseManager): pass
+_ErgodicCacheManager.register("ErgodicCacheService", _ErgodicCacheService)
+_CacheServerManagers = {}# 启动了共享缓冲服务的因子库, {id(因子库): _ErgodicCacheManager}
+# 服务进程将数据写入客户端的共享内存文件, 文件不够大时先扩展, 返回数据头
+def _writeCacheServerBuffer(cache_data, buffer_file):
+    Size = max(1, sum(iData.shape[0]*iData.shape[1] for iData in cache_data.values())) * np.dtype(np.float64).itemsize
+    with open(buffer_file, "r+b") as File:
+        if os.path.getsize(buffer_file)<Size: File.truncate(Size)
+        MMAPCache = mmap.mmap(File.fileno(), 0)
+    try:
+        return _dumpMMAPCacheData(cache_data, MMAPCache)
+    finally:
+        MMAPCache.close()
+# 客户端读取共享缓冲服务数据的共享内存文件, 每个进程的每个线程一个文件, {(缓冲目录, 进程 ID, 线程 ID): 文件路径}
+_CacheServerBuffers = {}
+def _readCacheServerData(fdb, table_name, table_args, factor_names, ids, dts):
+    Key = (fdb._CacheServerDir, os.getpid(), threading.get_ident())
+    BufferFile = _CacheServerBuffers.get(Key)
+    if BufferFile is None:
+        BufferFile = _CacheServerBuffers[Key] = fdb._CacheServerDir+os.sep+("%d_%d.buf" % Key[1:])
+        open(BufferFile, "wb").close()
+    Header = fdb._CacheServer.readData(table_name, table_args, factor_names, ids, dts, BufferFile)
+    with open(BufferFile, "rb") as File:
+        MMAPCache = mmap.mmap(File.fileno(), 0, access=mmap.ACCESS_READ)
+    Data = {iFactorName: iData.copy() for iFactorName, iData in _loadMMAPCacheData(Header, MMAPCache).items()}# 文件会被下次读取覆盖, 需要拷贝
+    return pd.Panel(Data).loc[factor_names]
 
 # 支持写入的因子库, 接口类
 class WritableFactorDB(FactorDB):
@@ -117,6 +260,176 @@ class WritableFactorDB(FactorDB):
     def compressData(self, table_name, factor_names):
         return 0
 
+# 遍历模式缓存的淘汰策略, 缓存容量以字节计, budget: 多个缓冲区共享的内存预算, QSCacheBudget 对象
+class _CachePolicy(object):
+    def __init__(self, capacity, max_num, budget=None):
+        self._Capacity = capacity# 缓存容量, 单位: 字节
+        self._MaxNum = max_num# 最大缓存个数
+        self._Budget = budget
+        self._Resident = OrderedDict()# 当前缓存的对象, {键: 大小}
+        self.Usage = 0# 已使用的缓存大小, 单位: 字节
+        self.HitNum, self.MissNum, self.EvictionNum = 0, 0, 0# 命中次数, 未命中次数, 淘汰次数
+    def __contains__(self, key):
+        return (key in self._Resident)
+    def _fit(self, size, usage, num):
+        if (self._Budget is not None) and (usage+size>self._Budget.getAvailable(self)): return False
+        return (usage+size<=self._Capacity) and (num<self._MaxNum)
+    # 按顺序从候选对象中选出需要淘汰的对象, 使得新对象能够放入缓存, 无法放入时返回 None
+    def _selectVictims(self, candidates, size):
+        Victims, Usage, Num = [], self.Usage, len(self._Resident)
+        for iKey in candidates:
+            if self._fit(size, Usage, Num): return Victims
+            Victims.append(iKey)
+            Usage -= self._Resident[iKey]
+            Num -= 1
+        return (Victims if self._fit(size, Usage, Num) else None)
+    def _onHit(self, key):
+        return 0
+    def _onMiss(self, key, size):
+        return None
+    def _onResize(self, key, size):
+        return 0
+    # 记录一次命中
+    def hit(self, key):
+        self.HitNum += 1
+        if key in self._Resident: self._onHit(key)
+        return 0
+    # 记录一次未命中并尝试将该对象放入缓存, 返回: None 表示不缓存该对象, 否则返回需要淘汰的对象列表
+    def admit(self, key, size):
+        self.MissNum += 1
+        Victims = self._onMiss(key, size)
+        if Victims is None: return None
+        for iKey in Victims: self.Usage -= self._Resident.pop(iKey)
+        self._Resident[key] = size
+        self.Usage += size
+        self.EvictionNum += len(Victims)
+        if self._Budget is not None: self._Budget.update(self, self.Usage)
+        return Victims
+    # 以实际占用的字节数修正缓存对象的大小
+    def resize(self, key, size):
+        if key not in self._Resident: return 0
+        self.Usage += size - self._Resident[key]
+        self._Resident[key] = size
+        self._onResize(key, size)
+        if self._Budget is not None: self._Budget.update(self, self.Usage)
+        return 0
+    # 释放占用的内存预算
+    def release(self):
+        if self._Budget is not None: self._Budget.release(self)
+        return 0
+# 淘汰访问次数最少的对象, 新对象的访问次数需超过被淘汰对象的访问次数
+class _LFUPolicy(_CachePolicy):
+    def __init__(self, capacity, max_num, budget=None):
+        super().__init__(capacity, max_num, budget)
+        self._Count = {}# 访问次数, {键: 次数}, 包括未缓存的对象
+    def hit(self, key):
+        self._Count[key] = self._Count.get(key, 0) + 1
+        return super().hit(key)
+    def _onMiss(self, key, size):
+        Count = self._Count[key] = self._Count.get(key, 0) + 1
+        Candidates = sorted(self._Resident, key=self._Count.__getitem__)
+        return self._selectVictims((iKey for iKey in Candidates if self._Count[iKey]<Count), size)
+# 淘汰最久未访问的对象
+class _LRUPolicy(_CachePolicy):
+    def _onHit(self, key):
+        self._Resident.move_to_end(key)
+        return 0
+    def _onMiss(self, key, size):
+        return self._selectVictims(iter(self._Resident), size)
+# Adaptive Replacement Cache, 在最近访问(T1)和频繁访问(T2)之间自适应地分配缓存容量
+class _ARCPolicy(_CachePolicy):
+    def __init__(self, capacity, max_num, budget=None):
+        super().__init__(capacity, max_num, budget)
+        self._T1, self._T2 = OrderedDict(), OrderedDict()# 仅访问过一次的缓存对象和访问过多次的缓存对象, {键: 大小}
+        self._B1, self._B2 = OrderedDict(), OrderedDict()# 从 T1 和 T2 中淘汰的对象记录, {键: 大小}
+        self._P = 0# T1 的目标大小, 单位: 字节
+    def _onHit(self, key):
+        Size = self._T1.pop(key, None)
+        if Size is None: Size = self._T2.pop(key)
+        self._T2[key] = Size
+        return 0
+    def _onResize(self, key, size):
+        if key in self._T1: self._T1[key] = size
+        else: self._T2[key] = size
+        return 0
+    def _onMiss(self, key, size):
+        if not self._fit(size, 0, 0): return None
+        B1Size, B2Size = sum(self._B1.values()), sum(self._B2.values())
+        isInB2 = (key in self._B2)
+        if key in self._B1:# 命中 T1 的淘汰记录, 增大 T1 的目标大小
+            self._P = min(self._Capacity, self._P + max(B2Size/B1Size, 1) * size)
+            B1Size -= self._B1.pop(key)
+            Target = self._T2
+        elif isInB2:# 命中 T2 的淘汰记录, 减小 T1 的目标大小
+            self._P = max(0, self._P - max(B1Size/B2Size, 1) * size)
+            B2Size -= self._B2.pop(key)
+            Target = self._T2
+        else:
+            Target = self._T1
+        Victims, Usage, Num, T1Size = [], self.Usage, len(self._Resident), sum(self._T1.values())
+        while not self._fit(size, Usage, Num):
+            if self._T1 and ((not self._T2) or (T1Size>self._P) or (isInB2 and (T1Size==self._P))):
+                iKey, iSize = self._T1.popitem(last=False)
+                self._B1[iKey] = iSize
+                T1Size -= iSize
+                B1Size += iSize
+            else:
+                iKey, iSize = self._T2.popitem(last=False)
+                self._B2[iKey] = iSize
+                B2Size += iSize
+            Victims.append(iKey)
+            Usage -= iSize
+            Num -= 1
+        Target[key] = size
+        if Target is self._T1: T1Size += size
+        # 限制淘汰记录的大小
+        while self._B1 and (T1Size+B1Size>self._Capacity): B1Size -= self._B1.popitem(last=False)[1]
+        while self._B2 and (Usage+size+B1Size+B2Size>2*self._Capacity): B2Size -= self._B2.popitem(last=False)[1]
+        return Victims
+# 衍生因子计算结果的本地持久化缓存
+# 缓存键由因子签名, 输入数据的版本, 时点序列, ID 序列以及其他影响计算结果的参数生成, 输入数据改变后缓存自动失效
+# 因子签名包含 QuantStudio 的版本以及算子和其引用的函数的代码, 修改算子代码或者升级 QuantStudio 后缓存也自动失效
+# 每个缓存项存储为缓存目录下以缓存键命名的 .npy 文件, 数据按列(ID)连续存放, 只缓存数值型因子
+class FactorResultCache(__QS_Object__):
+    """因子结果缓存"""
+    CacheDir = Directory(arg_type="Directory", label="缓存目录", order=0)
+    IgnoreUnknownVersion = Bool(False, arg_type="Bool", label="忽略未知数据版本", order=1)# 是否缓存输入数据版本未知的因子, 此时数据改变需要手动清空缓存
+    # 生成缓存键, kwargs: 其他影响计算结果的参数, 返回 None 表示该因子不能缓存
+    def genKey(self, factor, ids, dts, **kwargs):
+        if (not self.CacheDir) or (factor.getMetaData(key="DataType")!="double"): return None
+        Signature, Version = factor.Signature, factor._QS_genDataVersion(ignore_unknown=self.IgnoreUnknownVersion)
+        if (Signature is None) or (Version is None): return None
+        Key = _genArgSignature([Signature, Version, list(dts), list(ids), kwargs])
+        if Key is None: return None
+        return hashlib.sha1(Key.encode("utf-8")).hexdigest()
+    # 读取缓存数据, 没有缓存返回 None
+    def read(self, key, ids, dts):
+        if key is None: return None
+        FilePath = self.CacheDir+os.sep+key+".npy"
+        if not os.path.isfile(FilePath): return None
+        try:
+            Data = np.load(FilePath)
+        except Exception as e:
+            self._QS_Logger.warning("结果缓存文件 '%s' 读取失败: %s" % (FilePath, str(e)))
+            return None
+        if Data.shape!=(len(dts), len(ids)): return None
+        return pd.DataFrame(Data, index=dts, columns=ids)
+    # 写入缓存数据, 先写入临时文件再替换, 避免并发读取到不完整的文件
+    def write(self, key, data):
+        if key is None: return 0
+        if not os.path.isdir(self.CacheDir): os.makedirs(self.CacheDir, exist_ok=True)
+        FilePath = self.CacheDir+os.sep+key+".npy"
+        TempFilePath = FilePath+"."+str(os.getpid())+".tmp"
+        with open(TempFilePath, "wb") as File:
+            np.save(File, np.asfortranarray(data.values, dtype="float"))
+        os.replace(TempFilePath, FilePath)
+        return 0
+    # 清空缓存
+    def clear(self):
+        if not os.path.isdir(self.CacheDir): return 0
+        for iFileName in os.listdir(self.CacheDir):
+            if iFileName.endswith(".npy"): os.remove(self.CacheDir+os.sep+iFileName)
+        return 0
 # 因子表的遍历模式参数对象
 class _ErgodicMode(__QS_Object__):
     """遍历模式"""
@@ -125,46 +438,77 @@ class _ErgodicMode(__QS_Object__):
     CacheMode = Enum("因子", "ID", arg_type="SingleOption", label="缓冲模式", order=2)
     MaxFactorCacheNum = Int(60, arg_type="Integer", label="最大缓冲因子数", order=3)
     MaxIDCacheNum = Int(10000, arg_type="Integer", label="最大缓冲ID数", order=4)
-    CacheSize = Int(300, arg_type="Integer", label="缓冲区大小", order=5)# 以 MB 为单位
-    ErgodicDTs = List(arg_type="DateTimeList", label="遍历时点", order=6)
-    ErgodicIDs = List(arg_type="IDList", label="遍历ID", order=7)
+    CacheSize = Int(300, arg_type="Integer", label="缓冲区大小", order=5)# 以 MB 为单位, 双缓冲共占用 2 倍的共享内存
+    CachePolicy = Enum("LFU", "LRU", "ARC", arg_type="SingleOption", label="缓冲淘汰策略", order=6)
+    ErgodicDTs = List(arg_type="DateTimeList", label="遍历时点", order=7)
+    ErgodicIDs = List(arg_type="IDList", label="遍历ID", order=8)
     def __init__(self, sys_args={}, **kwargs):
         super().__init__(sys_args=sys_args, **kwargs)
         self._isStarted = False
         self._CurDT = None
+        self._CachePolicy = None
     def __getstate__(self):
         state = self.__dict__.copy()
         if "_CacheDataProcess" in state: state["_CacheDataProcess"] = None
         return state
+    # 缓冲区的统计信息, 返回: Series(index=["命中次数", "未命中次数", "淘汰次数", "命中率", "已用缓冲区(MB)"])
+    def getCacheStatistics(self):
+        if self._CachePolicy is None: return pd.Series([0, 0, 0, np.nan, 0.0], index=["命中次数", "未命中次数", "淘汰次数", "命中率", "已用缓冲区(MB)"])
+        Policy = self._CachePolicy
+        nRead = Policy.HitNum + Policy.MissNum
+        return pd.Series([Policy.HitNum, Policy.MissNum, Policy.EvictionNum, (Policy.HitNum/nRead if nRead>0 else np.nan), Policy.Usage/2**20], index=["命中次数", "未命中次数", "淘汰次数", "命中率", "已用缓冲区(MB)"])
+# 将缓冲数据写入共享内存, 索引一致的 float64 数据以 ndarray 块(键 × 时点 × 列)的形式直接写入 mmap, 其余数据随数据头一起传输
+# cache_data: {键: DataFrame}, 返回数据头: ([块中的键], 行索引, 列索引, {其余的键: DataFrame})
+def _dumpMMAPCacheData(cache_data, mmap_cache):
+    BlockKeys, ExtraData, Index, Columns = [], {}, None, None
+    MaxNum = len(mmap_cache) // np.dtype(np.float64).itemsize# 共享内存最多能容纳的数值个数
+    for iKey, iData in cache_data.items():
+        if (iData.shape[0]*iData.shape[1]>0) and (iData.dtypes==np.float64).all():
+            if Index is None: Index, Columns = iData.index, iData.columns
+            if iData.index.equals(Index) and iData.columns.equals(Columns) and ((len(BlockKeys)+1)*Index.shape[0]*Columns.shape[0]<=MaxNum):
+                BlockKeys.append(iKey)
+                continue
+        ExtraData[iKey] = iData# 非数值型数据, 索引不一致的数据或者超出共享内存大小的数据
+    if BlockKeys:
+        Block = np.frombuffer(mmap_cache, dtype=np.float64, count=len(BlockKeys)*Index.shape[0]*Columns.shape[0]).reshape((len(BlockKeys), Index.shape[0], Columns.shape[0]))
+        for i, iKey in enumerate(BlockKeys): Block[i] = cache_data[iKey].values
+        del Block
+    return (BlockKeys, Index, Columns, ExtraData)
+# 根据数据头从共享内存中映射出缓冲数据, 数值块不发生拷贝, 返回: {键: DataFrame}
+def _loadMMAPCacheData(header, mmap_cache):
+    BlockKeys, Index, Columns, CacheData = header
+    if BlockKeys:
+        Block = np.frombuffer(mmap_cache, dtype=np.float64, count=len(BlockKeys)*Index.shape[0]*Columns.shape[0]).reshape((len(BlockKeys), Index.shape[0], Columns.shape[0]))
+        for i, iKey in enumerate(BlockKeys): CacheData[iKey] = pd.DataFrame(Block[i], index=Index, columns=Columns, copy=False)
+    return CacheData
+# 读取遍历模式下的缓冲数据, 如果因子表所属的因子库启动了共享缓冲服务, 则通过服务进程读取
+def _readCacheData(ft, factor_names, ids, dts, args={}):
+    CacheServer = (getattr(ft.FactorDB, "_CacheServer", None) if ft.FactorDB is not None else None)
+    if (CacheServer is not None) and (not args):
+        TableArgs = {iArgName: ft[iArgName] for iArgName in ft.ArgNames if iArgName not in ("遍历模式", "运算模式")}
+        return _readCacheServerData(ft.FactorDB, ft.Name, TableArgs, factor_names, ids, dts)
+    return ft.__QS_calcData__(raw_data=ft.__QS_prepareRawData__(factor_names=factor_names, ids=ids, dts=dts, args=args), factor_names=factor_names, ids=ids, dts=dts, args=args)
 # 基于 mmap 的缓冲数据, 如果开启遍历模式, 那么限制缓冲的因子个数, ID 个数, 时间点长度, 缓冲区里是因子的部分数据
 def _prepareMMAPFactorCacheData(ft, mmap_cache):
     CacheData, CacheDTs, MMAPCacheData, DTNum = {}, [], mmap_cache, len(ft.ErgodicMode._DateTimes)
     CacheSize = int(ft.ErgodicMode.CacheSize*2**20)
-    if os.name=='nt': MMAPCacheData = mmap.mmap(-1, CacheSize, tagname=ft.ErgodicMode._TagName)
+    if os.name=='nt': MMAPCacheData = [mmap.mmap(-1, CacheSize, tagname=iTagName) for iTagName in ft.ErgodicMode._TagName]
+    BufferInd, Header, isDirty = 0, None, True# 下一个待写入的缓冲区, 该缓冲区的数据头, 该缓冲区的数据是否需要重新写入
     while True:
         Task = ft.ErgodicMode._Queue2SubProcess.get()# 获取任务
         if Task is None: break# 结束进程
         if (Task[0] is None) and (Task[1] is None):# 把数据装入缓存区
-            CacheDataByte = pickle.dumps(CacheData)
-            DataLen = len(CacheDataByte)
-            for i in range(int(DataLen/CacheSize)+1):
-                iStartInd = i*CacheSize
-                iEndInd = min((i+1)*CacheSize, DataLen)
-                if iEndInd>iStartInd:
-                    MMAPCacheData.seek(0)
-                    MMAPCacheData.write(CacheDataByte[iStartInd:iEndInd])
-                    ft.ErgodicMode._Queue2MainProcess.put(iEndInd-iStartInd)
-                    ft.ErgodicMode._Queue2SubProcess.get()
-            ft.ErgodicMode._Queue2MainProcess.put(0)
-            del CacheDataByte
-            gc.collect()
+            if isDirty: Header = _dumpMMAPCacheData(CacheData, MMAPCacheData[BufferInd])
+            ft.ErgodicMode._Queue2MainProcess.put((BufferInd, Header))
+            BufferInd, Header, isDirty = 1 - BufferInd, None, True# 主进程接管该缓冲区, 此后写入另一个缓冲区
         elif Task[0] is None:# 调整缓存区
             NewFactors, PopFactors = Task[1]
-            for iFactorName in PopFactors: CacheData.pop(iFactorName)
+            isDirty = True
+            for iFactorName in PopFactors: CacheData.pop(iFactorName, None)
             if NewFactors:
                 #print("调整缓存区: "+str(NewFactors))# debug
                 if CacheDTs:
-                    CacheData.update(dict(ft.__QS_calcData__(raw_data=ft.__QS_prepareRawData__(factor_names=NewFactors, ids=ft.ErgodicMode._IDs, dts=CacheDTs), factor_names=NewFactors, ids=ft.ErgodicMode._IDs, dts=CacheDTs)))
+                    CacheData.update(dict(_readCacheData(ft, NewFactors, ft.ErgodicMode._IDs, CacheDTs)))
                 else:
                     CacheData.update({iFactorName: pd.DataFrame(index=CacheDTs, columns=ft.ErgodicMode._IDs) for iFactorName in NewFactors})
         else:# 准备缓存区
@@ -178,7 +522,7 @@ def _prepareMMAPFactorCacheData(ft, mmap_cache):
                     CacheFactorNames = list(CacheData.keys())
                     #print("准备缓存区: "+str(CacheFactorNames))# debug
                     if NewCacheDTs:
-                        NewCacheData = ft.__QS_calcData__(raw_data=ft.__QS_prepareRawData__(factor_names=CacheFactorNames, ids=ft.ErgodicMode._IDs, dts=NewCacheDTs), factor_names=CacheFactorNames, ids=ft.ErgodicMode._IDs, dts=NewCacheDTs)
+                        NewCacheData = _readCacheData(ft, CacheFactorNames, ft.ErgodicMode._IDs, NewCacheDTs)
                     else:
                         NewCacheData = pd.Panel(items=CacheFactorNames, major_axis=NewCacheDTs, minor_axis=ft.ErgodicMode._IDs)
                     for iFactorName in CacheData:
@@ -188,35 +532,29 @@ def _prepareMMAPFactorCacheData(ft, mmap_cache):
                             CacheData[iFactorName] = CacheData[iFactorName].loc[CacheDTs, :]
                             CacheData[iFactorName].loc[NewCacheDTs, :] = NewCacheData[iFactorName]
                     NewCacheData = None
+            # 预先将下一个窗口的数据写入主进程未使用的缓冲区
+            Header, isDirty = _dumpMMAPCacheData(CacheData, MMAPCacheData[BufferInd]), False
     return 0
 # 基于 mmap 的 ID 缓冲的因子表, 如果开启遍历模式, 那么限制缓冲的 ID 个数和时间点长度, 缓冲区里是 ID 的部分数据
 def _prepareMMAPIDCacheData(ft, mmap_cache):
     CacheData, CacheDTs, MMAPCacheData, DTNum = {}, [], mmap_cache, len(ft.ErgodicMode._DateTimes)
     CacheSize = int(ft.ErgodicMode.CacheSize*2**20)
-    if os.name=='nt': MMAPCacheData = mmap.mmap(-1, CacheSize, tagname=ft.ErgodicMode._TagName)
+    if os.name=='nt': MMAPCacheData = [mmap.mmap(-1, CacheSize, tagname=iTagName) for iTagName in ft.ErgodicMode._TagName]
+    BufferInd, Header, isDirty = 0, None, True# 下一个待写入的缓冲区, 该缓冲区的数据头, 该缓冲区的数据是否需要重新写入
     while True:
         Task = ft.ErgodicMode._Queue2SubProcess.get()# 获取任务
         if Task is None: break# 结束进程
         if (Task[0] is None) and (Task[1] is None):# 把数据装入缓冲区
-            CacheDataByte = pickle.dumps(CacheData)
-            DataLen = len(CacheDataByte)
-            for i in range(int(DataLen/CacheSize)+1):
-                iStartInd = i*CacheSize
-                iEndInd = min((i+1)*CacheSize, DataLen)
-                if iEndInd>iStartInd:
-                    MMAPCacheData.seek(0)
-                    MMAPCacheData.write(CacheDataByte[iStartInd:iEndInd])
-                    ft.ErgodicMode._Queue2MainProcess.put(iEndInd-iStartInd)
-                    ft.ErgodicMode._Queue2SubProcess.get()
-            ft.ErgodicMode._Queue2MainProcess.put(0)
-            del CacheDataByte
-            gc.collect()
+            if isDirty: Header = _dumpMMAPCacheData(CacheData, MMAPCacheData[BufferInd])
+            ft.ErgodicMode._Queue2MainProcess.put((BufferInd, Header))
+            BufferInd, Header, isDirty = 1 - BufferInd, None, True# 主进程接管该缓冲区, 此后写入另一个缓冲区
         elif Task[0] is None:# 调整缓存区数据
-            NewID, PopID = Task[1]
-            if PopID: CacheData.pop(PopID)# 用新 ID 数据替换旧 ID
+            NewID, PopIDs = Task[1]
+            isDirty = True
+            for iPopID in PopIDs: CacheData.pop(iPopID, None)# 用新 ID 数据替换旧 ID
             if NewID:
                 if CacheDTs:
-                    CacheData[NewID] = ft.__QS_calcData__(raw_data=ft.__QS_prepareRawData__(factor_names=ft.FactorNames, ids=[NewID], dts=CacheDTs), factor_names=ft.FactorNames, ids=[NewID], dts=CacheDTs).iloc[:, :, 0]
+                    CacheData[NewID] = _readCacheData(ft, ft.FactorNames, [NewID], CacheDTs).iloc[:, :, 0]
                 else:
                     CacheData[NewID] = pd.DataFrame(index=CacheDTs, columns=ft.FactorNames)
         else:# 准备缓冲区
@@ -229,7 +567,7 @@ def _prepareMMAPIDCacheData(ft, mmap_cache):
                     isDisjoint = OldCacheDTs.isdisjoint(CacheDTs)
                     CacheIDs = list(CacheData.keys())
                     if NewCacheDTs:
-                        NewCacheData = ft.__QS_calcData__(raw_data=ft.__QS_prepareRawData__(factor_names=ft.FactorNames, ids=CacheIDs, dts=NewCacheDTs), factor_names=ft.FactorNames, ids=CacheIDs, dts=NewCacheDTs)
+                        NewCacheData = _readCacheData(ft, ft.FactorNames, CacheIDs, NewCacheDTs)
                     else:
                         NewCacheData = pd.Panel(items=ft.FactorNames, major_axis=NewCacheDTs, minor_axis=CacheIDs)
                     for iID in CacheData:
@@ -239,6 +577,8 @@ def _prepareMMAPIDCacheData(ft, mmap_cache):
                             CacheData[iID] = CacheData[iID].loc[CacheDTs, :]
                             CacheData[iID].loc[NewCacheDTs, :] = NewCacheData.loc[:, :, iID]
                     NewCacheData = None
+            # 预先将下一个窗口的数据写入主进程未使用的缓冲区
+            Header, isDirty = _dumpMMAPCacheData(CacheData, MMAPCacheData[BufferInd]), False
     return 0
 # 因子表的运算模式参数对象
 class _OperationMode(__QS_Object__):
@@ -247,7 +587,9 @@ class _OperationMode(__QS_Object__):
     IDs = ListStr()
     FactorNames = ListStr()
     SubProcessNum = Int(0)
+    IOThreadNum = Int(0)# 每个进程准备原始数据的线程数, 0 表示不使用线程池
     DTRuler = List(dt.datetime)
+    ResultCache = Instance(FactorResultCache)# 目标因子的结果缓存, None 表示不使用缓存
     def __init__(self, ft, sys_args={}, config_file=None, **kwargs):
         self._FT = ft
         self._isStarted = False
@@ -264,6 +606,9 @@ class _OperationMode(__QS_Object__):
         self._RawDataDir = ""# 原始数据存放根目录
         self._CacheDataDir = ""# 中间数据存放根目录
         self._Event = {}# {因子名: (Sub2MainQueue, Event)}
+        self._ReadyEvent = {}# 缓存数据准备完成的通知, {(因子名, PID): Event}, 串行模式下为空
+        self._ResultCacheKeys = {}# 未命中结果缓存, 计算之后需要写入缓存的目标因子, {因子名: 缓存键}
+        self._MergedDescriptors = []# 合并公共子表达式时被替换了描述子的因子, [(因子, 原描述子列表)], 运算结束后恢复
         self._FileSuffix = getShelveFileSuffix()
         if self._FileSuffix: self._FileSuffix = "." + self._FileSuffix
         super().__init__(sys_args=sys_args, config_file=config_file, **kwargs)
@@ -275,31 +620,160 @@ class _OperationMode(__QS_Object__):
         if self._CacheDir is not None:
             state["_CacheDir"] = self._CacheDir.name
         return state
+    # 通知因子在某个进程的缓存数据已经准备完成
+    def _setCacheDataReady(self, factor_name, pid):
+        iEvent = self._ReadyEvent.get((factor_name, pid), None)
+        if iEvent is not None: iEvent.set()
+    # 等待因子在某个进程的缓存数据准备完成, 等待期间进程休眠
+    def _waitCacheDataReady(self, factor_name, pid):
+        iEvent = self._ReadyEvent.get((factor_name, pid), None)
+        if iEvent is not None: iEvent.wait()
+# 运算模式的中间数据存储
+# 每个因子在每个进程的缓存目录下以若干数据块保存, 文件名为: 因子名+因子ID+"@"+数据块标识, 数据块标识一般为写入数据的进程 ID
+# 数值型数据以 .npy 文件按行(时点)连续存储, 读取时以内存映射的方式打开, 只读取需要的时点; 其他类型的数据和时点, ID 信息一起存于 .meta 文件
+# .meta 文件最后写入, 其存在即表示该数据块已经准备好(共享数组除外, 共享数组的数据是否准备好由多进程同步保证)
+def _saveOperationCacheData(file_path, std_data, part="0"):
+    iFilePath = file_path+"@"+part
+    Meta = {"DTs":std_data.index.tolist(), "IDs":std_data.columns.tolist()}
+    if (std_data.shape[0]*std_data.shape[1]>0) and (std_data.dtypes==np.dtype("float")).all():
+        np.save(iFilePath+".npy", np.ascontiguousarray(std_data.values))
+    else:
+        Meta["Data"] = std_data.values
+    with open(iFilePath+".tmp", "wb") as File:
+        pickle.dump(Meta, File)
+    os.replace(iFilePath+".tmp", iFilePath+".meta")
+    return 0
+# 预先分配共享的 DT × ID 数值型数组, 用于按时点分配到各个进程计算的因子(截面运算, 面板运算), 各进程将结果直接写入分配到的行
+# shared_file: 共享数组的文件路径, pid_files: {PID: 该进程缓存目录下的文件路径}, pid_ids: {PID: [ID]}
+# 每个进程的缓存目录下只保存一个指向共享数组的数据块, 记录该进程的 ID 在共享数组中的列位置
+def _allocSharedOperationCacheData(shared_file, dts, ids, pid_files, pid_ids):
+    Data = np.lib.format.open_memmap(shared_file, mode="w+", dtype=np.float64, shape=(len(dts), len(ids)))
+    Data[:] = np.nan
+    Data.flush()
+    Data = None
+    IDPos = pd.Series(np.arange(len(ids)), index=ids)
+    for iPID, iFilePath in pid_files.items():
+        Meta = {"DTs":list(dts), "IDs":list(pid_ids[iPID]), "Shared":shared_file, "Columns":IDPos.loc[pid_ids[iPID]].values}
+        with open(iFilePath+"@shared.tmp", "wb") as File:
+            pickle.dump(Meta, File)
+        os.replace(iFilePath+"@shared.tmp", iFilePath+"@shared.meta")
+    return 0
+# 将数据写入共享数组的行, row_start: 起始行
+def _writeSharedOperationCacheData(shared_file, std_data, row_start):
+    Data = np.load(shared_file, mmap_mode="r+")
+    Data[row_start:row_start+std_data.shape[0]] = std_data.values
+    Data.flush()
+    return 0
+# 读取中间数据, dts: 需要读取的时点, None 表示读取所有时点, 返回: DataFrame(index=[时点], columns=[ID]), 没有数据返回 None
+def _loadOperationCacheData(file_path, dts=None):
+    DirPath, FileName = os.path.split(file_path)
+    FileName += "@"
+    Parts = sorted(iFile[:-5] for iFile in os.listdir(DirPath) if iFile.startswith(FileName) and iFile.endswith(".meta"))
+    if not Parts: return None
+    if dts is not None: dts = pd.Index(dts)
+    Data = []
+    for iPart in Parts:
+        iFilePath = DirPath+os.sep+iPart
+        with open(iFilePath+".meta", "rb") as File:
+            Meta = pickle.load(File)
+        if "Data" in Meta: iValues = Meta["Data"]
+        elif "Shared" in Meta: iValues = np.load(Meta["Shared"], mmap_mode="r")
+        else: iValues = np.load(iFilePath+".npy", mmap_mode="r")
+        if dts is None:
+            iPos, iDTs = np.arange(len(Meta["DTs"])), Meta["DTs"]
+        else:
+            iPos = pd.Index(Meta["DTs"]).get_indexer(dts)
+            iMask = (iPos>=0)
+            iPos, iDTs = iPos[iMask], dts[iMask]
+        if "Columns" in Meta: iValues = np.asarray(iValues[np.ix_(iPos, Meta["Columns"])])
+        else: iValues = np.array(iValues[iPos])
+        Data.append(pd.DataFrame(iValues, index=iDTs, columns=Meta["IDs"]))
+        iValues = None
+    if len(Data)==1: return Data[0]
+    return pd.concat(Data, axis=0).sort_index()
+# 准备一个分组的原始数据
+def _prepareGroupRawData(args, i):
+    iFT, iFactorNames, iRawFactorNames, iDTs, iArgs = args['GroupInfo'][i]
+    iPrepareIDs = args["PrepareIDs"][i]
+    if iPrepareIDs is None: iPrepareIDs = args["FT"].OperationMode.IDs
+    iPID_PrepareIDs = args["PID_PrepareIDs"][i]
+    if iPID_PrepareIDs is None: iPID_PrepareIDs = args["FT"].OperationMode._PID_IDs
+    iRawData = iFT.__QS_prepareRawData__(iRawFactorNames, iPrepareIDs, iDTs, iArgs)
+    iFT.__QS_saveRawData__(iRawData, iRawFactorNames, args["FT"].OperationMode._RawDataDir, iPID_PrepareIDs, args["RawDataFileNames"][i], args["FT"].OperationMode._PID_Lock)
+    return i
+# 准备所有分组的原始数据, 按照完成的顺序返回分组的序号
+# 原始数据准备线程数大于 1 时, 分组在线程池中并发准备, 以重叠数据库查询和磁盘读写的等待时间
+# 支持线程独立连接的因子库, 其分组分散到多个线程, 每个线程使用独立的连接; 其他因子库的分组共享数据库连接, 在同一个线程中依次准备
+def _genRawData(args):
+    nGroup = len(args['GroupInfo'])
+    IOThreadNum = min(args["FT"].OperationMode.IOThreadNum, nGroup)
+    if IOThreadNum<=1:
+        for i in range(nGroup):
+            yield _prepareGroupRawData(args, i)
+        return
+    DBGroups = OrderedDict()# {id(因子库): (因子库, [分组序号])}
+    for i in range(nGroup):
+        iFDB = args['GroupInfo'][i][0].FactorDB
+        DBGroups.setdefault(id(iFDB), (iFDB, []))[1].append(i)
+    Lanes = []# [(因子库 or None, [分组序号])], 因子库不为 None 表示该线程需要使用独立的连接
+    for iFDB, iGroupInds in DBGroups.values():
+        if (iFDB is not None) and iFDB.isThreadConnectable() and (len(iGroupInds)>1):
+            Lanes += [(iFDB, iGroupInds[j::IOThreadNum]) for j in range(min(IOThreadNum, len(iGroupInds)))]
+        else:
+            Lanes.append((None, iGroupInds))
+    DoneQueue = queue.Queue()
+    def _runLane(fdb, group_inds):
+        try:
+            if fdb is not None: fdb.openThreadConnection()
+            try:
+                for i in group_inds: DoneQueue.put(_prepareGroupRawData(args, i))
+            finally:
+                if fdb is not None: fdb.closeThreadConnection()
+        except BaseException as e:
+            DoneQueue.put(e)
+    with ThreadPoolExecutor(max_workers=IOThreadNum) as Executor:
+        for iFDB, iGroupInds in Lanes: Executor.submit(_runLane, iFDB, iGroupInds)
+        for i in range(nGroup):
+            iRslt = DoneQueue.get()
+            if isinstance(iRslt, BaseException): raise iRslt
+            yield iRslt
 # 因子表准备子进程
 def _prepareRawData(args):
     nGroup = len(args['GroupInfo'])
     if "Sub2MainQueue" not in args:# 运行模式为串行
         with ProgressBar(max_value=nGroup) as ProgBar:
-            for i in range(nGroup):
-                iFT, iFactorNames, iRawFactorNames, iDTs, iArgs = args['GroupInfo'][i]
-                iPrepareIDs = args["PrepareIDs"][i]
-                if iPrepareIDs is None: iPrepareIDs = args["FT"].OperationMode.IDs
-                iPID_PrepareIDs = args["PID_PrepareIDs"][i]
-                if iPID_PrepareIDs is None: iPID_PrepareIDs = args["FT"].OperationMode._PID_IDs
-                iRawData = iFT.__QS_prepareRawData__(iRawFactorNames, iPrepareIDs, iDTs, iArgs)
-                iFT.__QS_saveRawData__(iRawData, iRawFactorNames, args["FT"].OperationMode._RawDataDir, iPID_PrepareIDs, args["RawDataFileNames"][i], args["FT"].OperationMode._PID_Lock)
+            for i, iGroupInd in enumerate(_genRawData(args)):
                 ProgBar.update(i+1)
     else:# 运行模式为并行
-        for i in range(nGroup):
-            iFT, iFactorNames, iRawFactorNames, iDTs, iArgs = args['GroupInfo'][i]
-            iPrepareIDs = args["PrepareIDs"][i]
-            if iPrepareIDs is None: iPrepareIDs = args["FT"].OperationMode.IDs
-            iPID_PrepareIDs = args["PID_PrepareIDs"][i]
-            if iPID_PrepareIDs is None: iPID_PrepareIDs = args["FT"].OperationMode._PID_IDs
-            iRawData = iFT.__QS_prepareRawData__(iRawFactorNames, iPrepareIDs, iDTs, iArgs)
-            iFT.__QS_saveRawData__(iRawData, iRawFactorNames, args["FT"].OperationMode._RawDataDir, iPID_PrepareIDs, args["RawDataFileNames"][i], args["FT"].OperationMode._PID_Lock)
+        for iGroupInd in _genRawData(args):
             args['Sub2MainQueue'].put((args["PID"], 1, None))
     return 0
+# 因子数据写入线程, 写入任务通过有界队列传递, 使得因子计算和数据写入重叠进行, 队列满时计算等待
+# 如果目标因子库同时也是计算所需数据的来源, 则直接写入, 避免多个线程共享同一个数据库连接
+class _FactorDataWriter(object):
+    def __init__(self, source_dbs=set(), max_size=2):
+        self._SourceDBs = source_dbs# {id(因子库)}
+        self._Queue = queue.Queue(maxsize=max_size)
+        self._Error = None
+        self._Thread = threading.Thread(target=self._run, daemon=True)
+        self._Thread.start()
+    def _run(self):
+        while True:
+            Task = self._Queue.get()
+            if Task is None: break
+            if self._Error is not None: continue# 出错后只清空队列, 错误在主线程中抛出
+            try:
+                Task[0](*Task[1], **Task[2])
+            except Exception as e:
+                self._Error = e
+    def write(self, fdb, fun, *args, **kwargs):
+        if self._Error is not None: raise self._Error
+        if id(fdb) in self._SourceDBs: return fun(*args, **kwargs)
+        return self._Queue.put((fun, args, kwargs))
+    def close(self):
+        self._Queue.put(None)
+        self._Thread.join()
+        if self._Error is not None: raise self._Error
 # 因子表运算子进程
 def _calculate(args):
     FT = args["FT"]
@@ -325,6 +799,8 @@ def _calculate(args):
     nTask = len(FT.OperationMode.FactorNames)
     nDT = len(FT.OperationMode.DateTimes)
     TaskCount = 0
+    Writer = _FactorDataWriter(source_dbs={id(iFactor.FactorTable.FactorDB) for iFactor in FT.OperationMode._FactorDict.values() if iFactor.FactorTable is not None})
+    ResultCacheData = {}# 需要写入结果缓存的数据, {因子名: [DataFrame]}
     if FT.OperationMode.SubProcessNum==0:# 运行模式为串行
         with ProgressBar(max_value=nTask) as ProgBar:
             for i, iTask in enumerate(TaskDispatched):
@@ -335,7 +811,8 @@ def _calculate(args):
                         jData = jFactor._QS_getData(dts=FT.OperationMode.DateTimes, pids=[args["PID"]])
                         if FT.OperationMode._FactorPrepareIDs[jFactor.Name] is not None:
                             jData = jData.loc[:, FT.OperationMode.IDs]
-                        iDB.writeFactorData(jData, iTableName, iTargetFactorNames[j], if_exists=args["if_exists"], data_type=jFactor.getMetaData(key="DataType"))
+                        if jFactor.Name in FT.OperationMode._ResultCacheKeys: ResultCacheData.setdefault(jFactor.Name, []).append(jData)
+                        Writer.write(iDB, iDB.writeFactorData, jData, iTableName, iTargetFactorNames[j], if_exists=args["if_exists"], data_type=jFactor.getMetaData(key="DataType"))
                         jData = None
                         TaskCount += 1
                         ProgBar.update(TaskCount)
@@ -351,16 +828,20 @@ def _calculate(args):
                                 ijkData = kFactor._QS_getData(dts=jDTs, pids=[args["PID"]])
                                 if FT.OperationMode._FactorPrepareIDs[kFactor.Name] is not None:
                                     ijkData = ijkData.loc[:, FT.OperationMode.IDs]
+                                if kFactor.Name in FT.OperationMode._ResultCacheKeys: ResultCacheData.setdefault(kFactor.Name, []).append(ijkData)
                                 jData[iTargetFactorNames[k]] = ijkData
                                 if j==0:
                                     TaskCount += 0.5
                                     ProgBar.update(TaskCount)
                             jData = pd.Panel(jData).loc[iTargetFactorNames]
-                            iDB.writeData(jData, iTableName, if_exists=args["if_exists"], data_type=iDataTypes)
+                            Writer.write(iDB, iDB.writeData, jData, iTableName, if_exists=args["if_exists"], data_type=iDataTypes)
                             jData = None
                         TaskCount += 0.5
                         ProgBar.update(TaskCount)
     else:
+        # 按照运算图的调度顺序预先准备所有因子的缓存数据, 使得进程在多进程同步之前完成所有不依赖于同步的计算
+        for iFactor in FT._genOperationSchedule():
+            if not iFactor._isCacheDataOK: iFactor.__QS_prepareCacheData__()
         for i, iTask in enumerate(TaskDispatched):
             iDB, iFactors, iTargetFactorNames = TaskDispatched[iTask]
             iTableName = iTask[1]
@@ -371,7 +852,7 @@ def _calculate(args):
                         jData = jData.loc[:, FT.OperationMode._PID_IDs[args["PID"]]]
                     else:
                         jData = jFactor._QS_getData(dts=FT.OperationMode.DateTimes, pids=[args["PID"]])
-                    iDB.writeFactorData(jData, iTableName, iTargetFactorNames[j], if_exists=args["if_exists"], data_type=jFactor.getMetaData(key="DataType"))
+                    Writer.write(iDB, iDB.writeFactorData, jData, iTableName, iTargetFactorNames[j], if_exists=args["if_exists"], data_type=jFactor.getMetaData(key="DataType"))
                     jData = None
                     args["Sub2MainQueue"].put((args["PID"], 1, None))
             else:
@@ -389,11 +870,20 @@ def _calculate(args):
                             jData[iTargetFactorNames[k]] = ijkData
                             if j==0: args["Sub2MainQueue"].put((args["PID"], 0.5, None))
                         jData = pd.Panel(jData).loc[iTargetFactorNames]
-                        iDB.writeData(jData, iTableName, if_exists=args["if_exists"], data_type=iDataTypes)
+                        Writer.write(iDB, iDB.writeData, jData, iTableName, if_exists=args["if_exists"], data_type=iDataTypes)
                         jData = None
                     args["Sub2MainQueue"].put((args["PID"], 0.5, None))
+    Writer.close()
+    # 写入结果缓存, 多进程模式下每个进程只有部分 ID 的数据, 不写入
+    for iFactorName, iData in ResultCacheData.items():
+        iData = pd.concat(iData, axis=0).loc[list(FT.OperationMode.DateTimes), list(FT.OperationMode.IDs)]
+        FT.OperationMode.ResultCache.write(FT.OperationMode._ResultCacheKeys[iFactorName], iData)
     return 0
 
+# 是否为迭代型运算因子, 即自身有回溯的时间序列运算或者面板运算
+def _isRecursiveFactor(factor):
+    return hasattr(factor, "iInitData") and ((factor.iLookBackMode=="扩张窗口") or (factor.iLookBack!=0))
+
 # 因子表, 接口类
 # 因子表可看做一个独立的数据集或命名空间, 可看做 Panel(items=[因子], major_axis=[时间点], minor_axis=[ID])
 # 因子表的数据有三个维度: 时间点, ID, 因子
@@ -440,6 +930,9 @@ class FactorTable(__QS_Object__):
     def getFactorMetaData(self, factor_names, key=None):
         if key is None: return pd.DataFrame(index=factor_names, dtype=np.dtype("O"))
         else: return pd.Series([None]*len(factor_names), index=factor_names, dtype=np.dtype("O"))
+    # 获取因子数据的版本, 数据改变后版本随之改变, 用于结果缓存的失效判断, 返回 None 表示无法确定版本
+    def getFactorDataVersion(self, ifactor_name, args={}):
+        return None
     # 获取 ID 序列
     def getID(self, ifactor_name=None, idt=None, args={}):
         return []
@@ -475,71 +968,67 @@ class FactorTable(__QS_Object__):
         return self.__QS_calcData__(raw_data=self.__QS_prepareRawData__(factor_names=factor_names, ids=ids, dts=dts, args=args), factor_names=factor_names, ids=ids, dts=dts, args=args)
     # ------------------------------------遍历模式------------------------------------
     def _readData_FactorCacheMode(self, factor_names, ids, dts, args={}):
-        self.ErgodicMode._FactorReadNum[factor_names] += 1
         if (self.ErgodicMode.MaxFactorCacheNum<=0) or (not self.ErgodicMode._CacheDTs) or (dts[0]<self.ErgodicMode._CacheDTs[0]) or (dts[-1]>self.ErgodicMode._CacheDTs[-1]):
             #print("超出缓存区读取: "+str(factor_names))# debug
             return self.__QS_calcData__(raw_data=self.__QS_prepareRawData__(factor_names=factor_names, ids=ids, dts=dts, args=args), factor_names=factor_names, ids=ids, dts=dts, args=args)
+        Policy = self.ErgodicMode._CachePolicy
+        FactorSize = (self.ErgodicMode.ForwardPeriod + self.ErgodicMode.BackwardPeriod + 1) * len(self.ErgodicMode._IDs) * np.dtype(np.float64).itemsize# 单个因子缓冲数据的字节数
         Data = {}
         DataFactorNames = []
-        CacheFactorNames = set()
+        CacheFactorNames = []
         PopFactorNames = []
         for iFactorName in factor_names:
             iFactorData = self.ErgodicMode._CacheData.get(iFactorName)
-            if iFactorData is None:# 尚未进入缓存
-                if self.ErgodicMode._CacheFactorNum<self.ErgodicMode.MaxFactorCacheNum:# 当前缓存因子数小于最大缓存因子数，那么将该因子数据读入缓存
-                    self.ErgodicMode._CacheFactorNum += 1
-                    CacheFactorNames.add(iFactorName)
-                else:# 当前缓存因子数等于最大缓存因子数，那么将检查最小读取次数的因子
-                    CacheFactorReadNum = self.ErgodicMode._FactorReadNum[self.ErgodicMode._CacheData.keys()]
-                    MinReadNumInd = CacheFactorReadNum.argmin()
-                    if CacheFactorReadNum.loc[MinReadNumInd]<self.ErgodicMode._FactorReadNum[iFactorName]:# 当前读取的因子的读取次数超过了缓存因子读取次数的最小值，缓存该因子数据
-                        CacheFactorNames.add(iFactorName)
-                        PopFactor = MinReadNumInd
-                        self.ErgodicMode._CacheData.pop(PopFactor)
-                        PopFactorNames.append(PopFactor)
-                    else:
-                        DataFactorNames.append(iFactorName)
-            else:
+            if iFactorData is not None:
+                Policy.hit(iFactorName)
                 Data[iFactorName] = iFactorData
-        CacheFactorNames = list(CacheFactorNames)
+                continue
+            # 尚未进入缓存, 由淘汰策略决定是否缓存该因子数据以及需要淘汰的因子
+            iPopFactorNames = Policy.admit(iFactorName, FactorSize)
+            if iPopFactorNames is None:
+                DataFactorNames.append(iFactorName)
+                continue
+            CacheFactorNames.append(iFactorName)
+            for jFactorName in iPopFactorNames:
+                self.ErgodicMode._CacheData.pop(jFactorName, None)
+                PopFactorNames.append(jFactorName)
+                if jFactorName in CacheFactorNames:# 本次刚进入缓存的因子又被淘汰
+                    CacheFactorNames.remove(jFactorName)
+                    DataFactorNames.append(jFactorName)
         if CacheFactorNames:
             #print("尚未进入缓存区读取: "+str(CacheFactorNames))# debug
-            iData = dict(self.__QS_calcData__(raw_data=self.__QS_prepareRawData__(factor_names=CacheFactorNames, ids=self.ErgodicMode._IDs, dts=self.ErgodicMode._CacheDTs, args=args), factor_names=CacheFactorNames, ids=self.ErgodicMode._IDs, dts=self.ErgodicMode._CacheDTs, args=args))
+            iData = dict(_readCacheData(self, CacheFactorNames, self.ErgodicMode._IDs, self.ErgodicMode._CacheDTs, args=args))
             Data.update(iData)
             self.ErgodicMode._CacheData.update(iData)
-        self.ErgodicMode._Queue2SubProcess.put((None, (CacheFactorNames, PopFactorNames)))
+            for iFactorName in CacheFactorNames: Policy.resize(iFactorName, QSCacheBudget.getDataSize(iData[iFactorName]))
+        if CacheFactorNames or PopFactorNames: self.ErgodicMode._Queue2SubProcess.put((None, (CacheFactorNames, PopFactorNames)))
         Data = pd.Panel(Data)
         if Data.shape[0]>0: Data = Data.loc[:, dts, ids]
         if not DataFactorNames: return Data.loc[factor_names]
         #print("超出缓存区因子个数读取: "+str(DataFactorNames))# debug
         return self.__QS_calcData__(raw_data=self.__QS_prepareRawData__(factor_names=DataFactorNames, ids=ids, dts=dts, args=args), factor_names=DataFactorNames, ids=ids, dts=dts, args=args).join(Data).loc[factor_names]
     def _readIDData(self, iid, factor_names, dts, args={}):
-        self.ErgodicMode._IDReadNum[iid] = self.ErgodicMode._IDReadNum.get(iid, 0) + 1
         if (self.ErgodicMode.MaxIDCacheNum<=0) or (not self.ErgodicMode._CacheDTs) or (dts[0] < self.ErgodicMode._CacheDTs[0]) or (dts[-1] >self.ErgodicMode._CacheDTs[-1]):
             return self.__QS_calcData__(raw_data=self.__QS_prepareRawData__(factor_names=factor_names, ids=[iid], dts=dts, args=args), factor_names=factor_names, ids=[iid], dts=dts, args=args).iloc[:, :, 0]
         IDData = self.ErgodicMode._CacheData.get(iid)
-        if IDData is None:# 尚未进入缓存
-            if self.ErgodicMode._CacheIDNum<self.ErgodicMode.MaxIDCacheNum:# 当前缓存 ID 数小于最大缓存 ID 数，那么将该 ID 数据读入缓存
-                self.ErgodicMode._CacheIDNum += 1
-                IDData = self.__QS_calcData__(raw_data=self.__QS_prepareRawData__(factor_names=self.FactorNames, ids=[iid], dts=self.ErgodicMode._CacheDTs, args=args), factor_names=self.FactorNames, ids=[iid], dts=self.ErgodicMode._CacheDTs, args=args).iloc[:, :, 0]
-                self.ErgodicMode._CacheData[iid] = IDData
-                self.ErgodicMode._Queue2SubProcess.put((None, (iid, None)))
-            else:# 当前缓存 ID 数等于最大缓存 ID 数，那么将检查最小读取次数的 ID
-                CacheIDReadNum = self.ErgodicMode._IDReadNum[self.ErgodicMode._CacheData.keys()]
-                MinReadNumInd = CacheIDReadNum.argmin()
-                if CacheIDReadNum.loc[MinReadNumInd]<self.ErgodicMode._IDReadNum[iid]:# 当前读取的 ID 的读取次数超过了缓存 ID 读取次数的最小值，缓存该 ID 数据
-                    IDData = self.__QS_calcData__(raw_data=self.__QS_prepareRawData__(factor_names=self.FactorNames, ids=[iid], dts=self.ErgodicMode._CacheDTs, args=args), factor_names=self.FactorNames, ids=[iid], dts=self.ErgodicMode._CacheDTs, args=args).iloc[:, :, 0]
-                    PopID = MinReadNumInd
-                    self.ErgodicMode._CacheData.pop(PopID)
-                    self.ErgodicMode._CacheData[iid] = IDData
-                    self.ErgodicMode._Queue2SubProcess.put((None, (iid, PopID)))
-                else:# 当前读取的 ID 的读取次数没有超过缓存 ID 读取次数的最小值, 放弃缓存该 ID 数据
-                    return self.__QS_calcData__(raw_data=self.__QS_prepareRawData__(factor_names=factor_names, ids=[iid], dts=dts, args=args), factor_names=factor_names, ids=[iid], dts=dts, args=args).iloc[:, :, 0]
+        if IDData is not None:
+            self.ErgodicMode._CachePolicy.hit(iid)
+            return IDData.loc[dts, factor_names]
+        # 尚未进入缓存, 由淘汰策略决定是否缓存该 ID 数据以及需要淘汰的 ID
+        IDSize = (self.ErgodicMode.ForwardPeriod + self.ErgodicMode.BackwardPeriod + 1) * len(self.FactorNames) * np.dtype(np.float64).itemsize# 单个 ID 缓冲数据的字节数
+        PopIDs = self.ErgodicMode._CachePolicy.admit(iid, IDSize)
+        if PopIDs is None:# 放弃缓存该 ID 数据
+            return self.__QS_calcData__(raw_data=self.__QS_prepareRawData__(factor_names=factor_names, ids=[iid], dts=dts, args=args), factor_names=factor_names, ids=[iid], dts=dts, args=args).iloc[:, :, 0]
+        IDData = _readCacheData(self, self.FactorNames, [iid], self.ErgodicMode._CacheDTs, args=args).iloc[:, :, 0]
+        for iPopID in PopIDs: self.ErgodicMode._CacheData.pop(iPopID, None)
+        self.ErgodicMode._CacheData[iid] = IDData
+        self.ErgodicMode._CachePolicy.resize(iid, QSCacheBudget.getDataSize(IDData))
+        self.ErgodicMode._Queue2SubProcess.put((None, (iid, PopIDs)))
         return IDData.loc[dts, factor_names]
     def _readData_ErgodicMode(self, factor_names, ids, dts, args={}):
         if self.ErgodicMode.CacheMode=="因子": return self._readData_FactorCacheMode(factor_names=factor_names, ids=ids, dts=dts, args=args)
         return pd.Panel({iID: self._readIDData(iID, factor_names=factor_names, dts=dts, args=args) for iID in ids}).swapaxes(0, 2)
-    # 启动遍历模式, dts: 遍历的时间点序列或者迭代器
+    # 启动遍历模式, dts: 遍历的时间点序列或者迭代器, cache_budget: 多个缓冲区共享的内存预算, QSCacheBudget 对象
     def start(self, dts, **kwargs):
         if self.ErgodicMode._isStarted: return 0
         self.ErgodicMode._DateTimes = np.array((self.getDateTime() if not self.ErgodicMode.ErgodicDTs else self.ErgodicMode.ErgodicDTs), dtype="O")
@@ -550,23 +1039,24 @@ class FactorTable(__QS_Object__):
         self.ErgodicMode._DTNum = self.ErgodicMode._DateTimes.shape[0]# 时点数
         self.ErgodicMode._CacheDTs = []# 缓冲的时点序列
         self.ErgodicMode._CacheData = {}# 当前缓冲区
-        self.ErgodicMode._CacheFactorNum = 0# 当前缓存因子个数, 小于等于 self.MaxFactorCacheNum
-        self.ErgodicMode._CacheIDNum = 0# 当前缓存ID个数, 小于等于 self.MaxIDCacheNum
-        self.ErgodicMode._FactorReadNum = pd.Series(0, index=self.FactorNames)# 因子读取次数, pd.Series(读取次数, index=self.FactorNames)
-        self.ErgodicMode._IDReadNum = pd.Series()# ID读取次数, pd.Series(读取次数, index=self.FactorNames)
+        # 缓冲区的淘汰策略, 缓存数据总量不超过缓冲区大小, 缓存个数不超过最大缓冲因子数或者最大缓冲ID数
+        MaxCacheNum = (self.ErgodicMode.MaxFactorCacheNum if self.ErgodicMode.CacheMode=="因子" else self.ErgodicMode.MaxIDCacheNum)
+        PolicyClass = {"LFU": _LFUPolicy, "LRU": _LRUPolicy, "ARC": _ARCPolicy}[self.ErgodicMode.CachePolicy]
+        self.ErgodicMode._CachePolicy = PolicyClass(int(self.ErgodicMode.CacheSize*2**20), MaxCacheNum, kwargs.get("cache_budget", None))
         self.ErgodicMode._Queue2SubProcess = Queue()# 主进程向数据准备子进程发送消息的管道
         self.ErgodicMode._Queue2MainProcess = Queue()# 数据准备子进程向主进程发送消息的管道
         if self.ErgodicMode.CacheSize>0:
+            # 双缓冲: 主进程读取其中一个缓冲区时, 子进程向另一个缓冲区写入下一个窗口的数据
             if os.name=="nt":
-                self.ErgodicMode._TagName = str(uuid.uuid1())# 共享内存的 tag
+                self.ErgodicMode._TagName = [str(uuid.uuid1()), str(uuid.uuid1())]# 共享内存的 tag
                 self._MMAPCacheData = None
             else:
                 self.ErgodicMode._TagName = None# 共享内存的 tag
-                self._MMAPCacheData = mmap.mmap(-1, int(self.ErgodicMode.CacheSize*2**20))# 当前共享内存缓冲区
+                self._MMAPCacheData = [mmap.mmap(-1, int(self.ErgodicMode.CacheSize*2**20)) for i in range(2)]# 共享内存缓冲区
             if self.ErgodicMode.CacheMode=="因子": self.ErgodicMode._CacheDataProcess = Process(target=_prepareMMAPFactorCacheData, args=(self, self._MMAPCacheData), daemon=True)
             else: self.ErgodicMode._CacheDataProcess = Process(target=_prepareMMAPIDCacheData, args=(self, self._MMAPCacheData), daemon=True)
             self.ErgodicMode._CacheDataProcess.start()
-            if os.name=="nt": self._MMAPCacheData = mmap.mmap(-1, int(self.ErgodicMode.CacheSize*2**20), tagname=self.ErgodicMode._TagName)# 当前共享内存缓冲区
+            if os.name=="nt": self._MMAPCacheData = [mmap.mmap(-1, int(self.ErgodicMode.CacheSize*2**20), tagname=iTagName) for iTagName in self.ErgodicMode._TagName]# 共享内存缓冲区
         self.ErgodicMode._isStarted = True
         return 0
     # 时间点向前移动, idt: 时间点, datetime.dateime
@@ -576,15 +1066,9 @@ class FactorTable(__QS_Object__):
         PreInd = self.ErgodicMode._CurInd
         self.ErgodicMode._CurInd = PreInd + np.sum(self.ErgodicMode._DateTimes[PreInd+1:]<=idt)
         if (self.ErgodicMode.CacheSize>0) and (self.ErgodicMode._CurInd>-1) and ((not self.ErgodicMode._CacheDTs) or (self.ErgodicMode._DateTimes[self.ErgodicMode._CurInd]>self.ErgodicMode._CacheDTs[-1])):# 需要读入缓冲区的数据
-            self.ErgodicMode._Queue2SubProcess.put((None, None))
-            DataLen = self.ErgodicMode._Queue2MainProcess.get()
-            CacheData = b""
-            while DataLen>0:
-                self._MMAPCacheData.seek(0)
-                CacheData += self._MMAPCacheData.read(DataLen)
-                self.ErgodicMode._Queue2SubProcess.put(DataLen)
-                DataLen = self.ErgodicMode._Queue2MainProcess.get()
-            self.ErgodicMode._CacheData = pickle.loads(CacheData)
+            self.ErgodicMode._Queue2SubProcess.put((None, None))# 子进程已预先准备好数据时立即返回, 只需切换缓冲区
+            BufferInd, Header = self.ErgodicMode._Queue2MainProcess.get()
+            self.ErgodicMode._CacheData = _loadMMAPCacheData(Header, self._MMAPCacheData[BufferInd])
             if self.ErgodicMode._CurInd==PreInd+1:# 没有跳跃, 连续型遍历
                 self.ErgodicMode._Queue2SubProcess.put((self.ErgodicMode._CurInd, None))
                 self.ErgodicMode._CacheDTs = self.ErgodicMode._DateTimes[max((0, self.ErgodicMode._CurInd-self.ErgodicMode.BackwardPeriod)):min((self.ErgodicMode._DTNum, self.ErgodicMode._CurInd+self.ErgodicMode.ForwardPeriod+1))].tolist()
@@ -598,7 +1082,8 @@ class FactorTable(__QS_Object__):
     # 结束遍历模式
     def end(self):
         if not self.ErgodicMode._isStarted: return 0
-        self.ErgodicMode._CacheData, self.ErgodicMode._FactorReadNum, self.ErgodicMode._IDReadNum = None, None, None
+        self.ErgodicMode._CacheData = None# 保留 _CachePolicy 以便结束后查看缓冲区的统计信息
+        self.ErgodicMode._CachePolicy.release()
         self.ErgodicMode._Queue2SubProcess.put(None)
         self.ErgodicMode._Queue2SubProcess = self.ErgodicMode._Queue2MainProcess = self.ErgodicMode._CacheDataProcess = None
         self.ErgodicMode._isStarted = False
@@ -644,11 +1129,80 @@ class FactorTable(__QS_Object__):
         for iFactor in factors:
             iFactor._OperationMode = self.OperationMode
             if (not isinstance(iFactor.Name, str)) or (iFactor.Name=="") or (iFactor is not factor_dict.get(iFactor.Name, iFactor)):# 该因子命名错误或者未命名, 或者有因子重名
-                iFactor.Name = genAvailableName("TempFactor", factor_dict)
+                iName = iFactor.Signature# 优先以签名作为因子名, 使得相同的运算在不同的运行中有相同的名字
+                if (iName is None) or (iFactor is not factor_dict.get(iName, iFactor)): iName = genAvailableName("TempFactor", factor_dict)
+                iFactor.Name = iName
             factor_dict[iFactor.Name] = iFactor
             self.OperationMode._FactorID[iFactor.Name] = len(factor_dict)
             factor_dict.update(self._genFactorDict(iFactor.Descriptors, factor_dict))
         return factor_dict
+    # 合并运算图中的公共子表达式, 规范化标识相同且准备原始数据的截面相同的描述子只保留一个因子对象, 返回: (因子对象, 规范化标识)
+    # factor_keys: {规范化标识: 因子对象}, 合并后衍生因子的描述子列表被替换为规范化的因子对象, 运算结束后由 _restoreMergedFactor 恢复
+    def _mergeFactor(self, factor, prepare_ids, factor_keys):
+        Descriptors, DescriptorKeys = factor.Descriptors, []
+        if Descriptors:
+            DescriptorSection = getattr(factor, "DescriptorSection", None)
+            if not DescriptorSection: DescriptorSection = [None]*len(Descriptors)
+            NewDescriptors = []
+            for i, iDescriptor in enumerate(Descriptors):
+                iPrepareIDs = (prepare_ids if DescriptorSection[i] is None else DescriptorSection[i])
+                iDescriptor, iKey = self._mergeFactor(iDescriptor, iPrepareIDs, factor_keys)
+                NewDescriptors.append(iDescriptor)
+                DescriptorKeys.append(iKey)
+            if any((iNewDescriptor is not iDescriptor) for iNewDescriptor, iDescriptor in zip(NewDescriptors, Descriptors)):
+                self.OperationMode._MergedDescriptors.append((factor, Descriptors))
+                factor._Descriptors = NewDescriptors
+        Key = factor._QS_genOperationKey(DescriptorKeys)
+        if Key is None:# 无法识别的因子以签名作为标识, 没有签名的以对象本身作为标识
+            Signature = factor.Signature
+            Key = (("Signature", Signature) if Signature is not None else ("id", id(factor)))
+        Key = (Key, _genArgKey(prepare_ids))
+        return (factor_keys.setdefault(Key, factor), Key)
+    # 恢复合并公共子表达式时被替换的描述子列表, 使得用户的因子对象在运算之后保持不变
+    def _restoreMergedFactor(self):
+        for iFactor, iDescriptors in reversed(self.OperationMode._MergedDescriptors): iFactor._Descriptors = iDescriptors
+        self.OperationMode._MergedDescriptors = []
+        return 0
+    # 生成运算图的调度顺序, 描述子先于其衍生因子, 需要多进程同步的因子(截面运算, 面板运算)在没有其他可计算的因子时才调度
+    # 调度顺序只依赖于因子字典的顺序, 因而在所有进程中都相同, 保证各进程以相同的顺序到达同步点
+    def _genOperationSchedule(self):
+        Factors = list(self.OperationMode._FactorDict.values())
+        Dependents, InDegree = {}, {}# {id(描述子): [依赖于该描述子的因子]}, {id(因子): 未调度的描述子个数}
+        for iFactor in Factors:
+            iDescriptorIDs = {id(jDescriptor) for jDescriptor in iFactor.Descriptors}
+            InDegree[id(iFactor)] = len(iDescriptorIDs)
+            for jDescriptorID in iDescriptorIDs: Dependents.setdefault(jDescriptorID, []).append(iFactor)
+        Ready = [iFactor for iFactor in Factors if InDegree[id(iFactor)]==0]
+        Schedule = []
+        while Ready:
+            for i, iFactor in enumerate(Ready):
+                if iFactor.Name not in self.OperationMode._Event: break
+            else:
+                i = 0
+            iFactor = Ready.pop(i)
+            Schedule.append(iFactor)
+            for jFactor in Dependents.get(id(iFactor), []):
+                InDegree[id(jFactor)] -= 1
+                if InDegree[id(jFactor)]==0: Ready.append(jFactor)
+        return Schedule
+    # 从结果缓存中读取目标衍生因子的数据, 命中缓存的因子替换为以缓存数据构造的数据因子, 不再准备其描述子的原始数据
+    def _loadResultCache(self):
+        self.OperationMode._ResultCacheKeys = {}
+        Cache = self.OperationMode.ResultCache
+        if Cache is None: return 0
+        IDs, DTs = list(self.OperationMode.IDs), list(self.OperationMode.DateTimes)
+        for i, iFactor in enumerate(self.OperationMode._Factors):
+            if not iFactor.Descriptors: continue
+            iKey = Cache.genKey(iFactor, IDs, DTs, dt_ruler=list(self.OperationMode.DTRuler), section_ids=self.OperationMode.SectionIDs)
+            iData = Cache.read(iKey, ids=IDs, dts=DTs)
+            if iData is None:
+                if iKey is not None: self.OperationMode._ResultCacheKeys[iFactor.Name] = iKey
+                continue
+            iFactor = DataFactor(name=iFactor.Name, data=iData, sys_args={"数据类型": "double"}, logger=iFactor._QS_Logger)
+            iFactor._OperationMode = self.OperationMode
+            self.OperationMode._Factors[i] = iFactor
+            self.OperationMode._FactorDict[iFactor.Name] = iFactor
+        return 0
     def _initOperation(self):
         # 检查时点, ID 序列的合法性
         if not self.OperationMode.DateTimes: raise __QS_Error__("运算时点序列不能为空!")
@@ -671,6 +1225,11 @@ class FactorTable(__QS_Object__):
             self.OperationMode._Factors.append(iFactor)
             self.OperationMode._FactorDict[iFactorName] = iFactor
             self.OperationMode._FactorID[iFactorName] = i
+        self._loadResultCache()
+        FactorKeys = {}# {规范化标识: 因子对象}
+        self._restoreMergedFactor()
+        for iFactor in self.OperationMode._Factors:
+            self._mergeFactor(iFactor, self.OperationMode.SectionIDs, FactorKeys)
         self.OperationMode._FactorDict = self._genFactorDict(self.OperationMode._Factors, self.OperationMode._FactorDict)
         # 分配每个子进程的计算 ID 序列, 生成原始数据和缓存数据存储目录
         self.OperationMode._Event = {}# {因子名: (Sub2MainQueue, Event)}, 用于多进程同步的 Event 数据
@@ -703,6 +1262,12 @@ class FactorTable(__QS_Object__):
         self.OperationMode._FactorPrepareIDs = {}# {因子名: 需要准备原始数据的 ID 序列}
         for iFactor in self.OperationMode._Factors:
             iFactor._QS_initOperation(self.OperationMode.DateTimes[0], self.OperationMode._FactorStartDT, self.OperationMode.SectionIDs, self.OperationMode._FactorPrepareIDs)
+        for iFactor in self.OperationMode._FactorDict.values(): iFactor._QS_initCacheData()
+        # 生成每个因子在每个进程的缓存数据准备完成的通知
+        if self.OperationMode.SubProcessNum==0:
+            self.OperationMode._ReadyEvent = {}
+        else:
+            self.OperationMode._ReadyEvent = {(iFactorName, iPID): Event() for iFactorName in self.OperationMode._FactorDict for iPID in self.OperationMode._PIDs}
     def _prepare(self, factor_names, ids, dts):
         self.OperationMode.FactorNames = factor_names
         self.OperationMode.DateTimes = dts
@@ -769,52 +1334,114 @@ class FactorTable(__QS_Object__):
         self.OperationMode._isStarted = False
         for iFactorName, iFactor in self.OperationMode._FactorDict.items():
             iFactor._exit()
+        self._restoreMergedFactor()
         return 0
+    # 增量计算模式下生成需要计算的时点, 并以目标因子库中已有的数据作为迭代型运算因子的初始值
+    # 返回: (需要计算的时点序列, [(因子, 原初始值)]), 只要有一个因子在目标因子库中没有数据, 则所有时点都需要计算
+    # 迭代型运算因子的初始值只能从目标因子库中读取, 运算图中含有非目标因子的迭代型运算时无法增量计算
+    def _genIncrementalInfo(self, factor_names, ids, dts, factor_db, table_name, specific_target):
+        TargetInfo, LastDT = [], None
+        for iFactorName in factor_names:
+            iDB, iTableName, iTargetFactorName = specific_target.get(iFactorName, (None, None, None))
+            if iDB is None: iDB = factor_db
+            if iTableName is None: iTableName = table_name
+            if iTargetFactorName is None: iTargetFactorName = iFactorName
+            if iTableName not in iDB.TableNames: return (dts, [])
+            iFT = iDB.getTable(iTableName)
+            if iTargetFactorName not in iFT.FactorNames: return (dts, [])
+            iDTs = iFT.getDateTime(ifactor_name=iTargetFactorName)
+            if not iDTs: return (dts, [])
+            TargetInfo.append((self.getFactor(iFactorName), iFT, iTargetFactorName, iDTs))
+            LastDT = (iDTs[-1] if LastDT is None else min(LastDT, iDTs[-1]))
+        NewDTs = [iDT for iDT in dts if iDT>LastDT]
+        if not NewDTs: return (NewDTs, [])
+        TargetIDs = {id(iInfo[0]) for iInfo in TargetInfo}
+        Factors, Visited = [iInfo[0] for iInfo in TargetInfo], set()
+        while Factors:
+            iFactor = Factors.pop()
+            if id(iFactor) in Visited: continue
+            Visited.add(id(iFactor))
+            if (id(iFactor) not in TargetIDs) and _isRecursiveFactor(iFactor): raise __QS_Error__("因子 '%s' 是迭代型运算, 但不是目标因子, 无法以已有的数据作为初始值, 不支持增量计算!" % iFactor.Name)
+            Factors.extend(iFactor.Descriptors)
+        InitData = []
+        try:
+            for iFactor, iFT, iTargetFactorName, iDTs in TargetInfo:
+                if (iFactor.FactorTable is not None) or (not _isRecursiveFactor(iFactor)): continue
+                # 扩张窗口需要已有的全部数据, 滚动窗口只需要自身回溯期数的数据
+                iInitDTs = [iDT for iDT in iDTs if iDT<NewDTs[0]]
+                if iFactor.iLookBackMode!="扩张窗口": iInitDTs = iInitDTs[-iFactor.iLookBack:]
+                if not iInitDTs: continue
+                iInitData = iFT.readData(factor_names=[iTargetFactorName], ids=ids, dts=iInitDTs).iloc[0]
+                if iFactor.iInitData is not None:# 保留早于已有数据的初始值
+                    iInitData = pd.concat([iFactor.iInitData.loc[iFactor.iInitData.index<iInitDTs[0]], iInitData], axis=0)
+                InitData.append((iFactor, iFactor.iInitData))
+                iFactor.iInitData = iInitData
+        except:
+            for iFactor, iInitData in InitData: iFactor.iInitData = iInitData
+            raise
+        return (NewDTs, InitData)
     # 计算因子数据并写入因子库
+    # 增量计算模式(incremental=True): 只计算目标因子库中已有数据之后的时点, 中间因子所需的回溯数据由时点标尺提供, 迭代型的时间序列运算因子以已有的数据作为初始值
+    # io_thread_num: 每个进程准备原始数据的线程数, 不同因子库以及支持线程独立连接的同一因子库的不同因子表的原始数据并发准备
+    # result_cache: 结果缓存对象, 命中缓存的目标因子不再计算, 串行模式下未命中的目标因子计算之后写入缓存
     def write2FDB(self, factor_names, ids, dts, factor_db, table_name, if_exists="update", subprocess_num=cpu_count()-1, dt_ruler=None, section_ids=None, specific_target={}, **kwargs):
         if not isinstance(factor_db, WritableFactorDB): raise __QS_Error__("因子数据库: %s 不可写入!" % factor_db.Name)
-        print("==========因子运算==========", "1. 原始数据准备", sep="\n", end="\n")
-        TotalStartT = time.perf_counter()
-        self.OperationMode.SubProcessNum = subprocess_num
-        self.OperationMode.DTRuler = (dts if dt_ruler is None else dt_ruler)
-        self.OperationMode.SectionIDs = section_ids
-        self._prepare(factor_names, ids, dts)
-        print(("耗时 : %.2f" % (time.perf_counter()-TotalStartT, )), "2. 因子数据计算", end="\n", sep="\n")
-        StartT = time.perf_counter()
-        Args = {"FT":self, "PID":"0", "FactorDB":factor_db, "TableName":table_name, "if_exists":if_exists, "specific_target": specific_target}
-        if self.OperationMode.SubProcessNum==0:
-            _calculate(Args)
-        else:
-            nPrcs = len(self.OperationMode._PIDs)
-            nTask = len(self.OperationMode._Factors) * nPrcs
-            EventState = {iFactorName:0 for iFactorName in self.OperationMode._Event}
-            Procs, Main2SubQueue, Sub2MainQueue = startMultiProcess(pid="0", n_prc=nPrcs, target_fun=_calculate, arg=Args,
-                                                                    main2sub_queue="None", sub2main_queue="Single")
-            iProg = 0
-            with ProgressBar(max_value=nTask) as ProgBar:
-                while True:
-                    nEvent = len(EventState)
-                    if nEvent>0:
-                        FactorNames = tuple(EventState.keys())
-                        for iFactorName in FactorNames:
-                            iQueue = self.OperationMode._Event[iFactorName][0]
-                            while not iQueue.empty():
-                                jInc = iQueue.get()
-                                EventState[iFactorName] += jInc
-                            if EventState[iFactorName]>=nPrcs:
-                                self.OperationMode._Event[iFactorName][1].set()
-                                EventState.pop(iFactorName)
-                    while ((not Sub2MainQueue.empty()) or (nEvent==0)) and (iProg<nTask):
-                        iPID, iSubProg, iMsg = Sub2MainQueue.get()
-                        iProg += iSubProg
-                        ProgBar.update(iProg)
-                    if iProg>=nTask: break
-            for iPID, iPrcs in Procs.items(): iPrcs.join()
-        print(("耗时 : %.2f" % (time.perf_counter()-StartT, )), "3. 清理缓存", end="\n", sep="\n")
-        StartT = time.perf_counter()
-        factor_db.connect()
-        self._exit()
-        print(('耗时 : %.2f' % (time.perf_counter()-StartT, )), ("总耗时 : %.2f" % (time.perf_counter()-TotalStartT, )), "="*28, sep="\n", end="\n")
+        InitData = []
+        if kwargs.get("incremental", False):
+            if if_exists=="replace": raise __QS_Error__("增量计算模式不支持替换已有的数据!")
+            if dt_ruler is None: dt_ruler = dts
+            dts, InitData = self._genIncrementalInfo(factor_names, ids, dts, factor_db, table_name, specific_target)
+            if not dts:
+                print("==========因子运算==========", "没有需要增量计算的时点", "="*28, sep="\n", end="\n")
+                return 0
+        try:
+            print("==========因子运算==========", "1. 原始数据准备", sep="\n", end="\n")
+            TotalStartT = time.perf_counter()
+            self.OperationMode.SubProcessNum = subprocess_num
+            self.OperationMode.IOThreadNum = kwargs.get("io_thread_num", self.OperationMode.IOThreadNum)
+            self.OperationMode.ResultCache = kwargs.get("result_cache", self.OperationMode.ResultCache)
+            self.OperationMode.DTRuler = (dts if dt_ruler is None else dt_ruler)
+            self.OperationMode.SectionIDs = section_ids
+            self._prepare(factor_names, ids, dts)
+            print(("耗时 : %.2f" % (time.perf_counter()-TotalStartT, )), "2. 因子数据计算", end="\n", sep="\n")
+            StartT = time.perf_counter()
+            Args = {"FT":self, "PID":"0", "FactorDB":factor_db, "TableName":table_name, "if_exists":if_exists, "specific_target": specific_target}
+            if self.OperationMode.SubProcessNum==0:
+                _calculate(Args)
+            else:
+                nPrcs = len(self.OperationMode._PIDs)
+                nTask = len(self.OperationMode._Factors) * nPrcs
+                EventState = {iFactorName:0 for iFactorName in self.OperationMode._Event}
+                Procs, Main2SubQueue, Sub2MainQueue = startMultiProcess(pid="0", n_prc=nPrcs, target_fun=_calculate, arg=Args,
+                                                                        main2sub_queue="None", sub2main_queue="Single")
+                iProg = 0
+                with ProgressBar(max_value=nTask) as ProgBar:
+                    while True:
+                        nEvent = len(EventState)
+                        if nEvent>0:
+                            FactorNames = tuple(EventState.keys())
+                            for iFactorName in FactorNames:
+                                iQueue = self.OperationMode._Event[iFactorName][0]
+                                while not iQueue.empty():
+                                    jInc = iQueue.get()
+                                    EventState[iFactorName] += jInc
+                                if EventState[iFactorName]>=nPrcs:
+                                    self.OperationMode._Event[iFactorName][1].set()
+                                    EventState.pop(iFactorName)
+                        while ((not Sub2MainQueue.empty()) or (nEvent==0)) and (iProg<nTask):
+                            iPID, iSubProg, iMsg = Sub2MainQueue.get()
+                            iProg += iSubProg
+                            ProgBar.update(iProg)
+                        if iProg>=nTask: break
+                for iPID, iPrcs in Procs.items(): iPrcs.join()
+            print(("耗时 : %.2f" % (time.perf_counter()-StartT, )), "3. 清理缓存", end="\n", sep="\n")
+            StartT = time.perf_counter()
+            factor_db.connect()
+            self._exit()
+            print(('耗时 : %.2f' % (time.perf_counter()-StartT, )), ("总耗时 : %.2f" % (time.perf_counter()-TotalStartT, )), "="*28, sep="\n", end="\n")
+        finally:
+            self._restoreMergedFactor()
+            for iFactor, iInitData in InitData: iFactor.iInitData = iInitData
         return 0
 
 # 自定义因子表
@@ -1000,6 +1627,77 @@ def _BinaryOperator(f, idt, iid, x, args):
     elif OperatorType=="!=": return (Data1 != Data2)
     else: raise __QS_Error__("尚不支持的多因子运算符: %s" % OperatorType)
 
+# 生成参数值的可哈希标识, 用于运算图中公共子表达式的识别, 无法识别的对象(函数, DataFrame 等)以对象本身的 id 作为标识
+def _genArgKey(arg):
+    if isinstance(arg, (str, int, float, bool, type(None), dt.datetime, dt.date, dt.timedelta)): return arg
+    elif isinstance(arg, dict): return ("dict", tuple(sorted(((_genArgKey(iKey), _genArgKey(iVal)) for iKey, iVal in arg.items()), key=repr)))
+    elif isinstance(arg, (list, tuple)): return ("list", tuple(_genArgKey(iVal) for iVal in arg))
+    else: return ("id", id(arg))
+# 生成代码对象的确定性签名
+def _genCodeSignature(code):
+    Consts = [(_genCodeSignature(iConst) if inspect.iscode(iConst) else _genArgSignature(iConst)) for iConst in code.co_consts]
+    if None in Consts: return None
+    return "code:"+code.co_code.hex()+":["+",".join(Consts)+"]:"+",".join(code.co_names)
+# 代码对象及其内部嵌套的代码对象读取的全局变量名, 不包括属性名
+def _getCodeNames(code):
+    Names = {iInstruction.argval for iInstruction in dis.get_instructions(code) if iInstruction.opname in ("LOAD_GLOBAL", "LOAD_NAME")}
+    for iConst in code.co_consts:
+        if inspect.iscode(iConst): Names.update(_getCodeNames(iConst))
+    return Names
+# 模块所在的顶层包的版本号, 没有版本号返回空字符串
+def _getModuleVersion(module_name):
+    Module = sys.modules.get(str(module_name).split(".")[0], None)
+    return str(getattr(Module, "__version__", ""))
+# 生成函数的确定性签名, 带版本号的第三方库的函数以函数名和库的版本号作为签名
+# 其他函数(包括 QuantStudio 自身和用户定义的函数)以函数名, 代码, 默认参数, 闭包变量和引用的全局变量的值作为签名, 引用了无法确定签名的全局变量时返回 None
+def _genFunctionSignature(fun, memo):
+    Key = ("function", id(fun))
+    if Key in memo: return memo[Key]
+    Name = "function:"+str(fun.__module__)+"."+fun.__qualname__
+    Version = _getModuleVersion(fun.__module__)
+    if Version and (str(fun.__module__).split(".")[0]!="QuantStudio"):
+        memo[Key] = Name+"@"+Version
+        return memo[Key]
+    memo[Key] = Name# 递归引用自身时只以函数名作为签名
+    Globals = fun.__globals__
+    GlobalNames = sorted(iName for iName in _getCodeNames(fun.__code__) if iName in Globals)
+    GlobalSigs = [_genArgSignature(Globals[iName], memo=memo) for iName in GlobalNames]
+    Sigs = [_genCodeSignature(fun.__code__), _genArgSignature(fun.__defaults__, memo=memo), _genArgSignature(fun.__kwdefaults__, memo=memo), _genArgSignature([iCell.cell_contents for iCell in (fun.__closure__ or ())], memo=memo)]
+    if (None in Sigs) or (None in GlobalSigs): memo[Key] = None
+    else: memo[Key] = Name+":("+",".join(Sigs)+"):{"+",".join((iName+"="+iSig) for iName, iSig in zip(GlobalNames, GlobalSigs))+"}"
+    return memo[Key]
+# 生成参数值的确定性签名, 跨进程和跨会话保持不变, 用于衍生因子的内容寻址命名, 无法确定签名的对象返回 None
+# memo: 一次签名生成过程中已经生成的函数和因子的签名, {(类型, id(对象)): 签名}
+def _genArgSignature(arg, memo=None):
+    if memo is None: memo = {}
+    if isinstance(arg, (str, bool, int, float, complex, bytes, type(None), dt.datetime, dt.date, dt.time, dt.timedelta)): return type(arg).__name__+":"+repr(arg)
+    elif isinstance(arg, np.generic): return _genArgSignature(arg.item())
+    elif isinstance(arg, (list, tuple, set, frozenset)):
+        Sigs = [_genArgSignature(iVal, memo=memo) for iVal in arg]
+        if None in Sigs: return None
+        if isinstance(arg, (set, frozenset)): Sigs = sorted(Sigs)
+        return type(arg).__name__+":["+",".join(Sigs)+"]"
+    elif isinstance(arg, dict):
+        Sigs = [(_genArgSignature(iKey, memo=memo), _genArgSignature(iVal, memo=memo)) for iKey, iVal in arg.items()]
+        if any((iKeySig is None) or (iValSig is None) for iKeySig, iValSig in Sigs): return None
+        return "dict:{"+",".join(sorted((iKeySig+"="+iValSig) for iKeySig, iValSig in Sigs))+"}"
+    elif isinstance(arg, np.ndarray):
+        if arg.dtype==np.dtype("O"): return _genArgSignature(arg.tolist(), memo=memo)
+        return "ndarray:%s:%s:%s" % (arg.dtype.str, arg.shape, hashlib.sha1(np.ascontiguousarray(arg).tobytes()).hexdigest())
+    elif isinstance(arg, (pd.Series, pd.DataFrame)):
+        Sigs = [_genArgSignature(arg.index.tolist(), memo=memo), _genArgSignature(arg.columns.tolist() if isinstance(arg, pd.DataFrame) else arg.name, memo=memo), _genArgSignature(arg.values, memo=memo)]
+        if None in Sigs: return None
+        return type(arg).__name__+":("+",".join(Sigs)+")"
+    elif isinstance(arg, Factor): return arg._QS_getSignature(memo)
+    elif isinstance(arg, __QS_Object__):
+        Sig = _genArgSignature(arg.Args, memo=memo)
+        return (_genArgSignature(type(arg))+":"+Sig if Sig is not None else None)
+    elif inspect.ismodule(arg): return "module:"+arg.__name__+"@"+_getModuleVersion(arg.__name__)
+    elif isinstance(arg, np.ufunc): return "ufunc:"+arg.__name__
+    elif inspect.isclass(arg) or inspect.isbuiltin(arg): return "object:"+str(getattr(arg, "__module__", ""))+"."+arg.__qualname__
+    elif inspect.isfunction(arg): return _genFunctionSignature(arg, memo)
+    else: return None
+
 # 因子
 # 因子可看做一个 DataFrame(index=[时间点], columns=[ID])
 # 时间点数据类型是 datetime.datetime, ID 的数据类型是 str
@@ -1010,7 +1708,7 @@ class Factor(__QS_Object__):
     def __init__(self, name, ft, sys_args={}, config_file=None, **kwargs):
         self._FactorTable = ft# 因子所属的因子表, None 表示衍生因子
         self._NameInFT = name# 因子在所属的因子表中的名字
-        self.Name = name# 因子对外显示的名称
+        if name is not None: self.Name = name# 因子对外显示的名称
         # 遍历模式下的对象
         self._isStarted = False# 是否启动了遍历模式
         self._CacheData = None# 遍历模式下缓存的数据
@@ -1063,6 +1761,39 @@ class Factor(__QS_Object__):
         PrepareIDs = id_dict.setdefault(self.Name, prepare_ids)
         if prepare_ids != PrepareIDs:
             raise __QS_Error__("因子 %s 指定了不同的截面!" % self.Name)
+    # 分配运算模式下的缓存数据空间, 在所有因子的运算初始化之后由主进程调用
+    def _QS_initCacheData(self):
+        return 0
+    # 运算图中因子的规范化标识, 标识相同的因子计算结果相同, descriptor_keys: 描述子的规范化标识列表, 返回 None 表示以因子对象本身作为标识
+    def _QS_genOperationKey(self, descriptor_keys):
+        if (self._FactorTable is None) or (type(self) is not Factor): return None
+        return ("Factor", id(self._FactorTable), self._NameInFT, _genArgKey(self.Args))
+    # 因子的确定性签名, 由 QuantStudio 的版本, 因子的来源, 参数和描述子生成, 跨进程和跨会话保持不变, 签名相同的因子计算结果相同; None 表示无法确定签名
+    @property
+    def Signature(self):
+        return self._QS_getSignature({})
+    # 获取签名, memo: 本次签名生成过程中已经生成的签名, 运算图中共享的因子只生成一次
+    # 签名不跨调用缓存, 因为算子引用的全局变量可能在两次调用之间改变
+    def _QS_getSignature(self, memo):
+        Key = ("factor", id(self))
+        if Key in memo: return memo[Key]
+        DescriptorSigs = tuple(iDescriptor._QS_getSignature(memo) for iDescriptor in self.Descriptors)
+        Signature = self._QS_genSignature(DescriptorSigs, memo)
+        if Signature is not None: Signature = hashlib.sha1(("QuantStudio@"+__version__+":"+Signature).encode("utf-8")).hexdigest()
+        memo[Key] = Signature
+        return Signature
+    # 生成输入数据的版本, ignore_unknown: 是否忽略无法确定的版本, 返回 None 表示无法确定版本
+    def _QS_genDataVersion(self, ignore_unknown=False):
+        Version = (self._FactorTable.getFactorDataVersion(self._NameInFT, args=self.Args) if self._FactorTable is not None else None)
+        if Version is None: return ("?" if ignore_unknown else None)
+        return str(Version)
+    # 生成签名的原始字符串, descriptor_sigs: 描述子的签名, memo: 本次签名生成过程中已经生成的签名, 返回 None 表示无法确定签名
+    def _QS_genSignature(self, descriptor_sigs, memo):
+        if (self._FactorTable is None) or (self._FactorTable.FactorDB is None) or (type(self) is not Factor): return None
+        FDB = self._FactorTable.FactorDB
+        Sigs = [_genArgSignature(type(FDB)), _genArgSignature(FDB.Args, memo=memo), _genArgSignature(self._FactorTable.Name), _genArgSignature(self._NameInFT), _genArgSignature(self.Args, memo=memo)]
+        if None in Sigs: return None
+        return "Factor("+",".join(Sigs)+")"
     # 准备缓存数据
     def __QS_prepareCacheData__(self, ids=None):
         StartDT = self._OperationMode._FactorStartDT[self.Name]
@@ -1086,10 +1817,8 @@ class Factor(__QS_Object__):
             if PrepareIDs is None: PrepareIDs = self._OperationMode._PID_IDs[self._OperationMode._iPID]
             else: PrepareIDs = partitionListMovingSampling(PrepareIDs, len(self._OperationMode._PID_IDs))[self._OperationMode._PIDs.index(self._OperationMode._iPID)]
             StdData = self._FactorTable.readData(factor_names=[self._NameInFT], ids=PrepareIDs, dts=DTs, args=self.Args).iloc[0]
-        with self._OperationMode._PID_Lock[self._OperationMode._iPID]:
-            with shelve.open(self._OperationMode._CacheDataDir+os.sep+self._OperationMode._iPID+os.sep+self.Name+str(self._OperationMode._FactorID[self.Name])) as CacheFile:
-                CacheFile["StdData"] = StdData
-                CacheFile["_QS_IDs"] = PrepareIDs
+        _saveOperationCacheData(self._OperationMode._CacheDataDir+os.sep+self._OperationMode._iPID+os.sep+self.Name+str(self._OperationMode._FactorID[self.Name]), StdData, part=self._OperationMode._iPID)
+        self._OperationMode._setCacheDataReady(self.Name, self._OperationMode._iPID)
         self._isCacheDataOK = True
         return StdData
     # 获取因子数据, pid=None表示取所有进程的数据
@@ -1111,16 +1840,10 @@ class Factor(__QS_Object__):
         else:
             StdData = None
             #IDs = []
-        while len(pids)>0:
-            iPID = pids.pop()
+        for iPID in pids:
             iFilePath = self._OperationMode._CacheDataDir+os.sep+iPID+os.sep+self.Name+str(self._OperationMode._FactorID[self.Name])
-            if not os.path.isfile(iFilePath+self._OperationMode._FileSuffix):# 该进程的数据没有准备好
-                pids.add(iPID)
-                continue
-            with self._OperationMode._PID_Lock[iPID]:
-                with shelve.open(iFilePath, 'r') as CacheFile:
-                    iStdData = CacheFile["StdData"]
-                    #IDs.extend(CacheFile.get("_QS_IDs", self._OperationMode._PID_IDs[iPID]))
+            self._OperationMode._waitCacheDataReady(self.Name, iPID)# 等待该进程的数据准备完成
+            iStdData = _loadOperationCacheData(iFilePath, dts=dts)
             if StdData is None:
                 StdData = iStdData
             else:
@@ -1346,7 +2069,7 @@ class DataFactor(Factor):
                     sys_args["数据类型"] = "string"
                 else:
                     sys_args["数据类型"] = "double"
-        elif isinstance(self, pd.DataFrame):
+        elif isinstance(data, pd.DataFrame):
             self._DataContent = "Factor"
             if "数据类型" not in sys_args: sys_args["数据类型"] = ("string" if np.dtype('O') in data.dtypes.values else "double")
         else:
@@ -1361,7 +2084,16 @@ class DataFactor(Factor):
                     else:
                         sys_args["数据类型"] = "double"
         self._Data = data
+        self._DataSignature = None# 数据的签名, 首次使用时生成
         return super().__init__(name=name, ft=None, sys_args=sys_args, config_file=None, **kwargs)
+    def _QS_genSignature(self, descriptor_sigs, memo):
+        if self._DataSignature is None: self._DataSignature = _genArgSignature(self._Data)
+        ArgSig = _genArgSignature(self.Args, memo=memo)
+        if (self._DataSignature is None) or (ArgSig is None): return None
+        return "DataFactor("+self._DataSignature+","+ArgSig+")"
+    # 数据已经包含在签名中
+    def _QS_genDataVersion(self, ignore_unknown=False):
+        return ""
     def getMetaData(self, key=None):
         if key is None: return pd.Series({"DataType":self.DataType})
         elif key=="DataType": return self.DataType
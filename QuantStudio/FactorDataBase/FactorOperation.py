@@ -1,29 +1,70 @@
 # -*- coding: utf-8 -*-
 """因子运算"""
 import os
-import shelve
+import uuid
 from multiprocessing import Queue, Event, Lock
 
 import pandas as pd
 import numpy as np
-from traits.api import Function, Dict, Enum, List, Int, Instance
+from traits.api import Function, Dict, Enum, List, Int, Instance, Bool
 
 from QuantStudio import __QS_Error__
-from QuantStudio.FactorDataBase.FactorDB import Factor
+from QuantStudio.FactorDataBase.FactorDB import Factor, FactorResultCache, _saveOperationCacheData, _allocSharedOperationCacheData, _writeSharedOperationCacheData, _genArgKey, _genArgSignature
 from QuantStudio.Tools.AuxiliaryFun import partitionList, partitionListMovingSampling
 
 def _DefaultOperator(f, idt, iid, x, args):
     return np.nan
 
+# 截面运算和面板运算按时点分配到各个进程计算, 生成结果在各个进程缓存目录下对应的 ID 序列, {PID: [ID]}
+def _genPID_IDs(f, ids):
+    if f._OperationMode._FactorPrepareIDs[f.Name] is None: return f._OperationMode._PID_IDs
+    return {f._OperationMode._PIDs[i]: iSubIDs for i, iSubIDs in enumerate(partitionListMovingSampling(ids, len(f._OperationMode._PIDs)))}
+# 截面运算和面板运算的数值型结果预先分配共享的 DT × ID 数组, 由主进程在运算初始化之后调用
+def _initSharedCacheData(f):
+    f._SharedCacheFile = None
+    if f.DataType!="double": return 0
+    IDs = f._OperationMode._FactorPrepareIDs[f.Name]
+    if IDs is None: IDs = list(f._OperationMode.IDs)
+    DTs = sum((list(f._PID_DTs[iPID]) for iPID in f._OperationMode._PIDs), [])
+    FileName = f.Name+str(f._OperationMode._FactorID[f.Name])
+    f._SharedCacheFile = f._OperationMode._CacheDataDir+os.sep+FileName+".npy"
+    PIDFiles = {iPID: f._OperationMode._CacheDataDir+os.sep+iPID+os.sep+FileName for iPID in f._OperationMode._PIDs}
+    return _allocSharedOperationCacheData(f._SharedCacheFile, DTs, IDs, PIDFiles, _genPID_IDs(f, IDs))
+# 保存截面运算和面板运算在本进程计算的结果, 数值型结果直接写入共享数组中本进程分配到的行, 其他类型的结果作为一个数据块写入各个进程的缓存目录
+def _saveSectionCacheData(f, std_data):
+    PIDs, PID = f._OperationMode._PIDs, f._OperationMode._iPID
+    if f._SharedCacheFile is not None:
+        if std_data.shape[0]==0: return 0
+        RowStart = sum(len(f._PID_DTs[iPID]) for iPID in PIDs[:PIDs.index(PID)])
+        return _writeSharedOperationCacheData(f._SharedCacheFile, std_data, RowStart)
+    FileName = f.Name+str(f._OperationMode._FactorID[f.Name])
+    for iPID, iIDs in _genPID_IDs(f, std_data.columns.tolist()).items():
+        _saveOperationCacheData(f._OperationMode._CacheDataDir+os.sep+iPID+os.sep+FileName, std_data.loc[:, iIDs], part=PID)
+    return 0
+
+# 生成滚动窗口的跨步视图, 不复制数据, data: array(shape=(window-1+n, nID)), 返回: array(shape=(n, window, nID)), 第 i 个元素为 data[i:i+window]
+def _genRollingView(data, window, n):
+    data = np.ascontiguousarray(data)
+    return np.lib.stride_tricks.as_strided(data, shape=(n, window)+data.shape[1:], strides=(data.strides[0],)+data.strides, writeable=False)
+
 class DerivativeFactor(Factor):
     Operator = Function(default_value=_DefaultOperator, arg_type="Function", label="算子", order=0)
     ModelArgs = Dict(arg_type="Dict", label="参数", order=1)
     DataType = Enum("double", "string", arg_type="SingleOption", label="数据类型", order=2)
+    ResultCache = Instance(FactorResultCache)# 结果缓存, None 表示不使用缓存
+    # name: 因子名, None 表示以签名作为因子名, 首次使用因子名时才生成签名, 无法确定签名时生成随机的因子名
     def __init__(self, name="", descriptors=[], sys_args={}, **kwargs):
         self._Descriptors = descriptors
         self.UserData = {}
         if descriptors: kwargs.setdefault("logger", descriptors[0]._QS_Logger)
-        return super().__init__(name=name, ft=None, sys_args=sys_args, config_file=None, **kwargs)
+        super().__init__(name=name, ft=None, sys_args=sys_args, config_file=None, **kwargs)
+    def _Name_default(self):
+        Signature = self.Signature
+        return (Signature if Signature is not None else str(uuid.uuid1()))
+    # 序列化之前确定因子名, 避免无法确定签名时各个进程生成不同的随机因子名
+    def __getstate__(self):
+        self.Name = self.Name
+        return super().__getstate__()
     @property
     def Descriptors(self):
         return self._Descriptors
@@ -31,6 +72,31 @@ class DerivativeFactor(Factor):
         if key is None: return pd.Series({"DataType":self.DataType})
         elif key=="DataType": return self.DataType
         return None
+    def _QS_genOperationKey(self, descriptor_keys):
+        return (type(self), _genArgKey(self.Args), tuple(descriptor_keys))
+    def _QS_genSignature(self, descriptor_sigs, memo):
+        Sigs = [_genArgSignature(type(self)), _genArgSignature(self.Args, memo=memo)]+list(descriptor_sigs)
+        if None in Sigs: return None
+        return Sigs[0]+"("+",".join(Sigs[1:])+")"
+    def _QS_genDataVersion(self, ignore_unknown=False):
+        Versions = [iDescriptor._QS_genDataVersion(ignore_unknown=ignore_unknown) for iDescriptor in self._Descriptors]
+        if None in Versions: return None
+        return "("+",".join(Versions)+")"
+    # 是否使用结果缓存
+    def _QS_useResultCache(self):
+        return (self.ResultCache is not None)
+    # 读取数据, 设置了结果缓存时先查找缓存, 未命中的计算结果写入缓存
+    def readData(self, ids, dts, **kwargs):
+        if not self._QS_useResultCache(): return self.__QS_readData__(ids=ids, dts=dts, **kwargs)
+        CacheKey = self.ResultCache.genKey(self, ids, dts, **kwargs)
+        StdData = self.ResultCache.read(CacheKey, ids=ids, dts=dts)
+        if StdData is None:
+            StdData = self.__QS_readData__(ids=ids, dts=dts, **kwargs)
+            self.ResultCache.write(CacheKey, StdData)
+        return StdData
+    # 计算数据, 由子类实现, 默认按照普通因子的方式读取
+    def __QS_readData__(self, ids, dts, **kwargs):
+        return super().readData(ids=ids, dts=dts, **kwargs)
     def start(self, dts, **kwargs):
         for iDescriptor in self._Descriptors: iDescriptor.start(dts=dts, **kwargs)
         return 0
@@ -49,11 +115,13 @@ class DerivativeFactor(Factor):
 # 如果运算时点参数为单时点, 运算ID参数为多ID, 那么 x 元素为 array(shape=(nID, )), 注意并发时 ID 并不是全截面, 返回 array(shape=(nID,))
 # 如果运算时点参数为多时点, 运算ID参数为单ID, 那么 x 元素为 array(shape=(nDT, )), 返回 array(shape=(nID, ))
 # 如果运算时点参数为多时点, 运算ID参数为多ID, 那么 x 元素为 array(shape=(nDT, nID)), 注意并发时 ID 并不是全截面, 返回 array(shape=(nDT, nID))
+# 如果向量化参数为 True, 不论运算时点和运算ID参数如何, 算子都按多时点多ID的方式只调用一次, 返回 array(shape=(nDT, nID)) 或者可以广播成该形状的数组, 适用于逐元素运算的算子
 class PointOperation(DerivativeFactor):
     """单点运算"""
     DTMode = Enum("单时点", "多时点", arg_type="SingleOption", label="运算时点", order=3)
     IDMode = Enum("单ID", "多ID", arg_type="SingleOption", label="运算ID", order=4)
-    def readData(self, ids, dts, **kwargs):
+    Vectorized = Bool(False, arg_type="Bool", label="向量化", order=5)
+    def __QS_readData__(self, ids, dts, **kwargs):
         StdData = self._calcData(ids=ids, dts=dts, descriptor_data=[iDescriptor.readData(ids=ids, dts=dts, **kwargs).values for iDescriptor in self._Descriptors])
         return pd.DataFrame(StdData, index=dts, columns=ids)
     def _QS_initOperation(self, start_dt, dt_dict, prepare_ids, id_dict):
@@ -66,7 +134,9 @@ class PointOperation(DerivativeFactor):
         else:
             if self.DataType=='double': StdData = np.full(shape=(len(dts), len(ids)), fill_value=np.nan, dtype='float')
             else: StdData = np.full(shape=(len(dts), len(ids)), fill_value=None, dtype='O')
-            if (self.DTMode=='单时点') and (self.IDMode=='单ID'):
+            if self.Vectorized:# 整块数据调用一次算子
+                StdData[:] = self.Operator(self, dts, ids, descriptor_data, self.ModelArgs)
+            elif (self.DTMode=='单时点') and (self.IDMode=='单ID'):
                 for i, iDT in enumerate(dts):
                     for j, jID in enumerate(ids):
                         StdData[i, j] = self.Operator(self, iDT, jID, [iData[i, j] for iData in descriptor_data], self.ModelArgs)
@@ -92,10 +162,8 @@ class PointOperation(DerivativeFactor):
             StdData = pd.DataFrame(StdData, index=DTs, columns=IDs)
         else:
             StdData = pd.DataFrame(index=DTs, columns=IDs, dtype=("float" if self.DataType=="double" else "O"))
-        with self._OperationMode._PID_Lock[PID]:
-            with shelve.open(self._OperationMode._CacheDataDir+os.sep+PID+os.sep+self.Name+str(self._OperationMode._FactorID[self.Name])) as CacheFile:
-                CacheFile["StdData"] = StdData
-                CacheFile["_QS_IDs"] = IDs
+        _saveOperationCacheData(self._OperationMode._CacheDataDir+os.sep+PID+os.sep+self.Name+str(self._OperationMode._FactorID[self.Name]), StdData, part=PID)
+        self._OperationMode._setCacheDataReady(self.Name, PID)
         self._isCacheDataOK = True
         return StdData
 
@@ -109,6 +177,9 @@ class PointOperation(DerivativeFactor):
 # 如果运算时点参数为单时点, 运算ID参数为多ID, 那么x元素为array(shape=(回溯期数, nID)), 注意并发时 ID 并不是全截面, 返回 array(shape=(nID, ))
 # 如果运算时点参数为多时点, 运算ID参数为单ID, 那么x元素为array(shape=(回溯期数+nDT, )), 返回 array(shape=(nDate,))
 # 如果运算时点参数为多时点, 运算ID参数为多ID, 那么x元素为array(shape=(回溯期数+nDT, nID)), 注意并发时 ID 并不是全截面, 返回 array(shape=(nDT, nID))
+# 如果流式计算参数为 True, 算子需要支持流式计算: f._iStreamState 为 None 时 x 元素包含回溯期数据, 否则 x 元素只包含新增时点的数据, 算子根据该状态计算并将新的状态写回 f._iStreamState
+# 流式计算只适用于多时点多ID, 没有自身回溯且描述子都是滚动窗口的运算, 时点连续的多次 readData 调用之间只计算新增的时点
+# 流式计算的结果不能依赖于读取的起始时点, 因此扩张窗口和指数加权等从数据起点开始累积的算子不使用流式计算
 class TimeOperation(DerivativeFactor):
     """时间序列运算"""
     DTMode = Enum("单时点", "多时点", arg_type="SingleOption", label="运算时点", order=3)
@@ -118,9 +189,30 @@ class TimeOperation(DerivativeFactor):
     iLookBack = Int(0, arg_type="Integer", label="自身回溯期数", order=7)
     iLookBackMode = Enum("滚动窗口", "扩张窗口", arg_type="SingleOption", label="自身回溯模式", order=8)
     iInitData = Instance(pd.DataFrame, arg_type="DataFrame", label="自身初始值", order=9)
+    Streaming = Bool(False, arg_type="Bool", label="流式计算", order=10)
     def __QS_initArgs__(self):
         self.LookBack = [0]*len(self._Descriptors)
         self.LookBackMode = ["滚动窗口"]*len(self._Descriptors)
+        self._StreamCache = None# 流式计算的缓存, {"IDs": [ID], "DTs": [时点], "Data": array, "State": 算子状态}
+        self._iStreamState = None# 流式计算时算子的状态
+    def _isStreamable(self):
+        return self.Streaming and (self.DTMode=="多时点") and (self.IDMode=="多ID") and (self.iLookBack==0) and (self.iLookBackMode=="滚动窗口") and all((iMode=="滚动窗口") for iMode in self.LookBackMode)
+    # 流式计算, 如果待计算的时点和上次计算的时点连续, 只计算新增的时点, 否则返回 None
+    def _readStreamData(self, ids, dt_ruler, start_ind, end_ind, **kwargs):
+        Cache = self._StreamCache
+        if (Cache is None) or (Cache["IDs"]!=list(ids)) or (Cache["DTs"][-1] not in dt_ruler): return None
+        LastInd = dt_ruler.index(Cache["DTs"][-1])
+        CacheStartInd = LastInd - len(Cache["DTs"]) + 1
+        if (CacheStartInd<0) or (start_ind<CacheStartInd) or (start_ind>LastInd+1) or (list(dt_ruler[CacheStartInd:LastInd+1])!=Cache["DTs"]): return None
+        StdData, DTs = Cache["Data"], Cache["DTs"]
+        NewDTs = list(dt_ruler[LastInd+1:end_ind+1])
+        if NewDTs:
+            DescriptorData = [iDescriptor.readData(ids=ids, dts=NewDTs, **kwargs).values for iDescriptor in self._Descriptors]
+            self._iStreamState = Cache["State"]
+            StdData, DTs = np.r_[StdData, self.Operator(self, NewDTs, ids, DescriptorData, self.ModelArgs)], DTs + NewDTs
+        # 只保留本次读取的时点之后的结果
+        self._StreamCache = {"IDs": Cache["IDs"], "DTs": DTs[start_ind-CacheStartInd:], "Data": StdData[start_ind-CacheStartInd:], "State": self._iStreamState}
+        return StdData[start_ind-CacheStartInd:end_ind-CacheStartInd+1]
     def _QS_initOperation(self, start_dt, dt_dict, prepare_ids, id_dict):
         super()._QS_initOperation(start_dt, dt_dict, prepare_ids, id_dict)
         if len(self._Descriptors)>len(self.LookBack): raise  __QS_Error__("时间序列运算因子 : '%s' 的参数'回溯期数'序列长度小于描述子个数!" % self.Name)
@@ -134,7 +226,13 @@ class TimeOperation(DerivativeFactor):
             if iStartInd<0: self._QS_Logger.warning("注意: 对于因子 '%s' 的描述子 '%s', 时点标尺长度不足, 不足的部分将填充 nan!" % (self.Name, iDescriptor.Name))
             iStartDT = self._OperationMode.DTRuler[max(0, iStartInd)]
             iDescriptor._QS_initOperation(iStartDT, dt_dict, prepare_ids, id_dict)
-    def readData(self, ids, dts, **kwargs):
+    def start(self, dts, **kwargs):
+        self._StreamCache = None
+        return super().start(dts=dts, **kwargs)
+    def end(self):
+        self._StreamCache = None
+        return super().end()
+    def __QS_readData__(self, ids, dts, **kwargs):
         DTRuler = kwargs.get("dt_ruler", dts)
         StartInd = (DTRuler.index(dts[0]) if dts[0] in DTRuler else 0)
         if (self.iLookBackMode=="扩张窗口") and (self.iInitData is not None) and (self.iInitData.shape[0]>0):
@@ -142,6 +240,10 @@ class TimeOperation(DerivativeFactor):
             else: StartInd = min(StartInd, DTRuler.index(self.iInitData.index[-1]) + 1)
         EndInd = (DTRuler.index(dts[-1]) if dts[-1] in DTRuler else len(DTRuler)-1)
         if StartInd>EndInd: return pd.DataFrame(index=dts, columns=ids)
+        isStreamable = self._isStreamable()
+        if isStreamable:
+            StdData = self._readStreamData(ids, DTRuler, StartInd, EndInd, **kwargs)
+            if StdData is not None: return pd.DataFrame(StdData, index=DTRuler[StartInd:EndInd+1], columns=ids).loc[dts, :]
         nID = len(ids)
         DescriptorData = []
         for i, iDescriptor in enumerate(self._Descriptors):
@@ -153,8 +255,11 @@ class TimeOperation(DerivativeFactor):
                 iDescriptorData = np.r_[iLookBackData, iDescriptorData]
             DescriptorData.append(iDescriptorData)
         StdData = self._calcData(ids=ids, dts=DTRuler[StartInd:EndInd+1], descriptor_data=DescriptorData, dt_ruler=DTRuler)
+        if isStreamable and (self._iStreamState is not None):
+            self._StreamCache = {"IDs": list(ids), "DTs": list(DTRuler[StartInd:EndInd+1]), "Data": StdData, "State": self._iStreamState}
         return pd.DataFrame(StdData, index=DTRuler[StartInd:EndInd+1], columns=ids).loc[dts, :]
     def _calcData(self, ids, dts, descriptor_data, dt_ruler):
+        self._iStreamState = None
         if self.DataType=='double': StdData = np.full(shape=(len(dts), len(ids)), fill_value=np.nan, dtype='float')
         else: StdData = np.full(shape=(len(dts), len(ids)), fill_value=None, dtype='O')
         StartIndAndLen, MaxLookBack, MaxLen = [], 0, 1
@@ -176,7 +281,8 @@ class TimeOperation(DerivativeFactor):
                         iInitData = iInitData.loc[:, ids].values.astype(StdData.dtype)
                     else:
                         iInitData = np.full(shape=(iInitData.shape[0], len(ids)), dtype=StdData.dtype)
-                    iStartInd = min(self.iLookBack, iInitData.shape[0])
+                    if self.iLookBackMode=="扩张窗口": iStartInd = iInitData.shape[0]# 扩张窗口使用全部的初始值
+                    else: iStartInd = min(self.iLookBack, iInitData.shape[0])
                     StdData = np.r_[iInitData[-iStartInd:], StdData]
             if self.iLookBackMode=="扩张窗口":
                 StartIndAndLen.insert(0, (iStartInd-1, np.inf))
@@ -234,10 +340,8 @@ class TimeOperation(DerivativeFactor):
             StdData = pd.DataFrame(StdData, index=DTs, columns=IDs)
         else:
             StdData = pd.DataFrame(index=DTs, columns=IDs, dtype=("float" if self.DataType=="double" else "O"))
-        with self._OperationMode._PID_Lock[PID]:
-            with shelve.open(self._OperationMode._CacheDataDir+os.sep+PID+os.sep+self.Name+str(self._OperationMode._FactorID[self.Name])) as CacheFile:
-                CacheFile["StdData"] = StdData
-                CacheFile["_QS_IDs"] = IDs
+        _saveOperationCacheData(self._OperationMode._CacheDataDir+os.sep+PID+os.sep+self.Name+str(self._OperationMode._FactorID[self.Name]), StdData, part=PID)
+        self._OperationMode._setCacheDataReady(self.Name, PID)
         self._isCacheDataOK = True
         return StdData
 
@@ -257,7 +361,7 @@ class SectionOperation(DerivativeFactor):
     def __QS_initArgs__(self):
         super().__QS_initArgs__()
         self.DescriptorSection = [None]*len(self._Descriptors)
-    def readData(self, ids, dts, **kwargs):
+    def __QS_readData__(self, ids, dts, **kwargs):
         SectionIDs = kwargs.pop("section_ids", ids)
         DescriptorData = []
         for i, iDescriptor in enumerate(self._Descriptors):
@@ -283,6 +387,8 @@ class SectionOperation(DerivativeFactor):
                 iDescriptor._QS_initOperation(start_dt, dt_dict, self.DescriptorSection[i], id_dict)
         if (self._OperationMode.SubProcessNum>0) and (self.Name not in self._OperationMode._Event):
             self._OperationMode._Event[self.Name] = (Queue(), Event())
+    def _QS_initCacheData(self):
+        return _initSharedCacheData(self)
     def _calcData(self, ids, dts, descriptor_data):
         if self.DataType=="double": StdData = np.full(shape=(len(dts), len(ids)), fill_value=np.nan, dtype="float")
         else: StdData = np.full(shape=(len(dts), len(ids)), fill_value=None, dtype="O")
@@ -316,19 +422,9 @@ class SectionOperation(DerivativeFactor):
             StdData = pd.DataFrame(StdData, index=DTs, columns=IDs)
         else:
             StdData = pd.DataFrame(index=DTs, columns=IDs, dtype=("float" if self.DataType=="double" else "O"))
-        if self._OperationMode._FactorPrepareIDs[self.Name] is None:
-            PID_IDs = self._OperationMode._PID_IDs
-        else:
-            PID_IDs = {self._OperationMode._PIDs[i]: iSubIDs for i, iSubIDs in enumerate(partitionListMovingSampling(IDs, len(self._OperationMode._PIDs)))}
-        for iPID, iIDs in PID_IDs.items():
-            with self._OperationMode._PID_Lock[iPID]:
-                with shelve.open(self._OperationMode._CacheDataDir+os.sep+iPID+os.sep+self.Name+str(self._OperationMode._FactorID[self.Name])) as CacheFile:
-                    if "StdData" in CacheFile:
-                        CacheFile["StdData"] = pd.concat([CacheFile["StdData"], StdData.loc[:,iIDs]]).sort_index()
-                    else:
-                        CacheFile["StdData"] = StdData.loc[:, iIDs]
-                    CacheFile["_QS_IDs"] = iIDs
+        _saveSectionCacheData(self, StdData)
         StdData = None# 释放数据
+        self._OperationMode._setCacheDataReady(self.Name, self._OperationMode._iPID)
         if self._OperationMode.SubProcessNum>0:
             Sub2MainQueue, PIDEvent = self._OperationMode._Event[self.Name]
             Sub2MainQueue.put(1)
@@ -344,6 +440,8 @@ class SectionOperation(DerivativeFactor):
 # args: 参数, {参数名:参数值}
 # 如果运算时点参数为单时点, 那么 x 元素为 array(shape=(回溯期数, nID)), 如果输出形式为全截面返回 array(shape=(nID, )), 否则返回单个值
 # 如果运算时点参数为多时点, 那么 x 元素为 array(shape=(回溯期数+nDT, nID)), 如果输出形式为全截面返回 array(shape=(nDT, nID)), 否则返回 array(shape=(nDT, ))
+# 如果运算时点参数为单时点且向量化参数为 True, 算子对所有时点只调用一次, idt 为 [时点], x 元素为滚动窗口的只读视图 array(shape=(nDT, 回溯期数+1, nID)), 如果输出形式为全截面返回 array(shape=(nDT, nID)), 否则返回 array(shape=(nDT, ))
+# 向量化只适用于所有描述子都是滚动窗口并且没有自身回溯的情形, 其他情形仍然逐时点调用算子
 class PanelOperation(DerivativeFactor):
     """面板运算"""
     DTMode = Enum("单时点", "多时点", arg_type="SingleOption", label="运算时点", order=3)
@@ -354,6 +452,7 @@ class PanelOperation(DerivativeFactor):
     iLookBackMode = Enum("滚动窗口", "扩张窗口", arg_type="SingleOption", label="自身回溯模式", order=8)
     iInitData = Instance(pd.DataFrame, arg_type="DataFrame", label="自身初始值", order=9)
     DescriptorSection = List(arg_type="List", label="描述子截面", order=10)
+    Vectorized = Bool(False, arg_type="Bool", label="向量化", order=11)
     def __QS_initArgs__(self):
         super().__QS_initArgs__()
         self.LookBack = [0]*len(self._Descriptors)
@@ -389,7 +488,9 @@ class PanelOperation(DerivativeFactor):
                 iDescriptor._QS_initOperation(iStartDT, dt_dict, self.DescriptorSection[i], id_dict)
         if (self._OperationMode.SubProcessNum>0) and (self.Name not in self._OperationMode._Event):
             self._OperationMode._Event[self.Name] = (Queue(), Event())
-    def readData(self, ids, dts, **kwargs):
+    def _QS_initCacheData(self):
+        return _initSharedCacheData(self)
+    def __QS_readData__(self, ids, dts, **kwargs):
         DTRuler = kwargs.get("dt_ruler", dts)
         SectionIDs = kwargs.pop("section_ids", ids)
         StartInd = (DTRuler.index(dts[0]) if dts[0] in DTRuler else 0)
@@ -436,7 +537,8 @@ class PanelOperation(DerivativeFactor):
                         iInitData = iInitData.loc[:, ids].values.astype(StdData.dtype)
                     else:
                         iInitData = np.full(shape=(iInitData.shape[0], len(ids)), dtype=StdData.dtype)
-                    iStartInd = min(self.iLookBack, iInitData.shape[0])
+                    if self.iLookBackMode=="扩张窗口": iStartInd = iInitData.shape[0]# 扩张窗口使用全部的初始值
+                    else: iStartInd = min(self.iLookBack, iInitData.shape[0])
                     StdData = np.r_[iInitData[-iStartInd:], StdData]
             if self.iLookBackMode=="扩张窗口":# 自身为扩张窗口模式
                 StartIndAndLen.insert(0, (iStartInd-1, np.inf))
@@ -449,7 +551,18 @@ class PanelOperation(DerivativeFactor):
         StartInd = dt_ruler.index(dts[0])
         if StartInd>=MaxLookBack: DTRuler = dt_ruler[StartInd-MaxLookBack:]
         else: DTRuler = [None]*(MaxLookBack-StartInd) + dt_ruler
-        if self.OutputMode=='全截面':
+        isBlock = False
+        if self.Vectorized and (self.DTMode=='单时点'):
+            isBlock = (MaxLen!=np.inf) and (self.iLookBack==0) and (self.iLookBackMode!="扩张窗口")
+            if not isBlock: self._QS_Logger.warning("注意: 因子 '%s' 含有扩张窗口或者自身回溯, 无法向量化, 将逐时点计算!" % (self.Name, ))
+        if isBlock:# 以滚动窗口视图整块调用算子
+            x = [_genRollingView(kDescriptorData, StartIndAndLen[k][1], len(dts)) for k, kDescriptorData in enumerate(descriptor_data)]
+            if self.OutputMode=='全截面':
+                StdData[:] = self.Operator(self, dts, ids, x, self.ModelArgs)
+            else:
+                for j, jID in enumerate(ids):
+                    StdData[:, j] = self.Operator(self, dts, jID, x, self.ModelArgs)
+        elif self.OutputMode=='全截面':
             if self.DTMode=='单时点':
                 for i, iDT in enumerate(dts):
                     iDTs = DTRuler[max(0, MaxLookBack+i+1-MaxLen):i+1+MaxLookBack]
@@ -495,19 +608,9 @@ class PanelOperation(DerivativeFactor):
             DescriptorData, iDescriptorData, StdData = None, None, pd.DataFrame(StdData, index=DTs, columns=IDs)
         else:
             StdData = pd.DataFrame(index=DTs, columns=IDs, dtype=("float" if self.DataType=="double" else "O"))
-        if self._OperationMode._FactorPrepareIDs[self.Name] is None:
-            PID_IDs = self._OperationMode._PID_IDs
-        else:
-            PID_IDs = {self._OperationMode._PIDs[i]: iSubIDs for i, iSubIDs in enumerate(partitionListMovingSampling(IDs, len(self._OperationMode._PIDs)))}
-        for iPID, iIDs in PID_IDs.items():
-            with self._OperationMode._PID_Lock[iPID]:
-                with shelve.open(self._OperationMode._CacheDataDir+os.sep+iPID+os.sep+self.Name+str(self._OperationMode._FactorID[self.Name])) as CacheFile:
-                    if "StdData" in CacheFile:
-                        CacheFile["StdData"] = pd.concat([CacheFile["StdData"], StdData.loc[:,iIDs]]).sort_index()
-                    else:
-                        CacheFile["StdData"] = StdData.loc[:, iIDs]
-                    CacheFile["_QS_IDs"] = iIDs
+        _saveSectionCacheData(self, StdData)
         StdData = None# 释放数据
+        self._OperationMode._setCacheDataReady(self.Name, self._OperationMode._iPID)
         if self._OperationMode.SubProcessNum>0:
             Sub2MainQueue, PIDEvent = self._OperationMode._Event[self.Name]
             Sub2MainQueue.put(1)
@@ -1,15 +1,13 @@
 # coding=utf-8
 """内置的因子运算"""
 import datetime as dt
-import uuid
 
 import numpy as np
 import pandas as pd
-import statsmodels.api as sm
 
 from QuantStudio import __QS_Error__
 from QuantStudio.FactorDataBase.FactorDB import Factor
-from QuantStudio.FactorDataBase.FactorOperation import PointOperation, TimeOperation, SectionOperation
+from QuantStudio.FactorDataBase.FactorOperation import PointOperation, TimeOperation, SectionOperation, _genRollingView
 from QuantStudio.Tools import DataPreprocessingFun
 
 
@@ -52,7 +50,7 @@ def _astype(f, idt, iid, x, args):
 def astype(f, dtype, **kwargs):
     Descriptors, Args = _genMultivariateOperatorInfo(f)
     Args["OperatorArg"] = {"dtype":dtype}
-    return PointOperation(kwargs.pop("factor_name", str(uuid.uuid1())), Descriptors, {"算子":_astype, "参数":Args, "运算时点":"多时点", "运算ID":"多ID"}, **kwargs)
+    return PointOperation(kwargs.pop("factor_name", None), Descriptors, {"算子":_astype, "参数":Args, "运算时点":"多时点", "运算ID":"多ID"}, **kwargs)
 def _log(f, idt, iid, x, args):
     Data = _genOperatorData(f, idt, iid, x, args)[0]
     Data[Data<=0] = np.nan
@@ -60,43 +58,43 @@ def _log(f, idt, iid, x, args):
 def log(f, base=np.e, **kwargs):
     Descriptors, Args = _genMultivariateOperatorInfo(f)
     Args["OperatorArg"] = {"base":base}
-    return PointOperation(kwargs.pop("factor_name", str(uuid.uuid1())), Descriptors, {"算子":_log, "参数":Args, "运算时点":"多时点", "运算ID":"多ID"}, **kwargs)
+    return PointOperation(kwargs.pop("factor_name", None), Descriptors, {"算子":_log, "参数":Args, "运算时点":"多时点", "运算ID":"多ID"}, **kwargs)
 def _isnull(f,idt,iid,x,args):
     Data = _genOperatorData(f,idt,iid,x,args)[0]
     return pd.isnull(Data)
 def isnull(f, **kwargs):
     Descriptors,Args = _genMultivariateOperatorInfo(f)
-    return PointOperation(kwargs.pop("factor_name", str(uuid.uuid1())),Descriptors,{"算子":_isnull,"参数":Args,"运算时点":"多时点","运算ID":"多ID"}, **kwargs)
+    return PointOperation(kwargs.pop("factor_name", None),Descriptors,{"算子":_isnull,"参数":Args,"运算时点":"多时点","运算ID":"多ID"}, **kwargs)
 def _notnull(f,idt,iid,x,args):
     Data = _genOperatorData(f,idt,iid,x,args)[0]
     return pd.notnull(Data)
 def notnull(f, **kwargs):
     Descriptors,Args = _genMultivariateOperatorInfo(f)
-    return PointOperation(kwargs.pop("factor_name", str(uuid.uuid1())), Descriptors, {"算子":_notnull, "参数":Args, "运算时点":"多时点", "运算ID":"多ID"}, **kwargs)
+    return PointOperation(kwargs.pop("factor_name", None), Descriptors, {"算子":_notnull, "参数":Args, "运算时点":"多时点", "运算ID":"多ID"}, **kwargs)
 def _sign(f,idt,iid,x,args):
     Data = _genOperatorData(f,idt,iid,x,args)[0]
     return np.sign(Data.astype(float))
 def sign(f, **kwargs):
     Descriptors,Args = _genMultivariateOperatorInfo(f)
-    return PointOperation(kwargs.pop("factor_name", str(uuid.uuid1())), Descriptors, {"算子":_sign,"参数":Args,"运算时点":"多时点","运算ID":"多ID"}, **kwargs)
+    return PointOperation(kwargs.pop("factor_name", None), Descriptors, {"算子":_sign,"参数":Args,"运算时点":"多时点","运算ID":"多ID"}, **kwargs)
 def _ceil(f,idt,iid,x,args):
     Data = _genOperatorData(f,idt,iid,x,args)[0]
     return np.ceil(Data.astype(float))
 def ceil(f, **kwargs):
     Descriptors,Args = _genMultivariateOperatorInfo(f)
-    return PointOperation(kwargs.pop("factor_name", str(uuid.uuid1())),Descriptors,{"算子":_ceil,"参数":Args,"运算时点":"多时点","运算ID":"多ID"}, **kwargs)
+    return PointOperation(kwargs.pop("factor_name", None),Descriptors,{"算子":_ceil,"参数":Args,"运算时点":"多时点","运算ID":"多ID"}, **kwargs)
 def _floor(f,idt,iid,x,args):
     Data = _genOperatorData(f,idt,iid,x,args)[0]
     return np.floor(Data.astype(float))
 def floor(f, **kwargs):
     Descriptors,Args = _genMultivariateOperatorInfo(f)
-    return PointOperation(kwargs.pop("factor_name", str(uuid.uuid1())),Descriptors,{"算子":_floor,"参数":Args,"运算时点":"多时点","运算ID":"多ID"}, **kwargs)
+    return PointOperation(kwargs.pop("factor_name", None),Descriptors,{"算子":_floor,"参数":Args,"运算时点":"多时点","运算ID":"多ID"}, **kwargs)
 def _fix(f,idt,iid,x,args):
     Data = _genOperatorData(f,idt,iid,x,args)[0]
     return np.fix(Data.astype(float))
 def fix(f, **kwargs):
     Descriptors,Args = _genMultivariateOperatorInfo(f)
-    return PointOperation(kwargs.pop("factor_name", str(uuid.uuid1())),Descriptors,{"算子":_fix,"参数":Args,"运算时点":"多时点","运算ID":"多ID"}, **kwargs)
+    return PointOperation(kwargs.pop("factor_name", None),Descriptors,{"算子":_fix,"参数":Args,"运算时点":"多时点","运算ID":"多ID"}, **kwargs)
 def _applymap(f,idt,iid,x,args):
     Data = pd.DataFrame(_genOperatorData(f,idt,iid,x,args)[0])
     Func = args["OperatorArg"]["func"]
@@ -104,7 +102,7 @@ def _applymap(f,idt,iid,x,args):
 def applymap(f, func=id, data_type="double", **kwargs):
     Descriptors,Args = _genMultivariateOperatorInfo(f)
     Args["OperatorArg"] = {"func":func}
-    return PointOperation(kwargs.pop("factor_name", str(uuid.uuid1())),Descriptors,{"算子":_applymap,"参数":Args,"运算时点":"多时点","运算ID":"多ID","数据类型":data_type}, **kwargs)
+    return PointOperation(kwargs.pop("factor_name", None),Descriptors,{"算子":_applymap,"参数":Args,"运算时点":"多时点","运算ID":"多ID","数据类型":data_type}, **kwargs)
 def _fetch(f,idt,iid,x,args):
     Data = _genOperatorData(f,idt,iid,x,args)[0]
     if isinstance(args["OperatorArg"]["pos"], str):
@@ -117,13 +115,13 @@ def fetch(f,pos=0,dtype="double", **kwargs):
     Args["OperatorArg"] = {"pos":pos,"dtype":dtype}
     if isinstance(pos,str):
         Args["OperatorArg"]['dtype'] = f.TempData['dtype']
-    return PointOperation(kwargs.pop("factor_name", str(uuid.uuid1())),Descriptors,{"算子":_fetch,"参数":Args,"运算时点":"多时点","运算ID":"多ID","数据类型":dtype}, **kwargs)
+    return PointOperation(kwargs.pop("factor_name", None),Descriptors,{"算子":_fetch,"参数":Args,"运算时点":"多时点","运算ID":"多ID","数据类型":dtype}, **kwargs)
 def _where(f,idt,iid,x,args):
     Data = _genOperatorData(f,idt,iid,x,args)
     return np.where(Data[1],Data[0],Data[2])
 def where(f,mask,other,data_type="double",**kwargs):
     Descriptors,Args = _genMultivariateOperatorInfo(f,mask,other)
-    return PointOperation(kwargs.pop("factor_name", str(uuid.uuid1())), Descriptors, {"算子":_where, "参数":Args, "运算时点":"多时点", "运算ID":"多ID", "数据类型":data_type}, **kwargs)
+    return PointOperation(kwargs.pop("factor_name", None), Descriptors, {"算子":_where, "参数":Args, "运算时点":"多时点", "运算ID":"多ID", "数据类型":data_type}, **kwargs)
 def _replace(f,idt,iid,x,args):
     Data = _genOperatorData(f,idt,iid,x,args)[0]
     ValueMap = args["OperatorArg"]["value_map"]
@@ -140,13 +138,13 @@ def _replace(f,idt,iid,x,args):
 def replace(f, value_map, data_type="double",**kwargs):
     Descriptors,Args = _genMultivariateOperatorInfo(f)
     Args["OperatorArg"] = {"value_map":value_map}
-    return PointOperation(kwargs.pop("factor_name", str(uuid.uuid1())), Descriptors, {"算子":_replace, "参数":Args, "运算时点":"多时点", "运算ID":"多ID", "数据类型":data_type}, **kwargs)
+    return PointOperation(kwargs.pop("factor_name", None), Descriptors, {"算子":_replace, "参数":Args, "运算时点":"多时点", "运算ID":"多ID", "数据类型":data_type}, **kwargs)
 def _clip(f,idt,iid,x,args):
     Data = _genOperatorData(f,idt,iid,x,args)
     return np.clip(Data[0].atype(float),Data[1],Data[2])
 def clip(f,a_min,a_max,**kwargs):
     Descriptors,Args = _genMultivariateOperatorInfo(f,a_min,a_max)
-    return PointOperation(kwargs.pop("factor_name", str(uuid.uuid1())),Descriptors,{"算子":_clip,"参数":Args,"运算时点":"多时点","运算ID":"多ID"}, **kwargs)
+    return PointOperation(kwargs.pop("factor_name", None),Descriptors,{"算子":_clip,"参数":Args,"运算时点":"多时点","运算ID":"多ID"}, **kwargs)
 def _nansum(f,idt,iid,x,args):
     Data = [(iData if isinstance(iData, np.ndarray) else np.full(shape=(len(idt), len(iid)), fill_value=iData)) for iData in _genOperatorData(f,idt,iid,x,args)]
     Data = np.array(Data)
@@ -156,25 +154,25 @@ def _nansum(f,idt,iid,x,args):
     return Rslt
 def nansum(*factors,**kwargs):
     Descriptors,Args = _genMultivariateOperatorInfo(*factors)
-    return PointOperation(kwargs.pop("factor_name", str(uuid.uuid1())),Descriptors,{"算子":_nansum,"参数":Args,"运算时点":"多时点","运算ID":"多ID"}, **kwargs)
+    return PointOperation(kwargs.pop("factor_name", None),Descriptors,{"算子":_nansum,"参数":Args,"运算时点":"多时点","运算ID":"多ID"}, **kwargs)
 def _nanprod(f,idt,iid,x,args):
     Data = [(iData if isinstance(iData, np.ndarray) else np.full(shape=(len(idt), len(iid)), fill_value=iData)) for iData in _genOperatorData(f,idt,iid,x,args)]
     return np.nanprod(np.array(Data),axis=0)
 def nanprod(*factors,**kwargs):
     Descriptors,Args = _genMultivariateOperatorInfo(*factors)
-    return PointOperation(kwargs.pop("factor_name", str(uuid.uuid1())),Descriptors,{"算子":_nanprod,"参数":Args,"运算时点":"多时点","运算ID":"多ID"}, **kwargs)
+    return PointOperation(kwargs.pop("factor_name", None),Descriptors,{"算子":_nanprod,"参数":Args,"运算时点":"多时点","运算ID":"多ID"}, **kwargs)
 def _nanmax(f,idt,iid,x,args):
     Data = [(iData if isinstance(iData, np.ndarray) else np.full(shape=(len(idt), len(iid)), fill_value=iData)) for iData in _genOperatorData(f,idt,iid,x,args)]
     return np.nanmax(np.array(Data),axis=0)
 def nanmax(*factors,**kwargs):
     Descriptors,Args = _genMultivariateOperatorInfo(*factors)
-    return PointOperation(kwargs.pop("factor_name", str(uuid.uuid1())),Descriptors,{"算子":_nanmax,"参数":Args,"运算时点":"多时点","运算ID":"多ID"}, **kwargs)
+    return PointOperation(kwargs.pop("factor_name", None),Descriptors,{"算子":_nanmax,"参数":Args,"运算时点":"多时点","运算ID":"多ID"}, **kwargs)
 def _nanmin(f,idt,iid,x,args):
     Data = [(iData if isinstance(iData, np.ndarray) else np.full(shape=(len(idt), len(iid)), fill_value=iData)) for iData in _genOperatorData(f,idt,iid,x,args)]
     return np.nanmin(np.array(Data),axis=0)
 def nanmin(*factors,**kwargs):
     Descriptors,Args = _genMultivariateOperatorInfo(*factors)
-    return PointOperation(kwargs.pop("factor_name", str(uuid.uuid1())),Descriptors,{"算子":_nanmin,"参数":Args,"运算时点":"多时点","运算ID":"多ID"}, **kwargs)
+    return PointOperation(kwargs.pop("factor_name", None),Descriptors,{"算子":_nanmin,"参数":Args,"运算时点":"多时点","运算ID":"多ID"}, **kwargs)
 def _nanargmax(f,idt,iid,x,args):
     Data = [(iData if isinstance(iData, np.ndarray) else np.full(shape=(len(idt), len(iid)), fill_value=iData)) for iData in _genOperatorData(f,idt,iid,x,args)]
     Data = np.array(Data)
@@ -186,7 +184,7 @@ def _nanargmax(f,idt,iid,x,args):
     return Rslt
 def nanargmax(*factors,**kwargs):
     Descriptors,Args = _genMultivariateOperatorInfo(*factors)
-    return PointOperation(kwargs.pop("factor_name", str(uuid.uuid1())),Descriptors,{"算子":_nanargmax,"参数":Args,"运算时点":"多时点","运算ID":"多ID"}, **kwargs)
+    return PointOperation(kwargs.pop("factor_name", None),Descriptors,{"算子":_nanargmax,"参数":Args,"运算时点":"多时点","运算ID":"多ID"}, **kwargs)
 def _nanargmin(f,idt,iid,x,args):
     Data = [(iData if isinstance(iData, np.ndarray) else np.full(shape=(len(idt), len(iid)), fill_value=iData)) for iData in _genOperatorData(f,idt,iid,x,args)]
     Data = np.array(Data)
@@ -198,7 +196,7 @@ def _nanargmin(f,idt,iid,x,args):
     return Rslt
 def nanargmin(*factors,**kwargs):
     Descriptors,Args = _genMultivariateOperatorInfo(*factors)
-    return PointOperation(kwargs.pop("factor_name", str(uuid.uuid1())),Descriptors,{"算子":_nanargmin,"参数":Args,"运算时点":"多时点","运算ID":"多ID"}, **kwargs)
+    return PointOperation(kwargs.pop("factor_name", None),Descriptors,{"算子":_nanargmin,"参数":Args,"运算时点":"多时点","运算ID":"多ID"}, **kwargs)
 def _nanmean(f,idt,iid,x,args):
     Data = [(iData if isinstance(iData, np.ndarray) else np.full(shape=(len(idt), len(iid)), fill_value=iData)) for iData in _genOperatorData(f,idt,iid,x,args)]
     Weights = args["OperatorArg"]["weights"]
@@ -222,40 +220,40 @@ def _nanmean(f,idt,iid,x,args):
 def nanmean(*factors,weights=None,ignore_nan_weight=True,**kwargs):
     Descriptors,Args = _genMultivariateOperatorInfo(*factors)
     Args["OperatorArg"] = {"weights":weights,"ignore_nan_weight":ignore_nan_weight}
-    return PointOperation(kwargs.get("factor_name",str(uuid.uuid1())),Descriptors,{"算子":_nanmean,"参数":Args,"运算时点":"多时点","运算ID":"多ID"}, **kwargs)
+    return PointOperation(kwargs.pop("factor_name", None),Descriptors,{"算子":_nanmean,"参数":Args,"运算时点":"多时点","运算ID":"多ID"}, **kwargs)
 def _nanstd(f,idt,iid,x,args):
     Data = [(iData if isinstance(iData, np.ndarray) else np.full(shape=(len(idt), len(iid)), fill_value=iData)) for iData in _genOperatorData(f,idt,iid,x,args)]
     return np.nanstd(np.array(Data),axis=0,ddof=args["OperatorArg"]["ddof"])
 def nanstd(*factors,ddof=1,**kwargs):
     Descriptors,Args = _genMultivariateOperatorInfo(*factors)
     Args["OperatorArg"] = {"ddof":ddof}
-    return PointOperation(kwargs.pop("factor_name", str(uuid.uuid1())),Descriptors,{"算子":_nanstd,"参数":Args,"运算时点":"多时点","运算ID":"多ID"}, **kwargs)
+    return PointOperation(kwargs.pop("factor_name", None),Descriptors,{"算子":_nanstd,"参数":Args,"运算时点":"多时点","运算ID":"多ID"}, **kwargs)
 def _nanvar(f,idt,iid,x,args):
     Data = [(iData if isinstance(iData, np.ndarray) else np.full(shape=(len(idt), len(iid)), fill_value=iData)) for iData in _genOperatorData(f,idt,iid,x,args)]
     return np.nanvar(np.array(Data),axis=0,ddof=args["OperatorArg"]["ddof"])
 def nanvar(*factors, ddof=1, **kwargs):
     Descriptors,Args = _genMultivariateOperatorInfo(*factors)
     Args["OperatorArg"] = {"ddof":ddof}
-    return PointOperation(kwargs.pop("factor_name", str(uuid.uuid1())),Descriptors,{"算子":_nanvar,"参数":Args,"运算时点":"多时点","运算ID":"多ID"}, **kwargs)
+    return PointOperation(kwargs.pop("factor_name", None),Descriptors,{"算子":_nanvar,"参数":Args,"运算时点":"多时点","运算ID":"多ID"}, **kwargs)
 def _nanmedian(f,idt,iid,x,args):
     Data = [(iData if isinstance(iData, np.ndarray) else np.full(shape=(len(idt), len(iid)), fill_value=iData)) for iData in _genOperatorData(f,idt,iid,x,args)]
     return np.nanmedian(np.array(Data),axis=0)
 def nanmedian(*factors, **kwargs):
     Descriptors,Args = _genMultivariateOperatorInfo(*factors)
-    return PointOperation(kwargs.pop("factor_name", str(uuid.uuid1())),Descriptors,{"算子":_nanmedian,"参数":Args,"运算时点":"多时点","运算ID":"多ID"}, **kwargs)
+    return PointOperation(kwargs.pop("factor_name", None),Descriptors,{"算子":_nanmedian,"参数":Args,"运算时点":"多时点","运算ID":"多ID"}, **kwargs)
 def _nanquantile(f,idt,iid,x,args):
     Data = [(iData if isinstance(iData, np.ndarray) else np.full(shape=(len(idt), len(iid)), fill_value=iData)) for iData in _genOperatorData(f,idt,iid,x,args)]
     return np.nanpercentile(np.array(Data),args["OperatorArg"]["quantile"]*100,axis=0)
 def nanquantile(*factors, quantile=0.5, **kwargs):
     Descriptors,Args = _genMultivariateOperatorInfo(*factors)
     Args["OperatorArg"] = {"quantile":quantile}
-    return PointOperation(kwargs.pop("factor_name", str(uuid.uuid1())),Descriptors,{"算子":_nanquantile,"参数":Args,"运算时点":"多时点","运算ID":"多ID"}, **kwargs)
+    return PointOperation(kwargs.pop("factor_name", None),Descriptors,{"算子":_nanquantile,"参数":Args,"运算时点":"多时点","运算ID":"多ID"}, **kwargs)
 def _nancount(f,idt,iid,x,args):
     Data = [(iData if isinstance(iData, np.ndarray) else np.full(shape=(len(idt), len(iid)), fill_value=iData)) for iData in _genOperatorData(f,idt,iid,x,args)]
     return np.nansum(pd.isnull(np.array(Data)),axis=0)
 def nancount(*factors, **kwargs):
     Descriptors,Args = _genMultivariateOperatorInfo(*factors)
-    return PointOperation(kwargs.pop("factor_name", str(uuid.uuid1())),Descriptors,{"算子":_nancount,"参数":Args,"运算时点":"多时点","运算ID":"多ID"}, **kwargs)
+    return PointOperation(kwargs.pop("factor_name", None),Descriptors,{"算子":_nancount,"参数":Args,"运算时点":"多时点","运算ID":"多ID"}, **kwargs)
 def _regress_change_rate(f,idt,iid,x,args):
     Y = np.array([(iData if isinstance(iData, np.ndarray) else np.full(shape=(len(idt), len(iid)), fill_value=iData)) for iData in _genOperatorData(f,idt,iid,x,args)])
     X = np.arange(Y.shape[0]).astype("float").reshape((Y.shape[0],1,1)).repeat(Y.shape[1],axis=1).repeat(Y.shape[2],axis=2)
@@ -271,13 +269,13 @@ def _regress_change_rate(f,idt,iid,x,args):
     return Rslt
 def regress_change_rate(*factors, **kwargs):
     Descriptors,Args = _genMultivariateOperatorInfo(*factors)
-    return PointOperation(kwargs.pop("factor_name", str(uuid.uuid1())),Descriptors,{"算子":_regress_change_rate,"参数":Args,"运算时点":"多时点","运算ID":"多ID"}, **kwargs)
+    return PointOperation(kwargs.pop("factor_name", None),Descriptors,{"算子":_regress_change_rate,"参数":Args,"运算时点":"多时点","运算ID":"多ID"}, **kwargs)
 def _tolist(f,idt,iid,x,args):
     Data = [(iData if isinstance(iData, np.ndarray) else np.full(shape=(len(idt), len(iid)), fill_value=iData)) for iData in _genOperatorData(f,idt,iid,x,args)]
     return pd.Panel({i: iData for i, iData in enumerate(Data)}).sort_index(axis=0).to_frame(filter_observations=False).apply(lambda s: s.tolist(), axis=1).unstack().values
 def tolist(*factors,**kwargs):
     Descriptors,Args = _genMultivariateOperatorInfo(*factors)
-    return PointOperation(kwargs.pop("factor_name", str(uuid.uuid1())),Descriptors,{"算子":_tolist,"参数":Args,"运算时点":"多时点","运算ID":"多ID","数据类型":"object"}, **kwargs)
+    return PointOperation(kwargs.pop("factor_name", None),Descriptors,{"算子":_tolist,"参数":Args,"运算时点":"多时点","运算ID":"多ID","数据类型":"object"}, **kwargs)
 def _single_quarter(f,idt,iid,x,args):
     ReportPeriod, Last, Prev = _genOperatorData(f,idt,iid,x,args)
     f = np.vectorize(lambda x: x[-4:]=="0331")
@@ -287,7 +285,7 @@ def _single_quarter(f,idt,iid,x,args):
     return Rslt
 def single_quarter(report_period, last, prev, **kwargs):
     Descriptors, Args = _genMultivariateOperatorInfo(report_period, last, prev)
-    return PointOperation(kwargs.pop("factor_name", str(uuid.uuid1())),Descriptors,{"算子":_single_quarter,"参数":Args,"运算时点":"多时点","运算ID":"多ID"}, **kwargs)
+    return PointOperation(kwargs.pop("factor_name", None),Descriptors,{"算子":_single_quarter,"参数":Args,"运算时点":"多时点","运算ID":"多ID"}, **kwargs)
 def _strftime(f, idt, iid, x, args):
     Data = _genOperatorData(f, idt, iid, x, args)[0]
     DTFormat = args["OperatorArg"]["dt_format"]
@@ -295,7 +293,7 @@ def _strftime(f, idt, iid, x, args):
 def strftime(f, dt_format="%Y%m%d", **kwargs):
     Descriptors, Args = _genMultivariateOperatorInfo(f)
     Args["OperatorArg"] = {"dt_format":dt_format}
-    return PointOperation(kwargs.pop("factor_name", str(uuid.uuid1())), Descriptors, {"算子":_strftime, "参数":Args, "数据类型":"string", "运算时点":"多时点", "运算ID":"多ID"}, **kwargs)
+    return PointOperation(kwargs.pop("factor_name", None), Descriptors, {"算子":_strftime, "参数":Args, "数据类型":"string", "运算时点":"多时点", "运算ID":"多ID"}, **kwargs)
 def _strptime(f, idt, iid, x, args):
     Data = _genOperatorData(f, idt, iid, x, args)[0]
     DTFormat = args["OperatorArg"]["dt_format"]
@@ -306,32 +304,121 @@ def _strptime(f, idt, iid, x, args):
 def strptime(f, dt_format="%Y%m%d", is_datetime=True, **kwargs):
     Descriptors, Args = _genMultivariateOperatorInfo(f)
     Args["OperatorArg"] = {"dt_format":dt_format, "is_datetime":is_datetime}
-    return PointOperation(kwargs.pop("factor_name", str(uuid.uuid1())), Descriptors, {"算子":_strptime, "参数":Args, "数据类型":"object", "运算时点":"多时点", "运算ID":"多ID"}, **kwargs)
+    return PointOperation(kwargs.pop("factor_name", None), Descriptors, {"算子":_strptime, "参数":Args, "数据类型":"object", "运算时点":"多时点", "运算ID":"多ID"}, **kwargs)
 # ----------------------时间序列运算--------------------------------
+# 流式计算核, 计算结果和 pandas 的 rolling 一致, 在两次调用之间传递状态
+# data: array(shape=(nDT, nID)), state: 上次调用保存的状态, None 表示从头开始计算, 此时 data 包含回溯期的数据
+# 返回: (计算结果, 新的状态)
+def _rollingSum(data, window):
+    CumSum = np.cumsum(np.r_[np.zeros((1,)+data.shape[1:]), data], axis=0)
+    return CumSum[window:] - CumSum[:-window]
+# 分块前后缀最大值(van Herk/Gil-Werman)算法, data 中不能有缺失值
+def _rollingMax(data, window):
+    nDT = data.shape[0]
+    nBlock = -(-nDT // window)
+    Padded = np.full((nBlock*window,)+data.shape[1:], -np.inf)
+    Padded[:nDT] = data
+    Blocks = Padded.reshape((nBlock, window)+data.shape[1:])
+    Prefix = np.maximum.accumulate(Blocks, axis=1).reshape(Padded.shape)
+    Suffix = np.maximum.accumulate(Blocks[:, ::-1], axis=1)[:, ::-1].reshape(Padded.shape)
+    return np.maximum(Suffix[:nDT-window+1], Prefix[window-1:nDT])
+# 逐窗口两遍法计算离差交叉乘积之和, 先求窗口均值再累加离差乘积, 按行分块以限制内存占用
+# x, y: array(shape=(window-1+n, nID)), 缺失值为 nan 且位置相同, 返回 n 个窗口的结果
+def _rollingCrossSum(x, y, window, n):
+    Rslt = np.full((n,)+x.shape[1:], np.nan)
+    BlockSize = max(1, 2**22 // (window * max(1, int(np.prod(x.shape[1:])))))
+    for i in range(0, n, BlockSize):
+        iN = min(BlockSize, n-i)
+        iX, iY = _genRollingView(x[i:i+iN+window-1], window, iN), _genRollingView(y[i:i+iN+window-1], window, iN)
+        iCount = np.sum(pd.notnull(iX), axis=1)
+        iDX, iDY = iX - (np.nansum(iX, axis=1) / iCount)[:, np.newaxis], iY - (np.nansum(iY, axis=1) / iCount)[:, np.newaxis]
+        Rslt[i:i+iN] = np.nansum(iDX * iDY, axis=1)
+    return Rslt
+# 滚动窗口, 状态为最近 window-1 期的数据
+def _rollingKernel(data, state, window, min_periods, stat, ddof=1, weights=None):
+    data = np.array(data, dtype="float")
+    if state is not None: data = np.r_[state["Tail"], data]
+    NewState = {"Tail": data[data.shape[0]-window+1:]}
+    Mask = pd.notnull(data)
+    Count = _rollingSum(Mask.astype("float"), window)
+    if stat=="count": return (Count, NewState)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        if stat=="sum":
+            Rslt = _rollingSum(np.where(Mask, data, 0), window)
+        elif stat=="mean":
+            if weights is None:
+                Rslt = _rollingSum(np.where(Mask, data, 0), window) / Count
+            else:
+                Weights, nRslt = np.nan_to_num(np.array(weights, dtype="float")), Count.shape[0]
+                Rslt = np.einsum("rwn,w->rn", _genRollingView(np.where(Mask, data, 0), window, nRslt), Weights) / np.einsum("rwn,w->rn", _genRollingView(Mask.astype("float"), window, nRslt), Weights)
+        elif stat in ("var", "std"):# 窗口内的最大值等于最小值时方差严格为 0
+            Data = np.where(Mask, data, np.nan)
+            Rslt = _rollingCrossSum(Data, Data, window, Count.shape[0]) / (Count - ddof)
+            Rslt[_rollingMax(np.where(Mask, data, -np.inf), window)==-_rollingMax(np.where(Mask, -data, -np.inf), window)] = 0
+            Rslt[Count<=ddof] = np.nan
+            if stat=="std": Rslt = np.sqrt(Rslt)
+        elif stat=="max":
+            Rslt = _rollingMax(np.where(Mask, data, -np.inf), window)
+        elif stat=="min":
+            Rslt = - _rollingMax(np.where(Mask, -data, -np.inf), window)
+        else:
+            raise __QS_Error__("不支持的流式计算统计量: '%s'" % stat)
+    Rslt[Count<max(min_periods, (0 if stat=="sum" else 1))] = np.nan
+    return (Rslt, NewState)
+# 滚动窗口的协方差和相关系数, data: array(shape=(nDT, nID, 2)), 只使用两个变量都不缺失的样本, 逐窗口两遍法计算, 状态为最近 window-1 期的数据
+def _rollingCovKernel(data, state, window, min_periods, stat, ddof=1):
+    data = np.array(data, dtype="float")
+    if state is not None: data = np.r_[state["Tail"], data]
+    NewState = {"Tail": data[data.shape[0]-window+1:]}
+    Mask = np.all(pd.notnull(data), axis=-1)
+    Count = _rollingSum(Mask.astype("float"), window)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        X, Y = np.where(Mask, data[..., 0], np.nan), np.where(Mask, data[..., 1], np.nan)
+        nRslt = Count.shape[0]
+        Cov, VarX, VarY = _rollingCrossSum(X, Y, window, nRslt), _rollingCrossSum(X, X, window, nRslt), _rollingCrossSum(Y, Y, window, nRslt)
+        # 离差平方和不超过舍入误差的量级时视为 0, 常数窗口的协方差为 0, 相关系数为 nan
+        Eps = np.finfo("float").eps
+        isZeroVar = (VarX<=Count * (4 * Eps * _rollingMax(np.where(Mask, np.abs(X), 0), window))**2) | (VarY<=Count * (4 * Eps * _rollingMax(np.where(Mask, np.abs(Y), 0), window))**2)
+        Cov[isZeroVar] = 0
+        if stat=="cov":
+            Rslt = Cov / (Count - ddof)
+            Rslt[Count<=ddof] = np.nan
+        elif stat=="corr":
+            Rslt = np.clip(Cov / np.sqrt(VarX * VarY), -1, 1)
+            Rslt[isZeroVar | (Count<=1)] = np.nan
+        else:
+            raise __QS_Error__("不支持的流式计算统计量: '%s'" % stat)
+    Rslt[Count<max(min_periods, 1)] = np.nan
+    return (Rslt, NewState)
+# 调用流式计算核, 从因子取出上次保存的状态, 计算后保存新的状态
+def _isStreaming(f, args):
+    return getattr(f, "Streaming", False) and (args["OperatorArg"].get("win_type", None) is None)
+def _calcStream(f, kernel, data, **kwargs):
+    State = (getattr(f, "_iStreamState", None) if getattr(f, "Streaming", False) else None)
+    Rslt, f._iStreamState = kernel(data, State, **kwargs)
+    return Rslt
 def _rolling_mean(f,idt,iid,x,args):
-    Data = pd.DataFrame(_genOperatorData(f,idt,iid,x,args)[0])
-    if "weights" not in args["OperatorArg"]:
-        return Data.rolling(**args["OperatorArg"]).mean().values[args["OperatorArg"]["window"]-1:]
-    else:
-        weights = np.array(args["OperatorArg"]["weights"])
-        TotalWeight = np.nansum(weights)
-        return Data.rolling(**args["OperatorArg"]).apply(lambda x: np.nansum(x * weights) / np.nansum(pd.notnull(x) * weights),raw=True).values[args["OperatorArg"]["window"]-1:]
+    Data = _genOperatorData(f,idt,iid,x,args)[0]
+    if ("weights" in args["OperatorArg"]) or _isStreaming(f, args):
+        return _calcStream(f, _rollingKernel, Data, window=args["OperatorArg"]["window"], min_periods=args["OperatorArg"]["min_periods"], stat="mean", weights=args["OperatorArg"].get("weights", None))
+    return pd.DataFrame(Data).rolling(**args["OperatorArg"]).mean().values[args["OperatorArg"]["window"]-1:]
 def rolling_mean(f, window, min_periods=1, win_type=None, weights=None, **kwargs):
     Descriptors,Args = _genMultivariateOperatorInfo(f)
     Args["OperatorArg"] = {"window":window,"min_periods":min_periods,"win_type":win_type}
     if weights is None:
-        return TimeOperation(kwargs.pop("factor_name", str(uuid.uuid1())),Descriptors,{"算子":_rolling_mean,"参数":Args,"回溯期数":[window-1]*len(Descriptors),"运算时点":"多时点","运算ID":"多ID"}, **kwargs)
+        return TimeOperation(kwargs.pop("factor_name", None),Descriptors,{"算子":_rolling_mean,"参数":Args,"回溯期数":[window-1]*len(Descriptors),"运算时点":"多时点","运算ID":"多ID"}, **kwargs)
     else:
         Args["OperatorArg"]["window"] = len(weights)
         Args["OperatorArg"]["weights"] = weights
-        return TimeOperation(kwargs.pop("factor_name", str(uuid.uuid1())),Descriptors,{"算子":_rolling_mean,"参数":Args,"回溯期数":[len(weights)-1]*len(Descriptors),"运算时点":"多时点","运算ID":"多ID"}, **kwargs)
+        return TimeOperation(kwargs.pop("factor_name", None),Descriptors,{"算子":_rolling_mean,"参数":Args,"回溯期数":[len(weights)-1]*len(Descriptors),"运算时点":"多时点","运算ID":"多ID"}, **kwargs)
 def _rolling_sum(f,idt,iid,x,args):
-    Data = pd.DataFrame(_genOperatorData(f,idt,iid,x,args)[0])
-    return Data.rolling(**args["OperatorArg"]).sum().values[args["OperatorArg"]["window"]-1:]
+    Data = _genOperatorData(f,idt,iid,x,args)[0]
+    if _isStreaming(f, args): return _calcStream(f, _rollingKernel, Data, window=args["OperatorArg"]["window"], min_periods=args["OperatorArg"]["min_periods"], stat="sum")
+    return pd.DataFrame(Data).rolling(**args["OperatorArg"]).sum().values[args["OperatorArg"]["window"]-1:]
 def rolling_sum(f, window, min_periods=1, win_type=None, **kwargs):
     Descriptors,Args = _genMultivariateOperatorInfo(f)
     Args["OperatorArg"] = {"window":window,"min_periods":min_periods,"win_type":win_type}
-    return TimeOperation(kwargs.pop("factor_name", str(uuid.uuid1())),Descriptors,{"算子":_rolling_sum,"参数":Args,"回溯期数":[window-1]*len(Descriptors),"运算时点":"多时点","运算ID":"多ID"}, **kwargs)
+    return TimeOperation(kwargs.pop("factor_name", None),Descriptors,{"算子":_rolling_sum,"参数":Args,"回溯期数":[window-1]*len(Descriptors),"运算时点":"多时点","运算ID":"多ID"}, **kwargs)
 def _rolling_prod(f,idt,iid,x,args):
     Data = _genOperatorData(f,idt,iid,x,args)[0]
     Rslt = np.nanprod(Data, axis=0)
@@ -340,74 +427,78 @@ def _rolling_prod(f,idt,iid,x,args):
 def rolling_prod(f, window, min_periods=1, **kwargs):
     Descriptors,Args = _genMultivariateOperatorInfo(f)
     Args["OperatorArg"] = {"window":window,"min_periods":min_periods}
-    return TimeOperation(kwargs.pop("factor_name", str(uuid.uuid1())),Descriptors,{"算子":_rolling_prod,"参数":Args,"回溯期数":[window-1]*len(Descriptors),"运算时点":"单时点","运算ID":"多ID"}, **kwargs)
+    return TimeOperation(kwargs.pop("factor_name", None),Descriptors,{"算子":_rolling_prod,"参数":Args,"回溯期数":[window-1]*len(Descriptors),"运算时点":"单时点","运算ID":"多ID"}, **kwargs)
 def _rolling_std(f,idt,iid,x,args):
-    Data = pd.DataFrame(_genOperatorData(f,idt,iid,x,args)[0])
+    Data = _genOperatorData(f,idt,iid,x,args)[0]
     OperatorArg = args["OperatorArg"].copy()
     SubOperatorArg = OperatorArg.pop("SubOperatorArg", {})
-    return Data.rolling(**OperatorArg).apply(lambda x:np.nanstd(x, **SubOperatorArg), raw=True).values[args["OperatorArg"]["window"]-1:]
+    if _isStreaming(f, args): return _calcStream(f, _rollingKernel, Data, window=OperatorArg["window"], min_periods=OperatorArg["min_periods"], stat="std", ddof=SubOperatorArg["ddof"])
+    return pd.DataFrame(Data).rolling(**OperatorArg).apply(lambda x:np.nanstd(x, **SubOperatorArg), raw=True).values[args["OperatorArg"]["window"]-1:]
 def rolling_std(f, window, min_periods=1, win_type=None, ddof=1, **kwargs):
     Descriptors,Args = _genMultivariateOperatorInfo(f)
     Args["OperatorArg"] = {"window":window,"min_periods":min_periods,"win_type":win_type,"SubOperatorArg":{"ddof":ddof}}
-    return TimeOperation(kwargs.pop("factor_name", str(uuid.uuid1())),Descriptors,{"算子":_rolling_std,"参数":Args,"回溯期数":[window-1]*len(Descriptors),"运算时点":"多时点","运算ID":"多ID"}, **kwargs)
+    return TimeOperation(kwargs.pop("factor_name", None),Descriptors,{"算子":_rolling_std,"参数":Args,"回溯期数":[window-1]*len(Descriptors),"运算时点":"多时点","运算ID":"多ID"}, **kwargs)
 def _rolling_max(f,idt,iid,x,args):
-    Data = pd.DataFrame(_genOperatorData(f,idt,iid,x,args)[0])
-    return Data.rolling(**args["OperatorArg"]).max().values[args["OperatorArg"]["window"]-1:]
+    Data = _genOperatorData(f,idt,iid,x,args)[0]
+    if _isStreaming(f, args): return _calcStream(f, _rollingKernel, Data, window=args["OperatorArg"]["window"], min_periods=args["OperatorArg"]["min_periods"], stat="max")
+    return pd.DataFrame(Data).rolling(**args["OperatorArg"]).max().values[args["OperatorArg"]["window"]-1:]
 def rolling_max(f, window, min_periods=1, win_type=None, **kwargs):
     Descriptors,Args = _genMultivariateOperatorInfo(f)
     Args["OperatorArg"] = {"window":window,"min_periods":min_periods,"win_type":win_type}
-    return TimeOperation(kwargs.pop("factor_name", str(uuid.uuid1())),Descriptors,{"算子":_rolling_max,"参数":Args,"回溯期数":[window-1]*len(Descriptors),"运算时点":"多时点","运算ID":"多ID"}, **kwargs)
+    return TimeOperation(kwargs.pop("factor_name", None),Descriptors,{"算子":_rolling_max,"参数":Args,"回溯期数":[window-1]*len(Descriptors),"运算时点":"多时点","运算ID":"多ID"}, **kwargs)
 def _rolling_min(f,idt,iid,x,args):
-    Data = pd.DataFrame(_genOperatorData(f,idt,iid,x,args)[0])
-    return Data.rolling(**args["OperatorArg"]).min().values[args["OperatorArg"]["window"]-1:]
+    Data = _genOperatorData(f,idt,iid,x,args)[0]
+    if _isStreaming(f, args): return _calcStream(f, _rollingKernel, Data, window=args["OperatorArg"]["window"], min_periods=args["OperatorArg"]["min_periods"], stat="min")
+    return pd.DataFrame(Data).rolling(**args["OperatorArg"]).min().values[args["OperatorArg"]["window"]-1:]
 def rolling_min(f, window, min_periods=1, win_type=None, **kwargs):
     Descriptors,Args = _genMultivariateOperatorInfo(f)
     Args["OperatorArg"] = {"window":window,"min_periods":min_periods,"win_type":win_type}
-    return TimeOperation(kwargs.pop("factor_name", str(uuid.uuid1())),Descriptors,{"算子":_rolling_min,"参数":Args,"回溯期数":[window-1]*len(Descriptors),"运算时点":"多时点","运算ID":"多ID"}, **kwargs)
+    return TimeOperation(kwargs.pop("factor_name", None),Descriptors,{"算子":_rolling_min,"参数":Args,"回溯期数":[window-1]*len(Descriptors),"运算时点":"多时点","运算ID":"多ID"}, **kwargs)
 def _rolling_argmax(f,idt,iid,x,args):
     Data = pd.DataFrame(_genOperatorData(f,idt,iid,x,args)[0])
     return Data.rolling(**args["OperatorArg"]).apply(np.nanargmax).values[args["OperatorArg"]["window"]-1:]
 def rolling_argmax(f, window, min_periods=1, win_type=None, **kwargs):
     Descriptors,Args = _genMultivariateOperatorInfo(f)
     Args["OperatorArg"] = {"window":window,"min_periods":min_periods,"win_type":win_type}
-    return TimeOperation(kwargs.pop("factor_name", str(uuid.uuid1())),Descriptors,{"算子":_rolling_argmax,"参数":Args,"回溯期数":[window-1]*len(Descriptors),"运算时点":"多时点","运算ID":"多ID"}, **kwargs)
+    return TimeOperation(kwargs.pop("factor_name", None),Descriptors,{"算子":_rolling_argmax,"参数":Args,"回溯期数":[window-1]*len(Descriptors),"运算时点":"多时点","运算ID":"多ID"}, **kwargs)
 def _rolling_argmin(f,idt,iid,x,args):
     Data = pd.DataFrame(_genOperatorData(f,idt,iid,x,args)[0])
     return Data.rolling(**args["OperatorArg"]).apply(np.nanargmin).values[args["OperatorArg"]["window"]-1:]
 def rolling_argmin(f, window, min_periods=1, win_type=None, **kwargs):
     Descriptors,Args = _genMultivariateOperatorInfo(f)
     Args["OperatorArg"] = {"window":window,"min_periods":min_periods,"win_type":win_type}
-    return TimeOperation(kwargs.pop("factor_name", str(uuid.uuid1())),Descriptors,{"算子":_rolling_argmin,"参数":Args,"回溯期数":[window-1]*len(Descriptors),"运算时点":"多时点","运算ID":"多ID"}, **kwargs)
+    return TimeOperation(kwargs.pop("factor_name", None),Descriptors,{"算子":_rolling_argmin,"参数":Args,"回溯期数":[window-1]*len(Descriptors),"运算时点":"多时点","运算ID":"多ID"}, **kwargs)
 def _rolling_median(f,idt,iid,x,args):
     Data = pd.DataFrame(_genOperatorData(f,idt,iid,x,args)[0])
     return Data.rolling(**args["OperatorArg"]).median().values[args["OperatorArg"]["window"]-1:]
 def rolling_median(f, window, min_periods=1, win_type=None, **kwargs):
     Descriptors,Args = _genMultivariateOperatorInfo(f)
     Args["OperatorArg"] = {"window":window,"min_periods":min_periods,"win_type":win_type}
-    return TimeOperation(kwargs.pop("factor_name", str(uuid.uuid1())),Descriptors,{"算子":_rolling_median,"参数":Args,"回溯期数":[window-1]*len(Descriptors),"运算时点":"多时点","运算ID":"多ID"}, **kwargs)
+    return TimeOperation(kwargs.pop("factor_name", None),Descriptors,{"算子":_rolling_median,"参数":Args,"回溯期数":[window-1]*len(Descriptors),"运算时点":"多时点","运算ID":"多ID"}, **kwargs)
 def _rolling_skew(f,idt,iid,x,args):
     Data = pd.DataFrame(_genOperatorData(f,idt,iid,x,args)[0])
     return Data.rolling(**args["OperatorArg"]).skew().values[args["OperatorArg"]["window"]-1:]
 def rolling_skew(f, window, min_periods=1, win_type=None, **kwargs):
     Descriptors,Args = _genMultivariateOperatorInfo(f)
     Args["OperatorArg"] = {"window":window,"min_periods":min_periods,"win_type":win_type}
-    return TimeOperation(kwargs.pop("factor_name", str(uuid.uuid1())),Descriptors,{"算子":_rolling_skew,"参数":Args,"回溯期数":[window-1]*len(Descriptors),"运算时点":"多时点","运算ID":"多ID"}, **kwargs)
+    return TimeOperation(kwargs.pop("factor_name", None),Descriptors,{"算子":_rolling_skew,"参数":Args,"回溯期数":[window-1]*len(Descriptors),"运算时点":"多时点","运算ID":"多ID"}, **kwargs)
 def _rolling_kurt(f,idt,iid,x,args):
     Data = pd.DataFrame(_genOperatorData(f,idt,iid,x,args)[0])
     return Data.rolling(**args["OperatorArg"]).kurt().values[args["OperatorArg"]["window"]-1:]
 def rolling_kurt(f, window, min_periods=1, win_type=None, **kwargs):
     Descriptors,Args = _genMultivariateOperatorInfo(f)
     Args["OperatorArg"] = {"window":window,"min_periods":min_periods,"win_type":win_type}
-    return TimeOperation(kwargs.pop("factor_name", str(uuid.uuid1())),Descriptors,{"算子":_rolling_kurt,"参数":Args,"回溯期数":[window-1]*len(Descriptors),"运算时点":"多时点","运算ID":"多ID"}, **kwargs)
+    return TimeOperation(kwargs.pop("factor_name", None),Descriptors,{"算子":_rolling_kurt,"参数":Args,"回溯期数":[window-1]*len(Descriptors),"运算时点":"多时点","运算ID":"多ID"}, **kwargs)
 def _rolling_var(f,idt,iid,x,args):
-    Data = pd.DataFrame(_genOperatorData(f,idt,iid,x,args)[0])
+    Data = _genOperatorData(f,idt,iid,x,args)[0]
     OperatorArg = args["OperatorArg"].copy()
     SubOperatorArg = OperatorArg.pop("SubOperatorArg", {})
-    return Data.rolling(**OperatorArg).apply(lambda x:np.nanvar(x, **SubOperatorArg), raw=True).values[args["OperatorArg"]["window"]-1:]
+    if _isStreaming(f, args): return _calcStream(f, _rollingKernel, Data, window=OperatorArg["window"], min_periods=OperatorArg["min_periods"], stat="var", ddof=SubOperatorArg["ddof"])
+    return pd.DataFrame(Data).rolling(**OperatorArg).apply(lambda x:np.nanvar(x, **SubOperatorArg), raw=True).values[args["OperatorArg"]["window"]-1:]
 def rolling_var(f, window, min_periods=1, win_type=None, ddof=1, **kwargs):
     Descriptors,Args = _genMultivariateOperatorInfo(f)
     Args["OperatorArg"] = {"window":window,"min_periods":min_periods,"win_type":win_type,"SubOperatorArg":{"ddof":ddof}}
-    return TimeOperation(kwargs.pop("factor_name", str(uuid.uuid1())),Descriptors,{"算子":_rolling_var,"参数":Args,"回溯期数":[window-1]*len(Descriptors),"运算时点":"多时点","运算ID":"多ID"}, **kwargs)
+    return TimeOperation(kwargs.pop("factor_name", None),Descriptors,{"算子":_rolling_var,"参数":Args,"回溯期数":[window-1]*len(Descriptors),"运算时点":"多时点","运算ID":"多ID"}, **kwargs)
 def _rolling_quantile(f,idt,iid,x,args):
     Data = pd.DataFrame(_genOperatorData(f,idt,iid,x,args)[0])
     OperatorArg = args["OperatorArg"].copy()
@@ -416,14 +507,15 @@ def _rolling_quantile(f,idt,iid,x,args):
 def rolling_quantile(f, window, quantile=0.5, min_periods=1, win_type=None, **kwargs):
     Descriptors,Args = _genMultivariateOperatorInfo(f)
     Args["OperatorArg"] = {"window":window,"min_periods":min_periods,"win_type":win_type,"SubOperatorArg":{"quantile":quantile}}
-    return TimeOperation(kwargs.pop("factor_name", str(uuid.uuid1())),Descriptors,{"算子":_rolling_quantile,"参数":Args,"回溯期数":[window-1]*len(Descriptors),"运算时点":"多时点","运算ID":"多ID"}, **kwargs)
+    return TimeOperation(kwargs.pop("factor_name", None),Descriptors,{"算子":_rolling_quantile,"参数":Args,"回溯期数":[window-1]*len(Descriptors),"运算时点":"多时点","运算ID":"多ID"}, **kwargs)
 def _rolling_count(f,idt,iid,x,args):
-    Data = pd.DataFrame(_genOperatorData(f,idt,iid,x,args)[0])
-    return Data.rolling(**args["OperatorArg"]).count().values[args["OperatorArg"]["window"]-1:]
+    Data = _genOperatorData(f,idt,iid,x,args)[0]
+    if _isStreaming(f, args): return _calcStream(f, _rollingKernel, Data, window=args["OperatorArg"]["window"], min_periods=0, stat="count")
+    return pd.DataFrame(Data).rolling(**args["OperatorArg"]).count().values[args["OperatorArg"]["window"]-1:]
 def rolling_count(f, window, **kwargs):
     Descriptors,Args = _genMultivariateOperatorInfo(f)
     Args["OperatorArg"] = {"window":window}
-    return TimeOperation(kwargs.pop("factor_name", str(uuid.uuid1())),Descriptors,{"算子":_rolling_count,"参数":Args,"回溯期数":[window-1]*len(Descriptors),"运算时点":"多时点","运算ID":"多ID"}, **kwargs)
+    return TimeOperation(kwargs.pop("factor_name", None),Descriptors,{"算子":_rolling_count,"参数":Args,"回溯期数":[window-1]*len(Descriptors),"运算时点":"多时点","运算ID":"多ID"}, **kwargs)
 def _rolling_change_rate(f,idt,iid,x,args):
     Data = _genOperatorData(f,idt,iid,x,args)[0]
     Numerator = Data[args["OperatorArg"]["window"]-1:]
@@ -438,81 +530,81 @@ def _rolling_change_rate(f,idt,iid,x,args):
 def rolling_change_rate(f, window, **kwargs):
     Descriptors,Args = _genMultivariateOperatorInfo(f)
     Args["OperatorArg"] = {"window":window}
-    return TimeOperation(kwargs.pop("factor_name", str(uuid.uuid1())),Descriptors,{"算子":_rolling_change_rate,"参数":Args,"回溯期数":[window-1]*len(Descriptors),"运算时点":"多时点","运算ID":"多ID"}, **kwargs)
+    return TimeOperation(kwargs.pop("factor_name", None),Descriptors,{"算子":_rolling_change_rate,"参数":Args,"回溯期数":[window-1]*len(Descriptors),"运算时点":"多时点","运算ID":"多ID"}, **kwargs)
 def _rolling_rank(f,idt,iid,x,args):
     Data = pd.DataFrame(_genOperatorData(f,idt,iid,x,args)[0])
     return Data.rolling(**args["OperatorArg"]).apply(lambda s: np.sort(s).searchsorted(s[-1])).values[args["OperatorArg"]["window"]-1:]
 def rolling_rank(f, window, min_periods=1, win_type=None, **kwargs):
     Descriptors,Args = _genMultivariateOperatorInfo(f)
     Args["OperatorArg"] = {"window":window,"min_periods":min_periods,"win_type":win_type}
-    return TimeOperation(kwargs.pop("factor_name", str(uuid.uuid1())),Descriptors,{"算子":_rolling_rank,"参数":Args,"回溯期数":[window-1]*len(Descriptors),"运算时点":"多时点","运算ID":"多ID"}, **kwargs)
+    return TimeOperation(kwargs.pop("factor_name", None),Descriptors,{"算子":_rolling_rank,"参数":Args,"回溯期数":[window-1]*len(Descriptors),"运算时点":"多时点","运算ID":"多ID"}, **kwargs)
 def _expanding_mean(f,idt,iid,x,args):
-    Data = pd.DataFrame(_genOperatorData(f,idt,iid,x,args)[0])
-    return Data.expanding(**args["OperatorArg"]).mean().values[args["OperatorArg"]["min_periods"]-1:]
+    Data = _genOperatorData(f,idt,iid,x,args)[0]
+    return pd.DataFrame(Data).expanding(**args["OperatorArg"]).mean().values[args["OperatorArg"]["min_periods"]-1:]
 def expanding_mean(f, min_periods=1, **kwargs):
     Descriptors,Args = _genMultivariateOperatorInfo(f)
     Args["OperatorArg"] = {"min_periods":min_periods}
-    return TimeOperation(kwargs.pop("factor_name", str(uuid.uuid1())),Descriptors,{"算子":_expanding_mean,"参数":Args,"回溯期数":[min_periods-1]*len(Descriptors),"运算时点":"多时点","运算ID":"多ID"}, **kwargs)
+    return TimeOperation(kwargs.pop("factor_name", None),Descriptors,{"算子":_expanding_mean,"参数":Args,"回溯期数":[min_periods-1]*len(Descriptors),"运算时点":"多时点","运算ID":"多ID"}, **kwargs)
 def _expanding_sum(f,idt,iid,x,args):
-    Data = pd.DataFrame(_genOperatorData(f,idt,iid,x,args)[0])
-    return Data.expanding(**args["OperatorArg"]).sum().values[args["OperatorArg"]["min_periods"]-1:]
+    Data = _genOperatorData(f,idt,iid,x,args)[0]
+    return pd.DataFrame(Data).expanding(**args["OperatorArg"]).sum().values[args["OperatorArg"]["min_periods"]-1:]
 def expanding_sum(f, min_periods=1, **kwargs):
     Descriptors,Args = _genMultivariateOperatorInfo(f)
     Args["OperatorArg"] = {"min_periods":min_periods}
-    return TimeOperation(kwargs.pop("factor_name", str(uuid.uuid1())),Descriptors,{"算子":_expanding_sum,"参数":Args,"回溯期数":[min_periods-1]*len(Descriptors),"运算时点":"多时点","运算ID":"多ID"}, **kwargs)
+    return TimeOperation(kwargs.pop("factor_name", None),Descriptors,{"算子":_expanding_sum,"参数":Args,"回溯期数":[min_periods-1]*len(Descriptors),"运算时点":"多时点","运算ID":"多ID"}, **kwargs)
 def _expanding_std(f,idt,iid,x,args):
-    Data = pd.DataFrame(_genOperatorData(f,idt,iid,x,args)[0])
+    Data = _genOperatorData(f,idt,iid,x,args)[0]
     OperatorArg = args["OperatorArg"].copy()
     SubOperatorArg = OperatorArg.pop("SubOperatorArg", {})
-    return Data.expanding(**OperatorArg).std(**SubOperatorArg).values[args["OperatorArg"]["min_periods"]-1:]
+    return pd.DataFrame(Data).expanding(**OperatorArg).std(**SubOperatorArg).values[args["OperatorArg"]["min_periods"]-1:]
 def expanding_std(f, min_periods=1, ddof=1, **kwargs):
     Descriptors,Args = _genMultivariateOperatorInfo(f)
     Args["OperatorArg"] = {"min_periods":min_periods,"SubOperatorArg":{"ddof":ddof}}
-    return TimeOperation(kwargs.pop("factor_name", str(uuid.uuid1())),Descriptors,{"算子":_expanding_std,"参数":Args,"回溯期数":[min_periods-1]*len(Descriptors),"运算时点":"多时点","运算ID":"多ID"}, **kwargs)
+    return TimeOperation(kwargs.pop("factor_name", None),Descriptors,{"算子":_expanding_std,"参数":Args,"回溯期数":[min_periods-1]*len(Descriptors),"运算时点":"多时点","运算ID":"多ID"}, **kwargs)
 def _expanding_max(f,idt,iid,x,args):
-    Data = pd.DataFrame(_genOperatorData(f,idt,iid,x,args)[0])
-    return Data.expanding(**args["OperatorArg"]).max().values[args["OperatorArg"]["min_periods"]-1:]
+    Data = _genOperatorData(f,idt,iid,x,args)[0]
+    return pd.DataFrame(Data).expanding(**args["OperatorArg"]).max().values[args["OperatorArg"]["min_periods"]-1:]
 def expanding_max(f, min_periods=1, **kwargs):
     Descriptors,Args = _genMultivariateOperatorInfo(f)
     Args["OperatorArg"] = {"min_periods":min_periods}
-    return TimeOperation(kwargs.pop("factor_name", str(uuid.uuid1())),Descriptors,{"算子":_expanding_max,"参数":Args,"回溯期数":[min_periods-1]*len(Descriptors),"运算时点":"多时点","运算ID":"多ID"}, **kwargs)
+    return TimeOperation(kwargs.pop("factor_name", None),Descriptors,{"算子":_expanding_max,"参数":Args,"回溯期数":[min_periods-1]*len(Descriptors),"运算时点":"多时点","运算ID":"多ID"}, **kwargs)
 def _expanding_min(f,idt,iid,x,args):
-    Data = pd.DataFrame(_genOperatorData(f,idt,iid,x,args)[0])
-    return Data.expanding(**args["OperatorArg"]).min().values[args["OperatorArg"]["min_periods"]-1:]
+    Data = _genOperatorData(f,idt,iid,x,args)[0]
+    return pd.DataFrame(Data).expanding(**args["OperatorArg"]).min().values[args["OperatorArg"]["min_periods"]-1:]
 def expanding_min(f, min_periods=1, **kwargs):
     Descriptors,Args = _genMultivariateOperatorInfo(f)
     Args["OperatorArg"] = {"min_periods":min_periods}
-    return TimeOperation(kwargs.pop("factor_name", str(uuid.uuid1())),Descriptors,{"算子":_expanding_min,"参数":Args,"回溯期数":[min_periods-1]*len(Descriptors),"运算时点":"多时点","运算ID":"多ID"}, **kwargs)
+    return TimeOperation(kwargs.pop("factor_name", None),Descriptors,{"算子":_expanding_min,"参数":Args,"回溯期数":[min_periods-1]*len(Descriptors),"运算时点":"多时点","运算ID":"多ID"}, **kwargs)
 def _expanding_median(f,idt,iid,x,args):
     Data = pd.DataFrame(_genOperatorData(f,idt,iid,x,args)[0])
     return Data.expanding(**args["OperatorArg"]).median().values[args["OperatorArg"]["min_periods"]-1:]
 def expanding_median(f, min_periods=1, **kwargs):
     Descriptors,Args = _genMultivariateOperatorInfo(f)
     Args["OperatorArg"] = {"min_periods":min_periods}
-    return TimeOperation(kwargs.pop("factor_name", str(uuid.uuid1())),Descriptors,{"算子":_expanding_median,"参数":Args,"回溯期数":[min_periods-1]*len(Descriptors),"运算时点":"多时点","运算ID":"多ID"}, **kwargs)
+    return TimeOperation(kwargs.pop("factor_name", None),Descriptors,{"算子":_expanding_median,"参数":Args,"回溯期数":[min_periods-1]*len(Descriptors),"运算时点":"多时点","运算ID":"多ID"}, **kwargs)
 def _expanding_skew(f,idt,iid,x,args):
     Data = pd.DataFrame(_genOperatorData(f,idt,iid,x,args)[0])
     return Data.expanding(**args["OperatorArg"]).skew().values[args["OperatorArg"]["min_periods"]-1:]
 def expanding_skew(f, min_periods=1, **kwargs):
     Descriptors,Args = _genMultivariateOperatorInfo(f)
     Args["OperatorArg"] = {"min_periods":min_periods}
-    return TimeOperation(kwargs.pop("factor_name", str(uuid.uuid1())),Descriptors,{"算子":_expanding_skew,"参数":Args,"回溯期数":[min_periods-1]*len(Descriptors),"运算时点":"多时点","运算ID":"多ID"}, **kwargs)
+    return TimeOperation(kwargs.pop("factor_name", None),Descriptors,{"算子":_expanding_skew,"参数":Args,"回溯期数":[min_periods-1]*len(Descriptors),"运算时点":"多时点","运算ID":"多ID"}, **kwargs)
 def _expanding_kurt(f,idt,iid,x,args):
     Data = pd.DataFrame(_genOperatorData(f,idt,iid,x,args)[0])
     return Data.expanding(**args["OperatorArg"]).kurt().values[args["OperatorArg"]["min_periods"]-1:]
 def expanding_kurt(f, min_periods=1, **kwargs):
     Descriptors,Args = _genMultivariateOperatorInfo(f)
     Args["OperatorArg"] = {"min_periods":min_periods}
-    return TimeOperation(kwargs.pop("factor_name", str(uuid.uuid1())),Descriptors,{"算子":_expanding_kurt,"参数":Args,"回溯期数":[min_periods-1]*len(Descriptors),"运算时点":"多时点","运算ID":"多ID"}, **kwargs)
+    return TimeOperation(kwargs.pop("factor_name", None),Descriptors,{"算子":_expanding_kurt,"参数":Args,"回溯期数":[min_periods-1]*len(Descriptors),"运算时点":"多时点","运算ID":"多ID"}, **kwargs)
 def _expanding_var(f,idt,iid,x,args):
-    Data = pd.DataFrame(_genOperatorData(f,idt,iid,x,args)[0])
+    Data = _genOperatorData(f,idt,iid,x,args)[0]
     OperatorArg = args["OperatorArg"].copy()
     SubOperatorArg = OperatorArg.pop("SubOperatorArg", {})
-    return Data.expanding(**OperatorArg).var(**SubOperatorArg).values[args["OperatorArg"]["min_periods"]-1:]
+    return pd.DataFrame(Data).expanding(**OperatorArg).var(**SubOperatorArg).values[args["OperatorArg"]["min_periods"]-1:]
 def expanding_var(f, min_periods=1, ddof=1, **kwargs):
     Descriptors,Args = _genMultivariateOperatorInfo(f)
     Args["OperatorArg"] = {"min_periods":min_periods,"SubOperatorArg":{"ddof":ddof}}
-    return TimeOperation(kwargs.pop("factor_name", str(uuid.uuid1())),Descriptors,{"算子":_expanding_var,"参数":Args,"回溯期数":[min_periods-1]*len(Descriptors),"运算时点":"多时点","运算ID":"多ID"}, **kwargs)
+    return TimeOperation(kwargs.pop("factor_name", None),Descriptors,{"算子":_expanding_var,"参数":Args,"回溯期数":[min_periods-1]*len(Descriptors),"运算时点":"多时点","运算ID":"多ID"}, **kwargs)
 def _expanding_quantile(f,idt,iid,x,args):
     Data = pd.DataFrame(_genOperatorData(f,idt,iid,x,args)[0])
     OperatorArg = args["OperatorArg"].copy()
@@ -521,55 +613,63 @@ def _expanding_quantile(f,idt,iid,x,args):
 def expanding_quantile(f, quantile=0.5, min_periods=1, **kwargs):
     Descriptors,Args = _genMultivariateOperatorInfo(f)
     Args["OperatorArg"] = {"min_periods":min_periods,"SubOperatorArg":{"quantile":quantile}}
-    return TimeOperation(kwargs.pop("factor_name", str(uuid.uuid1())),Descriptors,{"算子":_expanding_quantile,"参数":Args,"回溯期数":[min_periods-1]*len(Descriptors),"运算时点":"多时点","运算ID":"多ID"}, **kwargs)
+    return TimeOperation(kwargs.pop("factor_name", None),Descriptors,{"算子":_expanding_quantile,"参数":Args,"回溯期数":[min_periods-1]*len(Descriptors),"运算时点":"多时点","运算ID":"多ID"}, **kwargs)
 def _expanding_count(f,idt,iid,x,args):
-    Data = pd.DataFrame(_genOperatorData(f,idt,iid,x,args)[0])
-    return Data.expanding(**args["OperatorArg"]).count().values[args["OperatorArg"]["min_periods"]-1:]
+    Data = _genOperatorData(f,idt,iid,x,args)[0]
+    return pd.DataFrame(Data).expanding(**args["OperatorArg"]).count().values[args["OperatorArg"]["min_periods"]-1:]
 def expanding_count(f, min_periods=1, **kwargs):
     Descriptors,Args = _genMultivariateOperatorInfo(f)
     Args["OperatorArg"] = {"min_periods":min_periods}
-    return TimeOperation(kwargs.pop("factor_name", str(uuid.uuid1())),Descriptors,{"算子":_expanding_count,"参数":Args,"回溯期数":[min_periods-1]*len(Descriptors),"运算时点":"多时点","运算ID":"多ID"}, **kwargs)
+    return TimeOperation(kwargs.pop("factor_name", None),Descriptors,{"算子":_expanding_count,"参数":Args,"回溯期数":[min_periods-1]*len(Descriptors),"运算时点":"多时点","运算ID":"多ID"}, **kwargs)
 def _ewm_mean(f,idt,iid,x,args):
-    Data = pd.DataFrame(_genOperatorData(f,idt,iid,x,args)[0])
-    return Data.ewm(**args["OperatorArg"]).mean().values[args["OperatorArg"]["min_periods"]-1:]
+    Data = _genOperatorData(f,idt,iid,x,args)[0]
+    return pd.DataFrame(Data).ewm(**args["OperatorArg"]).mean().values[args["OperatorArg"]["min_periods"]:]
 def ewm_mean(f, com=None, span=None, halflife=None, alpha=None, min_periods=0, adjust=True, ignore_na=False, **kwargs):
     Descriptors,Args = _genMultivariateOperatorInfo(f)
     Args["OperatorArg"] = {"com":com,"span":span,"halflife":halflife,"alpha":alpha,
                            "min_periods":min_periods,"adjust":adjust,"ignore_na":ignore_na}
-    return TimeOperation(kwargs.pop("factor_name", str(uuid.uuid1())),Descriptors,{"算子":_ewm_mean,"参数":Args,"回溯期数":[min_periods]*len(Descriptors),"运算时点":"多时点","运算ID":"多ID"}, **kwargs)
+    return TimeOperation(kwargs.pop("factor_name", None),Descriptors,{"算子":_ewm_mean,"参数":Args,"回溯期数":[min_periods]*len(Descriptors),"运算时点":"多时点","运算ID":"多ID"}, **kwargs)
 def _ewm_std(f,idt,iid,x,args):
     Data = pd.DataFrame(_genOperatorData(f,idt,iid,x,args)[0])
     OperatorArg = args["OperatorArg"].copy()
     SubOperatorArg = OperatorArg.pop("SubOperatorArg",{})
-    return Data.ewm(**OperatorArg).std(**SubOperatorArg).values[args["OperatorArg"]["min_periods"]-1:]
+    return Data.ewm(**OperatorArg).std(**SubOperatorArg).values[args["OperatorArg"]["min_periods"]:]
 def ewm_std(f, com=None, span=None, halflife=None, alpha=None, min_periods=0, adjust=True, ignore_na=False, bias=False, **kwargs):
     Descriptors,Args = _genMultivariateOperatorInfo(f)
     Args["OperatorArg"] = {"com":com,"span":span,"halflife":halflife,"alpha":alpha,"min_periods":min_periods,
                            "adjust":adjust,"ignore_na":ignore_na,"SubOperatorArg":{"bias":bias}}
-    return TimeOperation(kwargs.pop("factor_name", str(uuid.uuid1())),Descriptors,{"算子":_ewm_std,"参数":Args,"回溯期数":[min_periods]*len(Descriptors),"运算时点":"多时点","运算ID":"多ID"}, **kwargs)
+    return TimeOperation(kwargs.pop("factor_name", None),Descriptors,{"算子":_ewm_std,"参数":Args,"回溯期数":[min_periods]*len(Descriptors),"运算时点":"多时点","运算ID":"多ID"}, **kwargs)
 def _ewm_var(f,idt,iid,x,args):
     Data = pd.DataFrame(_genOperatorData(f,idt,iid,x,args)[0])
     OperatorArg = args["OperatorArg"].copy()
     SubOperatorArg = OperatorArg.pop("SubOperatorArg",{})
-    return Data.ewm(**OperatorArg).var(**SubOperatorArg).values[args["OperatorArg"]["min_periods"]-1:]
+    return Data.ewm(**OperatorArg).var(**SubOperatorArg).values[args["OperatorArg"]["min_periods"]:]
 def ewm_var(f, com=None, span=None, halflife=None, alpha=None, min_periods=0, adjust=True, ignore_na=False, bias=False, **kwargs):
     Descriptors,Args = _genMultivariateOperatorInfo(f)
     Args["OperatorArg"] = {"com":com,"span":span,"halflife":halflife,"alpha":alpha,"min_periods":min_periods,
                            "adjust":adjust,"ignore_na":ignore_na,"SubOperatorArg":{"bias":bias}}
-    return TimeOperation(kwargs.pop("factor_name", str(uuid.uuid1())),Descriptors,{"算子":_ewm_var,"参数":Args,"回溯期数":[min_periods]*len(Descriptors),"运算时点":"多时点","运算ID":"多ID"}, **kwargs)
+    return TimeOperation(kwargs.pop("factor_name", None),Descriptors,{"算子":_ewm_var,"参数":Args,"回溯期数":[min_periods]*len(Descriptors),"运算时点":"多时点","运算ID":"多ID"}, **kwargs)
+# 将两个描述子的数据合并成 array(shape=(nDT, nID, 2)), 标量会被广播
+def _stackPair(data1, data2):
+    data1, data2 = np.broadcast_arrays(np.array(data1, dtype="float"), np.array(data2, dtype="float"))
+    return np.stack((data1, data2), axis=-1)
 def _rolling_cov(f,idt,iid,x,args):
     Data1,Data2 = _genOperatorData(f,idt,iid,x,args)
     OperatorArg = args["OperatorArg"].copy()
     SubOperatorArg = OperatorArg.pop("SubOperatorArg",{})
+    if OperatorArg["win_type"] is None:
+        return _calcStream(f, _rollingCovKernel, _stackPair(Data1, Data2), window=OperatorArg["window"], min_periods=OperatorArg["min_periods"], stat="cov", ddof=SubOperatorArg.get("ddof", 1))
     return pd.DataFrame(Data1).rolling(**OperatorArg).cov(pd.DataFrame(Data2),**SubOperatorArg).values[args["OperatorArg"]["window"]-1:]
 def rolling_cov(f1, f2, window, min_periods=1, win_type=None, ddof=1, **kwargs):
     Descriptors,Args = _genMultivariateOperatorInfo(f1,f2)
     Args["OperatorArg"] = {"window":window,"min_periods":min_periods,"win_type":win_type,"SubOperatorArg":{"ddof":ddof}}
-    return TimeOperation(kwargs.pop("factor_name", str(uuid.uuid1())),Descriptors,{"算子":_rolling_cov,"参数":Args,"回溯期数":[window-1]*len(Descriptors),"运算时点":"多时点","运算ID":"多ID"}, **kwargs)
+    return TimeOperation(kwargs.pop("factor_name", None),Descriptors,{"算子":_rolling_cov,"参数":Args,"回溯期数":[window-1]*len(Descriptors),"运算时点":"多时点","运算ID":"多ID"}, **kwargs)
 def _rolling_corr(f,idt,iid,x,args):
     Data1,Data2 = _genOperatorData(f,idt,iid,x,args)
     Method = args["OperatorArg"]["method"]
-    if Method=="pearson":
+    if (Method=="pearson") and (args["OperatorArg"]["win_type"] is None):
+        return _calcStream(f, _rollingCovKernel, _stackPair(Data1, Data2), window=args["OperatorArg"]["window"], min_periods=args["OperatorArg"]["min_periods"], stat="corr")
+    elif Method=="pearson":
         return pd.DataFrame(Data1).rolling(window=args["OperatorArg"]["window"], min_periods=args["OperatorArg"]["min_periods"], win_type=args["OperatorArg"]["win_type"]).corr(pd.DataFrame(Data2)).values[args["OperatorArg"]["window"]-1:]
     Mask = np.sum(pd.notnull(Data1) & pd.notnull(Data2), axis=0)
     Rslt = pd.DataFrame(Data1).corrwith(pd.DataFrame(Data2), axis=0, drop=False, method=Method).values
@@ -579,35 +679,56 @@ def rolling_corr(f1, f2, window, min_periods=1, method="pearson", win_type=None,
     Descriptors,Args = _genMultivariateOperatorInfo(f1,f2)
     Args["OperatorArg"] = {"window":window,"min_periods":min_periods,"win_type":win_type,"method":method}
     if method=="pearson":
-        return TimeOperation(kwargs.pop("factor_name", str(uuid.uuid1())),Descriptors,{"算子":_rolling_corr,"参数":Args,"回溯期数":[window-1]*len(Descriptors),"运算时点":"多时点","运算ID":"多ID"}, **kwargs)
+        return TimeOperation(kwargs.pop("factor_name", None),Descriptors,{"算子":_rolling_corr,"参数":Args,"回溯期数":[window-1]*len(Descriptors),"运算时点":"多时点","运算ID":"多ID"}, **kwargs)
     else:
-        return TimeOperation(kwargs.pop("factor_name", str(uuid.uuid1())),Descriptors,{"算子":_rolling_corr,"参数":Args,"回溯期数":[window-1]*len(Descriptors),"运算时点":"单时点","运算ID":"多ID"}, **kwargs)
+        return TimeOperation(kwargs.pop("factor_name", None),Descriptors,{"算子":_rolling_corr,"参数":Args,"回溯期数":[window-1]*len(Descriptors),"运算时点":"单时点","运算ID":"多ID"}, **kwargs)
+# 所有窗口和 ID 的加权最小二乘回归同时计算, 结果和 statsmodels 的 WLS(missing='drop') 一致, 缺失样本的权重置为 0
 def _rolling_regress(f,idt,iid,x,args):
     X = _genOperatorData(f,idt,iid,x,args)
-    Y = X[0]
-    if args["OperatorArg"]['constant']:
-        X = np.array([np.ones(Y.shape)]+X[1:])
+    Y = np.array(X[0], dtype="float")
+    KConst = (1 if args["OperatorArg"]['constant'] else 0)
+    if KConst:
+        X = np.array([np.ones(Y.shape)]+X[1:], dtype="float")
     else:
-        X = np.array(X[1:])
+        X = np.array(X[1:], dtype="float")
     Window = args["OperatorArg"]['window']
     Weight = (0.5**(1/args["OperatorArg"]['half_life']))**np.arange(Window)
     Weight = Weight[::-1]/np.sum(Weight)
-    Rslt = np.empty((Y.shape[0]-Window+1,Y.shape[1]),dtype="O")
+    nDT = Y.shape[0]-Window+1
+    Mask = (pd.notnull(Y) & np.all(pd.notnull(X), axis=0))
+    Y, X = np.where(Mask, Y, 0), np.moveaxis(np.where(Mask, X, 0), 0, -1)
+    Mask = _genRollingView(Mask.astype("float"), Window, nDT)# (nDT, Window, nID)
+    WMask = Mask * Weight.reshape((1, Window, 1))
+    Y, X = _genRollingView(Y, Window, nDT), _genRollingView(X, Window, nDT)# (nDT, Window, nID), (nDT, Window, nID, nX)
+    XtWX = np.einsum("rwn,rwna,rwnb->rnab", WMask, X, X)
+    NObs, Rank = Mask.sum(axis=1), np.linalg.matrix_rank(XtWX)
+    CovParams = np.linalg.pinv(XtWX)
+    Params = np.einsum("rnab,rnb->rna", CovParams, np.einsum("rwn,rwna,rwn->rna", WMask, X, Y))
+    SSR = np.einsum("rwn,rwn->rn", WMask, (Y - np.einsum("rwna,rna->rwn", X, Params))**2)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        if KConst:# 有常数项时使用加权中心化的总平方和
+            YMean = np.einsum("rwn,rwn->rn", WMask, Y) / WMask.sum(axis=1)
+            TSS = np.einsum("rwn,rwn->rn", WMask, (Y - YMean[:, np.newaxis, :])**2)
+        else:
+            TSS = np.einsum("rwn,rwn->rn", WMask, Y**2)
+        DFResid, DFModel = NObs - Rank, Rank - KConst
+        Scale = SSR / DFResid
+        TValues = Params / np.sqrt(np.diagonal(CovParams, axis1=2, axis2=3) * Scale[..., np.newaxis])
+        RSquared = 1 - SSR / TSS
+        RSquaredAdj = 1 - (NObs - KConst) / DFResid * (1 - RSquared)
+        FValue = (TSS - SSR) / DFModel / Scale
+    Stats = np.concatenate((Params, TValues, FValue[..., np.newaxis], RSquared[..., np.newaxis], RSquaredAdj[..., np.newaxis]), axis=-1)
+    Stats[NObs==0] = np.nan
+    Rslt = np.empty(Stats.shape[:2], dtype="O")
     for i in range(Rslt.shape[0]):
         for j in range(Rslt.shape[1]):
-            iY = Y[i:i+Window,j]
-            iX = X[:,i:i+Window,j].T
-            try:
-                iRslt = sm.WLS(iY,iX,missing='drop').fit()
-                Rslt[i,j] = tuple(iRslt.params)+tuple(iRslt.tvalues)+(iRslt.fvalue,iRslt.rsquared,iRslt.rsquared_adj)
-            except:
-                Rslt[i,j] = (np.nan,)*int(X.shape[0]*2+3)
+            Rslt[i,j] = tuple(Stats[i,j])
     return Rslt
 def rolling_regress(Y, *X, window=20, constant=True, half_life=np.inf, **kwargs):
     Descriptors,Args = _genMultivariateOperatorInfo(*((Y,)+X))
     Args["OperatorArg"] = {"window":window,"constant":constant,"half_life":half_life}
     nX = len(X)
-    f = TimeOperation(kwargs.pop("factor_name", str(uuid.uuid1())),Descriptors,{"算子":_rolling_regress,"参数":Args,"回溯期数":[window-1]*len(Descriptors),"运算时点":"多时点","运算ID":"多ID","数据类型":"object"}, **kwargs)
+    f = TimeOperation(kwargs.pop("factor_name", None),Descriptors,{"算子":_rolling_regress,"参数":Args,"回溯期数":[window-1]*len(Descriptors),"运算时点":"多时点","运算ID":"多ID","数据类型":"object"}, **kwargs)
     if constant:
         DataType = [('alpha',np.float)]+[('beta'+str(i),np.float) for i in range(nX)]
         DataType += [('t_alpha',np.float)]+[('t_beta'+str(i),np.float) for i in range(nX)]
@@ -631,7 +752,7 @@ def _rolling_regress_change(f,idt,iid,x,args):
 def rolling_regress_change(f, window=20, min_periods=2, **kwargs):
     Descriptors,Args = _genMultivariateOperatorInfo(f)
     Args["OperatorArg"] = {"min_periods":min_periods}
-    return PointOperation(kwargs.pop("factor_name", str(uuid.uuid1())),Descriptors,{"算子":_rolling_regress_change,"参数":Args,"运算时点":"单时点","运算ID":"多ID"}, **kwargs)
+    return PointOperation(kwargs.pop("factor_name", None),Descriptors,{"算子":_rolling_regress_change,"参数":Args,"运算时点":"单时点","运算ID":"多ID"}, **kwargs)
 def _expanding_cov(f,idt,iid,x,args):
     Data1,Data2 = _genOperatorData(f,idt,iid,x,args)
     OperatorArg = args["OperatorArg"].copy()
@@ -640,32 +761,32 @@ def _expanding_cov(f,idt,iid,x,args):
 def expanding_cov(f1, f2, min_periods=1, ddof=1, **kwargs):
     Descriptors,Args = _genMultivariateOperatorInfo(f1,f2)
     Args["OperatorArg"] = {"min_periods":min_periods,"SubOperatorArg":{"ddof":ddof}}
-    return TimeOperation(kwargs.pop("factor_name", str(uuid.uuid1())),Descriptors,{"算子":_expanding_cov,"参数":Args,"回溯期数":[min_periods-1]*len(Descriptors),"运算时点":"多时点","运算ID":"多ID"}, **kwargs)
+    return TimeOperation(kwargs.pop("factor_name", None),Descriptors,{"算子":_expanding_cov,"参数":Args,"回溯期数":[min_periods-1]*len(Descriptors),"运算时点":"多时点","运算ID":"多ID"}, **kwargs)
 def _expanding_corr(f,idt,iid,x,args):
     Data1,Data2 = _genOperatorData(f,idt,iid,x,args)
     return pd.DataFrame(Data1).expanding(**args["OperatorArg"]).corr(pd.DataFrame(Data2)).values[args["OperatorArg"]["min_periods"]-1:]
 def expanding_corr(f1, f2, min_periods=1, **kwargs):
     Descriptors,Args = _genMultivariateOperatorInfo(f1,f2)
     Args["OperatorArg"] = {"min_periods":min_periods}
-    return TimeOperation(kwargs.pop("factor_name", str(uuid.uuid1())),Descriptors,{"算子":_expanding_corr,"参数":Args,"回溯期数":[min_periods-1]*len(Descriptors),"运算时点":"多时点","运算ID":"多ID"}, **kwargs)
+    return TimeOperation(kwargs.pop("factor_name", None),Descriptors,{"算子":_expanding_corr,"参数":Args,"回溯期数":[min_periods-1]*len(Descriptors),"运算时点":"多时点","运算ID":"多ID"}, **kwargs)
 def _ewm_cov(f,idt,iid,x,args):
     Data1,Data2 = _genOperatorData(f,idt,iid,x,args)
     OperatorArg = args["OperatorArg"].copy()
     SubOperatorArg = OperatorArg.pop("SubOperatorArg",{})
-    return pd.DataFrame(Data1).ewm(**OperatorArg).cov(pd.DataFrame(Data2),**SubOperatorArg).values[args["OperatorArg"]["min_periods"]-1:]
+    return pd.DataFrame(Data1).ewm(**OperatorArg).cov(pd.DataFrame(Data2),**SubOperatorArg).values[args["OperatorArg"]["min_periods"]:]
 def ewm_cov(f1, f2, com=None, span=None, halflife=None, alpha=None, min_periods=0, adjust=True, ignore_na=False, bias=False, **kwargs):
     Descriptors,Args = _genMultivariateOperatorInfo(f1,f2)
     Args["OperatorArg"] = {"com":com,"span":span,"halflife":halflife,"min_periods":min_periods,
                            "adjust":adjust,"ignore_na":ignore_na,"SubOperatorArg":{"bias":bias}}
-    return TimeOperation(kwargs.pop("factor_name", str(uuid.uuid1())),Descriptors,{"算子":_ewm_cov,"参数":Args,"回溯期数":[min_periods]*len(Descriptors),"运算时点":"多时点","运算ID":"多ID"}, **kwargs)
+    return TimeOperation(kwargs.pop("factor_name", None),Descriptors,{"算子":_ewm_cov,"参数":Args,"回溯期数":[min_periods]*len(Descriptors),"运算时点":"多时点","运算ID":"多ID"}, **kwargs)
 def _ewm_corr(f,idt,iid,x,args):
     Data1,Data2 = _genOperatorData(f,idt,iid,x,args)
-    return pd.DataFrame(Data1).ewm(**args["OperatorArg"]).corr(pd.DataFrame(Data2)).values[args["OperatorArg"]["min_periods"]-1:]
+    return pd.DataFrame(Data1).ewm(**args["OperatorArg"]).corr(pd.DataFrame(Data2)).values[args["OperatorArg"]["min_periods"]:]
 def ewm_corr(f1, f2, com=None, span=None, halflife=None, alpha=None, min_periods=0, adjust=True, ignore_na=False, **kwargs):
     Descriptors,Args = _genMultivariateOperatorInfo(f1,f2)
     Args["OperatorArg"] = {"com":com,"span":span,"halflife":halflife,"min_periods":min_periods,
                            "adjust":adjust,"ignore_na":ignore_na}
-    return TimeOperation(kwargs.pop("factor_name", str(uuid.uuid1())),Descriptors,{"算子":_ewm_corr,"参数":Args,"回溯期数":[min_periods]*len(Descriptors),"运算时点":"多时点","运算ID":"多ID"}, **kwargs)
+    return TimeOperation(kwargs.pop("factor_name", None),Descriptors,{"算子":_ewm_corr,"参数":Args,"回溯期数":[min_periods]*len(Descriptors),"运算时点":"多时点","运算ID":"多ID"}, **kwargs)
 def _lag(f,idt,iid,x,args):
     if args["OperatorArg"]['dt_change_fun'] is None: return x[0][args["OperatorArg"]['window']-args["OperatorArg"]['lag_period']:x[0].shape[0]-args["OperatorArg"]['lag_period']]
     TargetDTs = args["OperatorArg"]['dt_change_fun'](idt)
@@ -681,14 +802,14 @@ def _lag(f,idt,iid,x,args):
 def lag(f, lag_period=1, window=1, dt_change_fun=None, **kwargs):
     Descriptors,Args = _genMultivariateOperatorInfo(f)
     Args["OperatorArg"] = {"lag_period":lag_period,"window":window,"dt_change_fun":dt_change_fun}
-    return TimeOperation(kwargs.pop("factor_name", str(uuid.uuid1())),Descriptors,{"算子":_lag,"参数":Args,"回溯期数":[window]*len(Descriptors),"运算时点":"多时点","运算ID":"多ID"}, **kwargs)
+    return TimeOperation(kwargs.pop("factor_name", None),Descriptors,{"算子":_lag,"参数":Args,"回溯期数":[window]*len(Descriptors),"运算时点":"多时点","运算ID":"多ID"}, **kwargs)
 def _diff(f,idt,iid,x,args):
     Data = _genOperatorData(f,idt,iid,x,args)[0]
     return np.diff(Data, n=args["OperatorArg"]['n'], axis=0)
 def diff(f, n=1, **kwargs):
     Descriptors,Args = _genMultivariateOperatorInfo(f)
     Args["OperatorArg"] = {"n":n}
-    return TimeOperation(kwargs.pop("factor_name", str(uuid.uuid1())),Descriptors,{"算子":_diff,"参数":Args,"回溯期数":[n]*len(Descriptors),"运算时点":"多时点","运算ID":"多ID"}, **kwargs)
+    return TimeOperation(kwargs.pop("factor_name", None),Descriptors,{"算子":_diff,"参数":Args,"回溯期数":[n]*len(Descriptors),"运算时点":"多时点","运算ID":"多ID"}, **kwargs)
 def _fillna(f,idt,iid,x,args):
     Data = _genOperatorData(f,idt,iid,x,args)[0]
     if args["OperatorArg"]["value"] is None:
@@ -701,9 +822,9 @@ def fillna(f, value=None, lookback=1, **kwargs):
     Descriptors, Args = _genMultivariateOperatorInfo(f)
     Args["OperatorArg"] = {"lookback":lookback, "value":value}
     if value is None:
-        return TimeOperation(kwargs.pop("factor_name", str(uuid.uuid1())),Descriptors,{"算子":_fillna,"参数":Args,"回溯期数":[lookback]*len(Descriptors),"运算时点":"多时点","运算ID":"多ID"}, **kwargs)
+        return TimeOperation(kwargs.pop("factor_name", None),Descriptors,{"算子":_fillna,"参数":Args,"回溯期数":[lookback]*len(Descriptors),"运算时点":"多时点","运算ID":"多ID"}, **kwargs)
     else:
-        return PointOperation(kwargs.pop("factor_name", str(uuid.uuid1())),Descriptors,{"算子":_fillna,"参数":Args,"运算时点":"多时点","运算ID":"多ID"}, **kwargs)
+        return PointOperation(kwargs.pop("factor_name", None),Descriptors,{"算子":_fillna,"参数":Args,"运算时点":"多时点","运算ID":"多ID"}, **kwargs)
 def _nav(f, idt, iid, x, args):
     Price = x[0]
     Return, = _genOperatorData(f, idt, iid, x[1:], args)
@@ -715,7 +836,7 @@ def _nav(f, idt, iid, x, args):
     return NAV
 def nav(ret, init=None, **kwargs):
     Descriptors, Args = _genMultivariateOperatorInfo(ret)
-    return TimeOperation(kwargs.pop("factor_name", str(uuid.uuid1())),Descriptors,{"算子":_nav,"参数":Args,"回溯期数":[0]*len(Descriptors),"自身回溯期数":1,"自身回溯模式":"扩张窗口","自身初始值":init,"运算时点":"多时点","运算ID":"多ID"}, **kwargs)
+    return TimeOperation(kwargs.pop("factor_name", None),Descriptors,{"算子":_nav,"参数":Args,"回溯期数":[0]*len(Descriptors),"自身回溯期数":1,"自身回溯模式":"扩张窗口","自身初始值":init,"运算时点":"多时点","运算ID":"多ID"}, **kwargs)
 # ----------------------单截面运算--------------------------------
 def _standardizeZScore(f,idt,iid,x,args):
     Data = _genOperatorData(f,idt,iid,x,args)
@@ -733,7 +854,7 @@ def _standardizeZScore(f,idt,iid,x,args):
     elif CatData is not None:
         CatData = Data[StartInd:StartInd+CatData]
         StartInd += len(CatData)
-        CatData = np.array(list(zip(*CatData)))
+        CatData = np.stack(CatData, axis=-1)
     AvgWeight = OperatorArg.pop("avg_weight")
     if AvgWeight is not None:
         AvgWeight = Data[StartInd]
@@ -741,14 +862,7 @@ def _standardizeZScore(f,idt,iid,x,args):
     DispersionWeight = OperatorArg.pop("dispersion_weight")
     if DispersionWeight is not None:
         DispersionWeight = Data[StartInd]
-    Rslt = np.zeros(FactorData.shape)+np.nan
-    for i in range(FactorData.shape[0]):
-        Rslt[i] = DataPreprocessingFun.standardizeZScore(FactorData[i],mask=(Mask[i] if Mask is not None else None),
-                                                         cat_data=(CatData[i].T if CatData is not None else None),
-                                                         avg_weight=(AvgWeight[i] if AvgWeight is not None else None),
-                                                         dispersion_weight=(DispersionWeight[i] if DispersionWeight is not None else None),
-                                                         **OperatorArg)
-    return Rslt
+    return DataPreprocessingFun.standardizeZScorePanel(FactorData, mask=Mask, cat_data=CatData, avg_weight=AvgWeight, dispersion_weight=DispersionWeight, **OperatorArg)
 def standardizeZScore(f, mask=None, cat_data=None, avg_statistics="平均值", dispersion_statistics="标准差", avg_weight=None, dispersion_weight=None, other_handle='填充None', **kwargs):
     Factors = [f]
     OperatorArg = {}
@@ -778,7 +892,7 @@ def standardizeZScore(f, mask=None, cat_data=None, avg_statistics="平均值", d
     Descriptors,Args = _genMultivariateOperatorInfo(*Factors)
     Args["OperatorArg"] = {"avg_statistics":avg_statistics,"dispersion_statistics":dispersion_statistics,"other_handle":other_handle}
     Args["OperatorArg"].update(OperatorArg)
-    return SectionOperation(kwargs.pop("factor_name", str(uuid.uuid1())),Descriptors,{"算子":_standardizeZScore,"参数":Args,"运算时点":"多时点","输出形式":"全截面"}, **kwargs)
+    return SectionOperation(kwargs.pop("factor_name", None),Descriptors,{"算子":_standardizeZScore,"参数":Args,"运算时点":"多时点","输出形式":"全截面"}, **kwargs)
 def _standardizeRank(f,idt,iid,x,args):
     Data = _genOperatorData(f,idt,iid,x,args)
     OperatorArg = args["OperatorArg"].copy()
@@ -792,14 +906,8 @@ def _standardizeRank(f,idt,iid,x,args):
     if CatData==1:
         CatData = Data[StartInd]
     elif CatData is not None:
-        CatData = Data[StartInd:StartInd+CatData]
-        CatData = np.array(list(zip(*CatData)))
-    Rslt = np.zeros(FactorData.shape)+np.nan
-    for i in range(FactorData.shape[0]):
-        Rslt[i] = DataPreprocessingFun.standardizeRank(FactorData[i],mask=(Mask[i] if Mask is not None else None),
-                                                       cat_data=(CatData[i].T if CatData is not None else None),
-                                                       **OperatorArg)
-    return Rslt
+        CatData = np.stack(Data[StartInd:StartInd+CatData], axis=-1)
+    return DataPreprocessingFun.standardizeRankPanel(FactorData, mask=Mask, cat_data=CatData, **OperatorArg)
 def standardizeRank(f, mask=None, cat_data=None, ascending=True, uniformization=True, perturbation=False, offset=0.5, other_handle='填充None', **kwargs):
     Factors = [f]
     OperatorArg = {}
@@ -819,7 +927,7 @@ def standardizeRank(f, mask=None, cat_data=None, ascending=True, uniformization=
     Descriptors,Args = _genMultivariateOperatorInfo(*Factors)
     Args["OperatorArg"] = {"ascending":ascending,"uniformization":uniformization,"perturbation":perturbation,"offset":offset,"other_handle":other_handle}
     Args["OperatorArg"].update(OperatorArg)
-    return SectionOperation(kwargs.pop("factor_name", str(uuid.uuid1())),Descriptors,{"算子":_standardizeRank,"参数":Args,"运算时点":"多时点","输出形式":"全截面"}, **kwargs)
+    return SectionOperation(kwargs.pop("factor_name", None),Descriptors,{"算子":_standardizeRank,"参数":Args,"运算时点":"多时点","输出形式":"全截面"}, **kwargs)
 def _standardizeQuantile(f,idt,iid,x,args):
     Data = _genOperatorData(f,idt,iid,x,args)
     OperatorArg = args["OperatorArg"].copy()
@@ -833,14 +941,8 @@ def _standardizeQuantile(f,idt,iid,x,args):
     if CatData==1:
         CatData = Data[StartInd]
     elif CatData is not None:
-        CatData = Data[StartInd:StartInd+CatData]
-        CatData = np.array(list(zip(*CatData)))
-    Rslt = np.zeros(FactorData.shape)+np.nan
-    for i in range(FactorData.shape[0]):
-        Rslt[i] = DataPreprocessingFun.standardizeQuantile(FactorData[i],mask=(Mask[i] if Mask is not None else None),
-                                                           cat_data=(CatData[i].T if CatData is not None else None),
-                                                           **OperatorArg)
-    return Rslt
+        CatData = np.stack(Data[StartInd:StartInd+CatData], axis=-1)
+    return DataPreprocessingFun.standardizeQuantilePanel(FactorData, mask=Mask, cat_data=CatData, **OperatorArg)
 def standardizeQuantile(f, mask=None, cat_data=None, ascending=True, perturbation=False, other_handle='填充None', **kwargs):
     Factors = [f]
     OperatorArg = {}
@@ -860,7 +962,7 @@ def standardizeQuantile(f, mask=None, cat_data=None, ascending=True, perturbatio
     Descriptors,Args = _genMultivariateOperatorInfo(*Factors)
     Args["OperatorArg"] = {"ascending":ascending,"perturbation":perturbation,"other_handle":other_handle}
     Args["OperatorArg"].update(OperatorArg)
-    return SectionOperation(kwargs.pop("factor_name", str(uuid.uuid1())),Descriptors,{"算子":_standardizeQuantile,"参数":Args,"运算时点":"多时点","输出形式":"全截面"}, **kwargs)
+    return SectionOperation(kwargs.pop("factor_name", None),Descriptors,{"算子":_standardizeQuantile,"参数":Args,"运算时点":"多时点","输出形式":"全截面"}, **kwargs)
 def _fillNaNByVal(f,idt,iid,x,args):
     Data = _genOperatorData(f,idt,iid,x,args)
     OperatorArg = args["OperatorArg"].copy()
@@ -868,10 +970,7 @@ def _fillNaNByVal(f,idt,iid,x,args):
     Mask = OperatorArg.pop("mask")
     if Mask is not None:
         Mask = (Data[1]==1)
-    Rslt = np.zeros(FactorData.shape)+np.nan
-    for i in range(FactorData.shape[0]):
-        Rslt[i] = DataPreprocessingFun.fillNaNByVal(FactorData[i],mask=(Mask[i] if Mask is not None else None),**OperatorArg)
-    return Rslt
+    return DataPreprocessingFun.fillNaNByVal(np.array(FactorData, dtype="float"), mask=Mask, **OperatorArg)
 def fillNaNByVal(f, mask=None, value=0.0, **kwargs):
     Factors = [f]
     OperatorArg = {}
@@ -883,7 +982,7 @@ def fillNaNByVal(f, mask=None, value=0.0, **kwargs):
     Descriptors,Args = _genMultivariateOperatorInfo(*Factors)
     Args["OperatorArg"] = {"value":value}
     Args["OperatorArg"].update(OperatorArg)
-    return SectionOperation(kwargs.pop("factor_name", str(uuid.uuid1())),Descriptors,{"算子":_fillNaNByVal,"参数":Args,"运算时点":"多时点","输出形式":"全截面"}, **kwargs)
+    return SectionOperation(kwargs.pop("factor_name", None),Descriptors,{"算子":_fillNaNByVal,"参数":Args,"运算时点":"多时点","输出形式":"全截面"}, **kwargs)
 def _fillNaNByFun(f,idt,iid,x,args):
     Data = _genOperatorData(f,idt,iid,x,args)
     OperatorArg = args["OperatorArg"].copy()
@@ -898,24 +997,14 @@ def _fillNaNByFun(f,idt,iid,x,args):
         CatData = Data[StartInd]
     elif CatData is not None:
         CatData = Data[StartInd:StartInd+CatData]
-        CatData = np.array(list(zip(*CatData)))
+        CatData = np.stack(CatData, axis=-1)
     ValFun = OperatorArg.pop("val_fun")
-    if ValFun=="平均值":
-        ValFun = (lambda x,n:np.zeros(n)+np.nanmean(x))
-    elif ValFun=="中位数":
-        ValFun = (lambda x,n:np.zeros(n)+np.nanmedian(x))
-    elif ValFun=="最大值":
-        ValFun = (lambda x,n:np.zeros(n)+np.nanmax(x))
-    elif ValFun=="最小值":
-        ValFun = (lambda x,n:np.zeros(n)+np.nanmin(x))
-    elif ValFun=="高斯随机数":
-        ValFun = (lambda x,n:np.random.randn(n)*np.nanstd(x)+np.nanmean(x))
-    elif ValFun=="均匀随机数":
-        ValFun = (lambda x,n:np.random.rand(n)*(np.nanmax(x)-np.nanmin(x))+np.nanmin(x))
+    if ValFun in ("平均值", "中位数", "最大值", "最小值", "高斯随机数", "均匀随机数"):
+        return DataPreprocessingFun.fillNaNByFunPanel(FactorData, mask=Mask, cat_data=CatData, val_fun=ValFun)
     Rslt = np.zeros(FactorData.shape)+np.nan
     for i in range(FactorData.shape[0]):
         Rslt[i] = DataPreprocessingFun.fillNaNByFun(FactorData[i],mask=(Mask[i] if Mask is not None else None),
-                                                    cat_data=(CatData[i].T if CatData is not None else None),
+                                                    cat_data=(CatData[i] if CatData is not None else None),
                                                     val_fun=ValFun,**OperatorArg)
     return Rslt
 def fillNaNByFun(f, mask=None, cat_data=None, val_fun="平均值", **kwargs):
@@ -937,7 +1026,7 @@ def fillNaNByFun(f, mask=None, cat_data=None, val_fun="平均值", **kwargs):
     Descriptors,Args = _genMultivariateOperatorInfo(*Factors)
     Args["OperatorArg"] = {"val_fun":val_fun}
     Args["OperatorArg"].update(OperatorArg)
-    return SectionOperation(kwargs.pop("factor_name", str(uuid.uuid1())),Descriptors,{"算子":_fillNaNByFun,"参数":Args,"运算时点":"多时点","输出形式":"全截面"}, **kwargs)
+    return SectionOperation(kwargs.pop("factor_name", None),Descriptors,{"算子":_fillNaNByFun,"参数":Args,"运算时点":"多时点","输出形式":"全截面"}, **kwargs)
 def _fillNaNByRegress(f,idt,iid,x,args):
     Data = _genOperatorData(f,idt,iid,x,args)
     OperatorArg = args["OperatorArg"].copy()
@@ -1013,7 +1102,7 @@ def fillNaNByRegress(Y, X, mask=None, cat_data=None, constant=False, dummy_data=
     Descriptors,Args = _genMultivariateOperatorInfo(*Factors)
     Args["OperatorArg"] = {"drop_dummy_na":drop_dummy_na,"constant":constant}
     Args["OperatorArg"].update(OperatorArg)
-    return SectionOperation(kwargs.pop("factor_name", str(uuid.uuid1())),Descriptors,{"算子":_fillNaNByRegress,"参数":Args,"运算时点":"多时点","输出形式":"全截面"}, **kwargs)
+    return SectionOperation(kwargs.pop("factor_name", None),Descriptors,{"算子":_fillNaNByRegress,"参数":Args,"运算时点":"多时点","输出形式":"全截面"}, **kwargs)
 def _winsorize(f,idt,iid,x,args):
     Data = _genOperatorData(f,idt,iid,x,args)
     OperatorArg = args["OperatorArg"].copy()
@@ -1028,13 +1117,8 @@ def _winsorize(f,idt,iid,x,args):
         CatData = Data[StartInd]
     elif CatData is not None:
         CatData = Data[StartInd:StartInd+CatData]
-        CatData = np.array(list(zip(*CatData)))
-    Rslt = np.zeros(FactorData.shape)+np.nan
-    for i in range(FactorData.shape[0]):
-        Rslt[i] = DataPreprocessingFun.winsorize(FactorData[i],mask=(Mask[i] if Mask is not None else None),
-                                                 cat_data=(CatData[i].T if CatData is not None else None),
-                                                 **OperatorArg)
-    return Rslt
+        CatData = np.stack(CatData, axis=-1)
+    return DataPreprocessingFun.winsorizePanel(FactorData, mask=Mask, cat_data=CatData, **OperatorArg)
 def winsorize(f, mask=None, cat_data=None, method='截断', avg_statistics="平均值", dispersion_statistics="标准差", std_multiplier=3, std_tmultiplier=3.5, other_handle='填充None', **kwargs):
     Factors = [f]
     OperatorArg = {}
@@ -1054,7 +1138,7 @@ def winsorize(f, mask=None, cat_data=None, method='截断', avg_statistics="平
     Descriptors,Args = _genMultivariateOperatorInfo(*Factors)
     Args["OperatorArg"] = {"method":method,"avg_statistics":avg_statistics,"dispersion_statistics":dispersion_statistics,"std_multiplier":std_multiplier,"std_tmultiplier":std_tmultiplier,"other_handle":other_handle}
     Args["OperatorArg"].update(OperatorArg)
-    return SectionOperation(kwargs.pop("factor_name", str(uuid.uuid1())),Descriptors,{"算子":_winsorize,"参数":Args,"运算时点":"多时点","输出形式":"全截面"}, **kwargs)
+    return SectionOperation(kwargs.pop("factor_name", None),Descriptors,{"算子":_winsorize,"参数":Args,"运算时点":"多时点","输出形式":"全截面"}, **kwargs)
 def _orthogonalize(f,idt,iid,x,args):
     Data = _genOperatorData(f,idt,iid,x,args)
     OperatorArg = args["OperatorArg"].copy()
@@ -1067,7 +1151,7 @@ def _orthogonalize(f,idt,iid,x,args):
     elif X is not None:
         X = Data[StartInd:StartInd+X]
         StartInd += len(X)
-        X = np.array(list(zip(*X)))
+        X = np.stack(X, axis=-1)
     Mask = OperatorArg.pop("mask")
     if Mask is not None:
         Mask = (Data[StartInd]==1)
@@ -1077,14 +1161,8 @@ def _orthogonalize(f,idt,iid,x,args):
         DummyData = Data[StartInd]
     elif DummyData is not None:
         DummyData = Data[StartInd:StartInd+DummyData]
-        DummyData = np.array(list(zip(*DummyData)))
-    Rslt = np.zeros(FactorData.shape)+np.nan
-    for i in range(FactorData.shape[0]):
-        Rslt[i] = DataPreprocessingFun.orthogonalize(FactorData[i],X=(X[i].T if X is not None else None),
-                                                     mask=(Mask[i] if Mask is not None else None),
-                                                     dummy_data=(DummyData[i].T if DummyData is not None else None),
-                                                     **OperatorArg)
-    return Rslt
+        DummyData = np.stack(DummyData, axis=-1)
+    return DataPreprocessingFun.orthogonalizePanel(FactorData, X=X, mask=Mask, dummy_data=DummyData, **OperatorArg)
 def orthogonalize(Y, X, mask=None, constant=False, dummy_data=None, drop_dummy_na=False, other_handle='填充None', **kwargs):
     Factors = [Y]
     OperatorArg = {}
@@ -1112,9 +1190,77 @@ def orthogonalize(Y, X, mask=None, constant=False, dummy_data=None, drop_dummy_n
     Descriptors,Args = _genMultivariateOperatorInfo(*Factors)
     Args["OperatorArg"] = {"drop_dummy_na":drop_dummy_na,"constant":constant,"other_handle":other_handle}
     Args["OperatorArg"].update(OperatorArg)
-    return SectionOperation(kwargs.pop("factor_name", str(uuid.uuid1())),Descriptors,{"算子":_orthogonalize,"参数":Args,"运算时点":"多时点","输出形式":"全截面"}, **kwargs)
+    return SectionOperation(kwargs.pop("factor_name", None),Descriptors,{"算子":_orthogonalize,"参数":Args,"运算时点":"多时点","输出形式":"全截面"}, **kwargs)
 
 # ----------------------多截面运算--------------------------------
+# 分组聚合: 将 (时点, 类别) 编码成分段, 通过 bincount 或者一次排序完成所有类别的聚合
+# mask: array(shape=(nDT, nDescriptorID), dtype=bool); cat_data: 类别数据, None 表示整个截面为一组; section_ids: 输出的截面, 为 None 表示输出的截面和描述子截面相同
+# 返回: (分段编号, 分段数), 不参与聚合的元素编号为 -1
+def _genAggrSegment(mask, cat_data=None, section_ids=None):
+    nDT = mask.shape[0]
+    if cat_data is None:
+        return (np.where(mask, np.arange(nDT).reshape((nDT, 1)), -1), nDT)
+    elif section_ids is not None:
+        CatCode = pd.Index(section_ids).get_indexer(cat_data.ravel()).reshape(cat_data.shape)
+        nSection = len(section_ids)
+        return (np.where(mask & (CatCode>=0), np.arange(nDT).reshape((nDT, 1)) * nSection + CatCode, -1), nDT * nSection)
+    else:
+        return DataPreprocessingFun._genPanelSegment(mask, cat_data=cat_data)
+# 按分段计算统计量, 空的分段: sum, count 为 0, prod 为 1, 其余为 nan
+def _calcSegmentStat(segment, data, n_segment, stat, weight=None, ddof=1, quantile=0.5):
+    Valid = ((segment>=0) & pd.notnull(data))
+    iSegment = segment[Valid]
+    Count = np.bincount(iSegment, minlength=n_segment).astype("float")
+    if stat=="count": return Count
+    iData = data[Valid].astype("float")
+    with np.errstate(divide="ignore", invalid="ignore"):
+        if stat=="sum": return np.bincount(iSegment, weights=iData, minlength=n_segment)
+        elif stat=="mean":# 分母包含因子值缺失的成员的权重
+            if weight is None: weight = np.ones(data.shape)
+            WeightMask = ((segment>=0) & pd.notnull(weight))
+            NumMask = (WeightMask & pd.notnull(data))
+            return np.bincount(segment[NumMask], weights=data[NumMask]*weight[NumMask], minlength=n_segment) / np.bincount(segment[WeightMask], weights=weight[WeightMask], minlength=n_segment)
+        elif stat in ("var", "std"):
+            Mean = np.bincount(iSegment, weights=iData, minlength=n_segment) / Count
+            Rslt = np.bincount(iSegment, weights=(iData - Mean[iSegment])**2, minlength=n_segment) / (Count - ddof)
+            Rslt[Count<=ddof] = np.nan
+            return (np.sqrt(Rslt) if stat=="std" else Rslt)
+        Order, _, SegmentCount, SegmentStart = DataPreprocessingFun._sortSegment(iSegment, iData, n_segment)
+        SortedData, NonEmpty = iData[Order], (SegmentCount>0)
+        Rslt = np.full(n_segment, (1.0 if stat=="prod" else np.nan))
+        if not np.any(NonEmpty): return Rslt
+        if stat=="prod": Rslt[NonEmpty] = np.multiply.reduceat(SortedData, SegmentStart[NonEmpty])
+        elif stat=="max": Rslt[NonEmpty] = np.maximum.reduceat(SortedData, SegmentStart[NonEmpty])
+        elif stat=="min": Rslt[NonEmpty] = np.minimum.reduceat(SortedData, SegmentStart[NonEmpty])
+        elif stat in ("median", "quantile"):# 和 np.nanpercentile 一样使用线性插值
+            Pos = (0.5 if stat=="median" else quantile) * (SegmentCount[NonEmpty] - 1)
+            Low, High = np.floor(Pos).astype(np.int64), np.ceil(Pos).astype(np.int64)
+            Low, High, Pos = SegmentStart[NonEmpty] + Low, SegmentStart[NonEmpty] + High, Pos - Low
+            Rslt[NonEmpty] = SortedData[Low] + (SortedData[High] - SortedData[Low]) * Pos
+        else:
+            raise __QS_Error__("不支持的聚合统计量: '%s'" % stat)
+    return Rslt
+# aggr_* 系列算子的公共实现
+def _aggrPanel(f, idt, iid, x, args, stat, **kwargs):
+    Data = _genOperatorData(f,idt,iid,x,args)
+    nDT, nID = len(idt), len(iid)
+    FactorData = Data[0]
+    if args["OperatorArg"]["Mask"]:
+        Mask = (Data[1]==1)
+    else:
+        Mask = np.full(FactorData.shape, fill_value=True)
+    Weight = (Data[2-args["OperatorArg"]["Mask"]] if args["OperatorArg"].get("Weight", False) else None)
+    CatData = (Data[-1] if args["OperatorArg"]["CatData"] else None)
+    SectionIDs = (iid if args["OperatorArg"]["SectionChged"] and (CatData is not None) else None)
+    Segment, nSegment = _genAggrSegment(Mask, cat_data=CatData, section_ids=SectionIDs)
+    Stat = _calcSegmentStat(Segment, FactorData, nSegment, stat, weight=Weight, **kwargs)
+    if CatData is None:
+        return Stat.reshape((nDT, 1)).repeat(nID, axis=1)
+    elif SectionIDs is not None:
+        return Stat.reshape((nDT, nID))
+    Rslt = np.full(shape=(nDT, nID), fill_value=np.nan)
+    Rslt[Segment>=0] = Stat[Segment[Segment>=0]]
+    return Rslt
 def _aggregate(f,idt,iid,x,args):
     Data = _genOperatorData(f,idt,iid,x,args)
     nID = len(iid)
@@ -1127,18 +1273,18 @@ def _aggregate(f,idt,iid,x,args):
     if args["OperatorArg"]["CatData"]:
         CatData = Data[-1]
         Rslt = np.full(shape=(nID, ), fill_value=np.nan)
-        if args["OperatorArg"]["SectionChged"]:
-            for i, iID in enumerate(iid):
-                iMask = ((CatData==iID) & Mask)
-                Rslt[i] = AggrFun(FactorData[iMask])
+        # 一次排序将所有类别的数据分成连续的段, 每个类别只调用一次聚合函数
+        SectionIDs = (iid if args["OperatorArg"]["SectionChged"] else None)
+        Segment, nSegment = _genAggrSegment(Mask.reshape((1, -1)), cat_data=CatData.reshape((1, -1)), section_ids=SectionIDs)
+        Segment = Segment[0]
+        Order = np.argsort(Segment, kind="mergesort")
+        Count = np.bincount(Segment[Segment>=0], minlength=nSegment)
+        SegmentData = np.split(FactorData[Order][np.sum(Segment<0):], np.cumsum(Count)[:-1])
+        if SectionIDs is not None:
+            for i in range(nID): Rslt[i] = AggrFun(SegmentData[i])
         else:
-            AllCats = pd.unique(CatData.flatten())
-            for i, iCat in enumerate(AllCats):
-                if pd.isnull(iCat):
-                    iMask = (pd.isnull(CatData) & Mask)
-                else:
-                    iMask = ((CatData==iCat) & Mask)
-                Rslt[iMask] = AggrFun(FactorData[iMask])
+            SegmentRslt = np.array([AggrFun(iData) for iData in SegmentData])
+            Rslt[Segment>=0] = SegmentRslt[Segment[Segment>=0]]
     else:
         Rslt = np.full(shape=(nID, ), fill_value=AggrFun(FactorData[Mask]))
     return Rslt
@@ -1150,7 +1296,7 @@ def aggregate(f, aggr_fun=np.nansum, mask=None, cat_data=None, descriptor_ids=No
         Factors.append(cat_data)
     Descriptors, Args = _genMultivariateOperatorInfo(*Factors)
     Args["OperatorArg"] = {"aggr_fun":aggr_fun, "Mask":(mask is not None), "CatData":(cat_data is not None), "SectionChged":(descriptor_ids is not None)}
-    FactorName = kwargs.pop("factor_name", str(uuid.uuid1()))
+    FactorName = kwargs.pop("factor_name", None)
     return SectionOperation(FactorName, Descriptors, {"算子":_aggregate, "参数":Args, "运算时点":"单时点", "描述子截面":[descriptor_ids]*len(Descriptors)}, **kwargs)
 def _disaggregate(f,idt,iid,x,args):
     Data = _genOperatorData(f,idt,iid,x,args)
@@ -1159,9 +1305,9 @@ def _disaggregate(f,idt,iid,x,args):
     if args["OperatorArg"]["CatData"]:
         CatData = Data[-1]
         Rslt = np.full(shape=(nDT, nID), fill_value=np.nan)
-        for i, iID in enumerate(args["OperatorArg"]["aggr_ids"]):
-            iMask = (CatData==iID)
-            Rslt[iMask] = FactorData[:, [i]].repeat(nID, axis=1)[iMask]
+        AggrInd = pd.Index(args["OperatorArg"]["aggr_ids"]).get_indexer(CatData.ravel()).reshape(CatData.shape)
+        Mask = (AggrInd>=0)
+        Rslt[Mask] = FactorData[np.nonzero(Mask)[0], AggrInd[Mask]]
     else:
         Rslt = FactorData.repeat(nID, axis=1)
     return Rslt
@@ -1173,34 +1319,10 @@ def disaggregate(f, aggr_ids, cat_data=None, disaggr_ids=None, **kwargs):# 将
     Descriptors, Args = _genMultivariateOperatorInfo(*Factors)
     DescriptorIDs = [aggr_ids] * Args.get("SepInd1", 0) + [disaggr_ids] * (len(Descriptors) - Args.get("SepInd1", 0))
     Args["OperatorArg"] = {"aggr_ids":aggr_ids, "CatData":(cat_data is not None)}
-    FactorName = kwargs.pop("factor_name", str(uuid.uuid1()))
+    FactorName = kwargs.pop("factor_name", None)
     return SectionOperation(FactorName, Descriptors, {"算子":_disaggregate, "参数":Args, "运算时点":"多时点", "描述子截面":DescriptorIDs}, **kwargs)
 def _aggr_sum(f,idt,iid,x,args):
-    Data = _genOperatorData(f,idt,iid,x,args)
-    nDT, nID = len(idt), len(iid)
-    FactorData = Data[0]
-    if args["OperatorArg"]["Mask"]:
-        Mask = (Data[1]==1)
-    else:
-        Mask = np.full(FactorData.shape, fill_value=True)
-    if args["OperatorArg"]["CatData"]:
-        CatData = Data[-1]
-        Rslt = np.full(shape=(nDT, nID), fill_value=np.nan)
-        if args["OperatorArg"]["SectionChged"]:
-            for i, iID in enumerate(iid):
-                iMask = ((CatData==iID) & Mask)
-                Rslt[:, i] = np.nansum(iMask * FactorData, axis=1)
-        else:
-            AllCats = pd.unique(CatData.flatten())
-            for i, iCat in enumerate(AllCats):
-                if pd.isnull(iCat):
-                    iMask = (pd.isnull(CatData) & Mask)
-                else:
-                    iMask = ((CatData==iCat) & Mask)
-                Rslt[iMask] = np.nansum(iMask * FactorData, axis=1).reshape((nDT, 1)).repeat(nID, axis=1)[iMask]
-    else:
-        Rslt = np.nansum(FactorData * Mask, axis=1).reshape((nDT, 1)).repeat(nID, axis=1)
-    return Rslt
+    return _aggrPanel(f, idt, iid, x, args, "sum")
 def aggr_sum(f, mask=None, cat_data=None, descriptor_ids=None, **kwargs):
     Factors = [f]
     if mask is not None:
@@ -1209,41 +1331,10 @@ def aggr_sum(f, mask=None, cat_data=None, descriptor_ids=None, **kwargs):
         Factors.append(cat_data)
     Descriptors, Args = _genMultivariateOperatorInfo(*Factors)
     Args["OperatorArg"] = {"Mask":(mask is not None), "CatData":(cat_data is not None), "SectionChged":(descriptor_ids is not None)}
-    FactorName = kwargs.pop("factor_name", str(uuid.uuid1()))
+    FactorName = kwargs.pop("factor_name", None)
     return SectionOperation(FactorName, Descriptors, {"算子":_aggr_sum, "参数":Args, "运算时点":"多时点", "描述子截面":[descriptor_ids]*len(Descriptors)}, **kwargs)
 def _aggr_prod(f,idt,iid,x,args):
-    Data = _genOperatorData(f,idt,iid,x,args)
-    nDT, nID = len(idt), len(iid)
-    FactorData = Data[0]
-    if args["OperatorArg"]["Mask"]:
-        Mask = (Data[1]==1)
-    else:
-        Mask = np.full(FactorData.shape, fill_value=True)
-    if args["OperatorArg"]["CatData"]:
-        CatData = Data[-1]
-        Rslt = np.full(shape=(nDT, nID), fill_value=np.nan)
-        iData = np.full(shape=FactorData.shape, fill_value=np.nan)
-        if args["OperatorArg"]["SectionChged"]:
-            for i, iID in enumerate(iid):
-                iMask = ((CatData==iID) & Mask)
-                iData[:] = np.nan
-                iData[iMask] = FactorData[iMask]
-                Rslt[:, i] = np.nanprod(iData, axis=1)
-        else:
-            AllCats = pd.unique(CatData.flatten())
-            iData = np.full(shape=FactorData.shape, fill_value=np.nan)
-            for i, iCat in enumerate(AllCats):
-                if pd.isnull(iCat):
-                    iMask = (pd.isnull(CatData) & Mask)
-                else:
-                    iMask = ((CatData==iCat) & Mask)
-                iData[:] = np.nan
-                iData[iMask] = FactorData[iMask]
-                Rslt[iMask] = np.nanprod(iData, axis=1).reshape((nDT, 1)).repeat(nID, axis=1)[iMask]
-    else:
-        FactorData[~Mask] = np.nan
-        Rslt = np.nanprod(FactorData, axis=1).reshape((nDT, 1)).repeat(nID, axis=1)
-    return Rslt
+    return _aggrPanel(f, idt, iid, x, args, "prod")
 def aggr_prod(f, mask=None, cat_data=None, descriptor_ids=None, **kwargs):
     Factors = [f]
     if mask is not None:
@@ -1252,41 +1343,10 @@ def aggr_prod(f, mask=None, cat_data=None, descriptor_ids=None, **kwargs):
         Factors.append(cat_data)
     Descriptors, Args = _genMultivariateOperatorInfo(*Factors)
     Args["OperatorArg"] = {"Mask":(mask is not None), "CatData":(cat_data is not None), "SectionChged":(descriptor_ids is not None)}
-    FactorName = kwargs.pop("factor_name", str(uuid.uuid1()))
+    FactorName = kwargs.pop("factor_name", None)
     return SectionOperation(FactorName, Descriptors, {"算子":_aggr_prod, "参数":Args, "运算时点":"多时点", "描述子截面":[descriptor_ids]*len(Descriptors)}, **kwargs)
 def _aggr_max(f,idt,iid,x,args):
-    Data = _genOperatorData(f,idt,iid,x,args)
-    nDT, nID = len(idt), len(iid)
-    FactorData = Data[0]
-    if FactorData.shape[1]==0: return np.full(shape=(nDT, nID), fill_value=np.nan)
-    if args["OperatorArg"]["Mask"]:
-        Mask = (Data[1]==1)
-    else:
-        Mask = np.full(FactorData.shape, fill_value=True)
-    if args["OperatorArg"]["CatData"]:
-        CatData = Data[-1]
-        Rslt = np.full(shape=(nDT, nID), fill_value=np.nan)
-        iData = np.full(shape=FactorData.shape, fill_value=np.nan)
-        if args["OperatorArg"]["SectionChged"]:
-            for i, iID in enumerate(iid):
-                iMask = ((CatData==iID) & Mask)
-                iData[:] = np.nan
-                iData[iMask] = FactorData[iMask]
-                Rslt[:, i] = np.nanmax(iData, axis=1)
-        else:
-            AllCats = pd.unique(CatData.flatten())
-            for i, iCat in enumerate(AllCats):
-                if pd.isnull(iCat):
-                    iMask = (pd.isnull(CatData) & Mask)
-                else:
-                    iMask = ((CatData==iCat) & Mask)
-                iData[:] = np.nan
-                iData[iMask] = FactorData[iMask]
-                Rslt[iMask] = np.nanmax(iData, axis=1).reshape((nDT, 1)).repeat(nID, axis=1)[iMask]
-    else:
-        FactorData[~Mask] = np.nan
-        Rslt = np.nanmax(FactorData, axis=1).reshape((nDT, 1)).repeat(nID, axis=1)
-    return Rslt
+    return _aggrPanel(f, idt, iid, x, args, "max")
 def aggr_max(f, mask=None, cat_data=None, descriptor_ids=None, **kwargs):
     Factors = [f]
     if mask is not None:
@@ -1295,41 +1355,10 @@ def aggr_max(f, mask=None, cat_data=None, descriptor_ids=None, **kwargs):
         Factors.append(cat_data)
     Descriptors, Args = _genMultivariateOperatorInfo(*Factors)
     Args["OperatorArg"] = {"Mask":(mask is not None), "CatData":(cat_data is not None), "SectionChged":(descriptor_ids is not None)}
-    FactorName = kwargs.pop("factor_name", str(uuid.uuid1()))
+    FactorName = kwargs.pop("factor_name", None)
     return SectionOperation(FactorName, Descriptors, {"算子":_aggr_max, "参数":Args, "运算时点":"多时点", "描述子截面":[descriptor_ids]*len(Descriptors)}, **kwargs)
 def _aggr_min(f,idt,iid,x,args):
-    Data = _genOperatorData(f,idt,iid,x,args)
-    nDT, nID = len(idt), len(iid)
-    FactorData = Data[0]
-    if FactorData.shape[1]==0: return np.full(shape=(nDT, nID), fill_value=np.nan)
-    if args["OperatorArg"]["Mask"]:
-        Mask = (Data[1]==1)
-    else:
-        Mask = np.full(FactorData.shape, fill_value=True)
-    if args["OperatorArg"]["CatData"]:
-        CatData = Data[-1]
-        Rslt = np.full(shape=(nDT, nID), fill_value=np.nan)
-        iData = np.full(shape=FactorData.shape, fill_value=np.nan)
-        if args["OperatorArg"]["SectionChged"]:
-            for i, iID in enumerate(iid):
-                iMask = ((CatData==iID) & Mask)
-                iData[:] = np.nan
-                iData[iMask] = FactorData[iMask]
-                Rslt[:, i] = np.nanmin(iData, axis=1)
-        else:
-            AllCats = pd.unique(CatData.flatten())
-            for i, iCat in enumerate(AllCats):
-                if pd.isnull(iCat):
-                    iMask = (pd.isnull(CatData) & Mask)
-                else:
-                    iMask = ((CatData==iCat) & Mask)
-                iData[:] = np.nan
-                iData[iMask] = FactorData[iMask]
-                Rslt[iMask] = np.nanmin(iData, axis=1).reshape((nDT, 1)).repeat(nID, axis=1)[iMask]
-    else:
-        FactorData[~Mask] = np.nan
-        Rslt = np.nanmin(FactorData, axis=1).reshape((nDT, 1)).repeat(nID, axis=1)
-    return Rslt
+    return _aggrPanel(f, idt, iid, x, args, "min")
 def aggr_min(f, mask=None, cat_data=None, descriptor_ids=None, **kwargs):
     Factors = [f]
     if mask is not None:
@@ -1338,38 +1367,10 @@ def aggr_min(f, mask=None, cat_data=None, descriptor_ids=None, **kwargs):
         Factors.append(cat_data)
     Descriptors, Args = _genMultivariateOperatorInfo(*Factors)
     Args["OperatorArg"] = {"Mask":(mask is not None), "CatData":(cat_data is not None), "SectionChged":(descriptor_ids is not None)}
-    FactorName = kwargs.pop("factor_name", str(uuid.uuid1()))
+    FactorName = kwargs.pop("factor_name", None)
     return SectionOperation(FactorName, Descriptors, {"算子":_aggr_min, "参数":Args, "运算时点":"多时点", "描述子截面":[descriptor_ids]*len(Descriptors)}, **kwargs)
 def _aggr_mean(f,idt,iid,x,args):
-    Data = _genOperatorData(f,idt,iid,x,args)
-    nDT, nID = len(idt), len(iid)
-    FactorData = Data[0]
-    if args["OperatorArg"]["Mask"]:
-        Mask = (Data[1]==1)
-    else:
-        Mask = np.full(FactorData.shape, fill_value=True)
-    if args["OperatorArg"]["Weight"]:
-        WeightData = Data[2-args["OperatorArg"]["Mask"]]
-    else:
-        WeightData = np.ones(FactorData.shape)
-    if args["OperatorArg"]["CatData"]:
-        CatData = Data[-1]
-        Rslt = np.full(shape=(nDT, nID), fill_value=np.nan)
-        if args["OperatorArg"]["SectionChged"]:
-            for i, iID in enumerate(iid):
-                iMask = ((CatData==iID) & Mask)
-                Rslt[:, i] = np.nansum(iMask * WeightData * FactorData, axis=1) / np.nansum(iMask * WeightData, axis=1)
-        else:
-            AllCats = pd.unique(CatData.flatten())
-            for i, iCat in enumerate(AllCats):
-                if pd.isnull(iCat):
-                    iMask = (pd.isnull(CatData) & Mask)
-                else:
-                    iMask = ((CatData==iCat) & Mask)
-                Rslt[iMask] = (np.nansum(iMask * WeightData * FactorData, axis=1) / np.nansum(iMask * WeightData, axis=1)).reshape((nDT, 1)).repeat(nID, axis=1)[iMask]
-    else:
-        Rslt = (np.nansum(FactorData * WeightData * Mask, axis=1) / np.nansum(WeightData * Mask, axis=1)).reshape((nDT, 1)).repeat(nID, axis=1)
-    return Rslt
+    return _aggrPanel(f, idt, iid, x, args, "mean")
 def aggr_mean(f, mask=None, cat_data=None, weight_data=None, descriptor_ids=None, **kwargs):
     Factors = [f]
     if mask is not None:
@@ -1380,40 +1381,10 @@ def aggr_mean(f, mask=None, cat_data=None, weight_data=None, descriptor_ids=None
         Factors.append(cat_data)
     Descriptors, Args = _genMultivariateOperatorInfo(*Factors)
     Args["OperatorArg"] = {"Mask":(mask is not None), "Weight":(weight_data is not None), "CatData":(cat_data is not None), "SectionChged":(descriptor_ids is not None)}
-    FactorName = kwargs.pop("factor_name", str(uuid.uuid1()))
+    FactorName = kwargs.pop("factor_name", None)
     return SectionOperation(FactorName, Descriptors, {"算子":_aggr_mean, "参数":Args, "运算时点":"多时点", "描述子截面":[descriptor_ids]*len(Descriptors)}, **kwargs)
 def _aggr_std(f,idt,iid,x,args):
-    Data = _genOperatorData(f,idt,iid,x,args)
-    nDT, nID = len(idt), len(iid)
-    FactorData = Data[0]
-    if args["OperatorArg"]["Mask"]:
-        Mask = (Data[1]==1)
-    else:
-        Mask = np.full(FactorData.shape, fill_value=True)
-    if args["OperatorArg"]["CatData"]:
-        CatData = Data[-1]
-        Rslt = np.full(shape=(nDT, nID), fill_value=np.nan)
-        iData = np.full(shape=FactorData.shape, fill_value=np.nan)
-        if args["OperatorArg"]["SectionChged"]:
-            for i, iID in enumerate(iid):
-                iMask = ((CatData==iID) & Mask)
-                iData[:] = np.nan
-                iData[iMask] = FactorData[iMask]
-                Rslt[:, i] = np.nanstd(iData, axis=1, ddof=args["OperatorArg"]["ddof"])
-        else:
-            AllCats = pd.unique(CatData.flatten())
-            for i, iCat in enumerate(AllCats):
-                if pd.isnull(iCat):
-                    iMask = (pd.isnull(CatData) & Mask)
-                else:
-                    iMask = ((CatData==iCat) & Mask)
-                iData[:] = np.nan
-                iData[iMask] = FactorData[iMask]
-                Rslt[iMask] = np.nanstd(iData, axis=1, ddof=args["OperatorArg"]["ddof"]).reshape((nDT, 1)).repeat(nID, axis=1)[iMask]
-    else:
-        FactorData[~Mask] = np.nan
-        Rslt = np.nanstd(FactorData, axis=1, ddof=args["OperatorArg"]["ddof"]).reshape((nDT, 1)).repeat(nID, axis=1)
-    return Rslt
+    return _aggrPanel(f, idt, iid, x, args, "std", ddof=args["OperatorArg"]["ddof"])
 def aggr_std(f, ddof=1, mask=None, cat_data=None, descriptor_ids=None, **kwargs):
     Factors = [f]
     if mask is not None:
@@ -1422,40 +1393,10 @@ def aggr_std(f, ddof=1, mask=None, cat_data=None, descriptor_ids=None, **kwargs)
         Factors.append(cat_data)
     Descriptors, Args = _genMultivariateOperatorInfo(*Factors)
     Args["OperatorArg"] = {"ddof":ddof, "Mask":(mask is not None), "CatData":(cat_data is not None), "SectionChged":(descriptor_ids is not None)}
-    FactorName = kwargs.pop("factor_name", str(uuid.uuid1()))
+    FactorName = kwargs.pop("factor_name", None)
     return SectionOperation(FactorName, Descriptors, {"算子":_aggr_std, "参数":Args, "运算时点":"多时点", "描述子截面":[descriptor_ids]*len(Descriptors)}, **kwargs)
 def _aggr_var(f,idt,iid,x,args):
-    Data = _genOperatorData(f,idt,iid,x,args)
-    nDT, nID = len(idt), len(iid)
-    FactorData = Data[0]
-    if args["OperatorArg"]["Mask"]:
-        Mask = (Data[1]==1)
-    else:
-        Mask = np.full(FactorData.shape, fill_value=True)
-    if args["OperatorArg"]["CatData"]:
-        CatData = Data[-1]
-        Rslt = np.full(shape=(nDT, nID), fill_value=np.nan)
-        iData = np.full(shape=FactorData.shape, fill_value=np.nan)
-        if args["OperatorArg"]["SectionChged"]:
-            for i, iID in enumerate(iid):
-                iMask = ((CatData==iID) & Mask)
-                iData[:] = np.nan
-                iData[iMask] = FactorData[iMask]
-                Rslt[:, i] = np.nanvar(iData, axis=1, ddof=args["OperatorArg"]["ddof"])
-        else:
-            AllCats = pd.unique(CatData.flatten())
-            for i, iCat in enumerate(AllCats):
-                if pd.isnull(iCat):
-                    iMask = (pd.isnull(CatData) & Mask)
-                else:
-                    iMask = ((CatData==iCat) & Mask)
-                iData[:] = np.nan
-                iData[iMask] = FactorData[iMask]
-                Rslt[iMask] = np.nanvar(iData, axis=1, ddof=args["OperatorArg"]["ddof"]).reshape((nDT, 1)).repeat(nID, axis=1)[iMask]
-    else:
-        FactorData[~Mask] = np.nan
-        Rslt = np.nanvar(FactorData, axis=1, ddof=args["OperatorArg"]["ddof"]).reshape((nDT, 1)).repeat(nID, axis=1)
-    return Rslt
+    return _aggrPanel(f, idt, iid, x, args, "var", ddof=args["OperatorArg"]["ddof"])
 def aggr_var(f, ddof=1, mask=None, cat_data=None, descriptor_ids=None, **kwargs):
     Factors = [f]
     if mask is not None:
@@ -1464,40 +1405,10 @@ def aggr_var(f, ddof=1, mask=None, cat_data=None, descriptor_ids=None, **kwargs)
         Factors.append(cat_data)
     Descriptors, Args = _genMultivariateOperatorInfo(*Factors)
     Args["OperatorArg"] = {"ddof":ddof, "Mask":(mask is not None), "CatData":(cat_data is not None), "SectionChged":(descriptor_ids is not None)}
-    FactorName = kwargs.pop("factor_name", str(uuid.uuid1()))
+    FactorName = kwargs.pop("factor_name", None)
     return SectionOperation(FactorName, Descriptors, {"算子":_aggr_var, "参数":Args, "运算时点":"多时点", "描述子截面":[descriptor_ids]*len(Descriptors)}, **kwargs)
 def _aggr_median(f,idt,iid,x,args):
-    Data = _genOperatorData(f,idt,iid,x,args)
-    nDT, nID = len(idt), len(iid)
-    FactorData = Data[0]
-    if args["OperatorArg"]["Mask"]:
-        Mask = (Data[1]==1)
-    else:
-        Mask = np.full(FactorData.shape, fill_value=True)
-    if args["OperatorArg"]["CatData"]:
-        CatData = Data[-1]
-        Rslt = np.full(shape=(nDT, nID), fill_value=np.nan)
-        iData = np.full(shape=FactorData.shape, fill_value=np.nan)
-        if args["OperatorArg"]["SectionChged"]:
-            for i, iID in enumerate(iid):
-                iMask = ((CatData==iID) & Mask)
-                iData[:] = np.nan
-                iData[iMask] = FactorData[iMask]
-                Rslt[:, i] = np.nanmedian(iData, axis=1)
-        else:
-            AllCats = pd.unique(CatData.flatten())
-            for i, iCat in enumerate(AllCats):
-                if pd.isnull(iCat):
-                    iMask = (pd.isnull(CatData) & Mask)
-                else:
-                    iMask = ((CatData==iCat) & Mask)
-                iData[:] = np.nan
-                iData[iMask] = FactorData[iMask]
-                Rslt[iMask] = np.nanmedian(iData, axis=1).reshape((nDT, 1)).repeat(nID, axis=1)[iMask]
-    else:
-        FactorData[~Mask] = np.nan
-        Rslt = np.nanmedian(FactorData, axis=1).reshape((nDT, 1)).repeat(nID, axis=1)
-    return Rslt
+    return _aggrPanel(f, idt, iid, x, args, "median")
 def aggr_median(f, mask=None, cat_data=None, descriptor_ids=None, **kwargs):
     Factors = [f]
     if mask is not None:
@@ -1506,40 +1417,10 @@ def aggr_median(f, mask=None, cat_data=None, descriptor_ids=None, **kwargs):
         Factors.append(cat_data)
     Descriptors, Args = _genMultivariateOperatorInfo(*Factors)
     Args["OperatorArg"] = {"Mask":(mask is not None), "CatData":(cat_data is not None), "SectionChged":(descriptor_ids is not None)}
-    FactorName = kwargs.pop("factor_name", str(uuid.uuid1()))
+    FactorName = kwargs.pop("factor_name", None)
     return SectionOperation(FactorName, Descriptors, {"算子":_aggr_median, "参数":Args, "运算时点":"多时点", "描述子截面":[descriptor_ids]*len(Descriptors)}, **kwargs)
 def _aggr_quantile(f,idt,iid,x,args):
-    Data = _genOperatorData(f,idt,iid,x,args)
-    nDT, nID = len(idt), len(iid)
-    FactorData = Data[0]
-    if args["OperatorArg"]["Mask"]:
-        Mask = (Data[1]==1)
-    else:
-        Mask = np.full(FactorData.shape, fill_value=True)
-    if args["OperatorArg"]["CatData"]:
-        CatData = Data[-1]
-        Rslt = np.full(shape=(nDT, nID), fill_value=np.nan)
-        iData = np.full(shape=FactorData.shape, fill_value=np.nan)
-        if args["OperatorArg"]["SectionChged"]:
-            for i, iID in enumerate(iid):
-                iMask = ((CatData==iID) & Mask)
-                iData[:] = np.nan
-                iData[iMask] = FactorData[iMask]
-                Rslt[:, i] = np.nanpercentile(iData, q=args["OperatorArg"]["quantile"]*100, axis=1)
-        else:
-            AllCats = pd.unique(CatData.flatten())
-            for i, iCat in enumerate(AllCats):
-                if pd.isnull(iCat):
-                    iMask = (pd.isnull(CatData) & Mask)
-                else:
-                    iMask = ((CatData==iCat) & Mask)
-                iData[:] = np.nan
-                iData[iMask] = FactorData[iMask]
-                Rslt[iMask] = np.nanpercentile(iData, q=args["OperatorArg"]["quantile"]*100, axis=1).reshape((nDT, 1)).repeat(nID, axis=1)[iMask]
-    else:
-        FactorData[~Mask] = np.nan
-        Rslt = np.nanpercentile(FactorData, q=args["OperatorArg"]["quantile"]*100, axis=1).reshape((nDT, 1)).repeat(nID, axis=1)
-    return Rslt
+    return _aggrPanel(f, idt, iid, x, args, "quantile", quantile=args["OperatorArg"]["quantile"])
 def aggr_quantile(f, quantile=0.5, mask=None, cat_data=None, descriptor_ids=None, **kwargs):
     Factors = [f]
     if mask is not None:
@@ -1548,34 +1429,10 @@ def aggr_quantile(f, quantile=0.5, mask=None, cat_data=None, descriptor_ids=None
         Factors.append(cat_data)
     Descriptors, Args = _genMultivariateOperatorInfo(*Factors)
     Args["OperatorArg"] = {"quantile":quantile, "Mask":(mask is not None), "CatData":(cat_data is not None), "SectionChged":(descriptor_ids is not None)}
-    FactorName = kwargs.pop("factor_name", str(uuid.uuid1()))
+    FactorName = kwargs.pop("factor_name", None)
     return SectionOperation(FactorName, Descriptors, {"算子":_aggr_quantile, "参数":Args, "运算时点":"多时点", "描述子截面":[descriptor_ids]*len(Descriptors)}, **kwargs)
 def _aggr_count(f,idt,iid,x,args):
-    Data = _genOperatorData(f,idt,iid,x,args)
-    nDT, nID = len(idt), len(iid)
-    FactorData = pd.notnull(Data[0])
-    if args["OperatorArg"]["Mask"]:
-        Mask = (Data[1]==1)
-    else:
-        Mask = np.full(FactorData.shape, fill_value=True)
-    if args["OperatorArg"]["CatData"]:
-        CatData = Data[-1]
-        Rslt = np.full(shape=(nDT, nID), fill_value=np.nan)
-        if args["OperatorArg"]["SectionChged"]:
-            for i, iID in enumerate(iid):
-                iMask = ((CatData==iID) & Mask)
-                Rslt[:, i] = np.nansum(iMask * FactorData, axis=1)
-        else:
-            AllCats = pd.unique(CatData.flatten())
-            for i, iCat in enumerate(AllCats):
-                if pd.isnull(iCat):
-                    iMask = (pd.isnull(CatData) & Mask)
-                else:
-                    iMask = ((CatData==iCat) & Mask)
-                Rslt[iMask] = np.nansum(iMask * FactorData, axis=1).reshape((nDT, 1)).repeat(nID, axis=1)[iMask]
-    else:
-        Rslt = np.nansum(FactorData * Mask, axis=1).reshape((nDT, 1)).repeat(nID, axis=1)
-    return Rslt
+    return _aggrPanel(f, idt, iid, x, args, "count")
 def aggr_count(f, mask=None, cat_data=None, descriptor_ids=None, **kwargs):
     Factors = [f]
     if mask is not None:
@@ -1584,7 +1441,7 @@ def aggr_count(f, mask=None, cat_data=None, descriptor_ids=None, **kwargs):
         Factors.append(cat_data)
     Descriptors, Args = _genMultivariateOperatorInfo(*Factors)
     Args["OperatorArg"] = {"Mask":(mask is not None), "CatData":(cat_data is not None), "SectionChged":(descriptor_ids is not None)}
-    FactorName = kwargs.pop("factor_name", str(uuid.uuid1()))
+    FactorName = kwargs.pop("factor_name", None)
     return SectionOperation(FactorName, Descriptors, {"算子":_aggr_count, "参数":Args, "运算时点":"多时点", "描述子截面":[descriptor_ids]*len(Descriptors)}, **kwargs)
 def _merge(f,idt,iid,x,args):
     Data = _genOperatorData(f,idt,iid,x,args)
@@ -1599,7 +1456,7 @@ def merge(factors, descriptor_ids, **kwargs):
     for i in range(len(factors)):
         StartInd, EndInd = Args.get("SepInd"+str(i), 0), Args.get("SepInd"+str(i+1), 0)
         DescriptorIDs += [descriptor_ids[i]] * (EndInd - StartInd)
-    FactorName = kwargs.pop("factor_name", str(uuid.uuid1()))
+    FactorName = kwargs.pop("factor_name", None)
     return SectionOperation(FactorName, Descriptors, {"算子":_merge, "参数":Args, "运算时点":"多时点", "描述子截面":DescriptorIDs}, **kwargs)
 def _chg_ids(f,idt,iid,x,args):
     Data = _genOperatorData(f,idt,iid,x,args)[0]
@@ -1614,7 +1471,7 @@ def _chg_ids(f,idt,iid,x,args):
 def chg_ids(f, old_ids, id_map={}, **kwargs):
     Descriptors, Args = _genMultivariateOperatorInfo(f)
     Args["OperatorArg"] = {"id_map":id_map}
-    FactorName = kwargs.pop("factor_name", str(uuid.uuid1()))
+    FactorName = kwargs.pop("factor_name", None)
     DataType = f.getMetaData(key="DataType")
     if DataType is None: DataType = "object"
     return SectionOperation(FactorName, Descriptors, {"算子":_chg_ids, "参数":Args, "运算时点":"多时点", "描述子截面":[old_ids]*len(Descriptors), "数据类型":DataType}, **kwargs)
\ No newline at end of file
@@ -46,6 +46,12 @@ class _FactorTable(FactorTable):
         if not MetaData: return super().getFactorMetaData(factor_names=factor_names, key=key)
         if key is None: return pd.DataFrame(MetaData).loc[:, factor_names]
         else: return pd.Series(MetaData).loc[factor_names]
+    # 以因子文件的修改时间和大小作为数据版本
+    def getFactorDataVersion(self, ifactor_name, args={}):
+        FilePath = self._FactorDB.MainDir+os.sep+self.Name+os.sep+ifactor_name+"."+self._Suffix
+        if not os.path.isfile(FilePath): return None
+        FileStat = os.stat(FilePath)
+        return "%d-%d" % (FileStat.st_mtime_ns, FileStat.st_size)
     def getID(self, ifactor_name=None, idt=None, args={}):
         if ifactor_name is None: ifactor_name = self.FactorNames[0]
         with self._FactorDB._DataLock:
@@ -1,11 +1,27 @@
 # -*- coding: utf-8 -*-
-from .FactorDB import CustomFT, Factorize, DataFactor
-from .HDF5DB import HDF5DB
-from .ArcticDB import ArcticDB
-from .SQLDB import SQLDB
-from .WindDB import WindDB
-from .WindDB2 import WindDB2
-from .JYDB import JYDB
-from .TushareDB import TushareDB
-from .FactorOperation import PointOperation, TimeOperation, SectionOperation, PanelOperation
-from . import FactorTools
\ No newline at end of file
+# 因子库适配器及其驱动在第一次访问时才导入
+import sys
+
+from QuantStudio import __QS_LazyModule__
+
+__QS_LazyNames__ = {
+    "CustomFT": (".FactorDB", "CustomFT"),
+    "Factorize": (".FactorDB", "Factorize"),
+    "DataFactor": (".FactorDB", "DataFactor"),
+    "FactorResultCache": (".FactorDB", "FactorResultCache"),
+    "HDF5DB": (".HDF5DB", "HDF5DB"),
+    "ArcticDB": (".ArcticDB", "ArcticDB"),
+    "SQLDB": (".SQLDB", "SQLDB"),
+    "WindDB": (".WindDB", "WindDB"),
+    "WindDB2": (".WindDB2", "WindDB2"),
+    "JYDB": (".JYDB", "JYDB"),
+    "TushareDB": (".TushareDB", "TushareDB"),
+    "PointOperation": (".FactorOperation", "PointOperation"),
+    "TimeOperation": (".FactorOperation", "TimeOperation"),
+    "SectionOperation": (".FactorOperation", "SectionOperation"),
+    "PanelOperation": (".FactorOperation", "PanelOperation"),
+    "FactorTools": (".FactorTools", None),
+}
+__all__ = list(__QS_LazyNames__)
+
+sys.modules[__name__].__class__ = __QS_LazyModule__
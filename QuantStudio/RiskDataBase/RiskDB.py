@@ -14,6 +14,7 @@ from multiprocessing import Process, Queue
 from QuantStudio.Tools.DateTimeFun import cutDateTime
 from QuantStudio.RiskModel.RiskModelFun import decomposeCov2Corr
 from QuantStudio import __QS_Object__, __QS_Error__
+from QuantStudio.Tools.QSObjects import QSCacheBudget
 
 # 风险数据库基类, 必须存储的数据有:
 # 风险矩阵: Cov, Panel(items=[时点], major_axis=[ID], minor_axis=[ID])
@@ -67,6 +68,7 @@ class _ErgodicMode(__QS_Object__):
         self._isStarted = False
         self._CurDT = None
         self._CacheData = {}
+        self._CacheBudget = None# 多个缓冲区共享的内存预算, QSCacheBudget 对象
     def __getstate__(self):
         state = self.__dict__.copy()
         if "_CacheDataProcess" in state: state["_CacheDataProcess"] = None
@@ -76,6 +78,7 @@ def _prepareRTMMAPCacheData(rt, mmap_cache):
     CacheData, CacheDTs, MMAPCacheData, DTNum = {}, [], mmap_cache, len(rt.ErgodicMode._DateTimes)
     CacheSize = int(rt.ErgodicMode.CacheSize*2**20)
     if os.name=='nt': MMAPCacheData = mmap.mmap(-1, CacheSize, tagname=rt.ErgodicMode._TagName)
+    MaxCacheDTNum = DTNum# 最多缓冲的时点数, 由主进程根据内存预算调整
     while True:
         Task = rt.ErgodicMode._Queue2SubProcess.get()# 获取任务
         if Task is None: break# 结束进程
@@ -84,7 +87,7 @@ def _prepareRTMMAPCacheData(rt, mmap_cache):
             DataLen = len(CacheDataByte)
             for i in range(int(DataLen/CacheSize)+1):
                 iStartInd = i*CacheSize
-                iEndInd = max((i+1)*CacheSize, DataLen)
+                iEndInd = min((i+1)*CacheSize, DataLen)
                 if iEndInd>iStartInd:
                     MMAPCacheData.seek(0)
                     MMAPCacheData.write(CacheDataByte[iStartInd:iEndInd])
@@ -93,14 +96,18 @@ def _prepareRTMMAPCacheData(rt, mmap_cache):
             rt.ErgodicMode._Queue2MainProcess.put(0)
             del CacheDataByte
             gc.collect()
+        elif Task[0] is None:# 调整最多缓冲的时点数
+            MaxCacheDTNum = Task[1]
+            for iDT in CacheDTs[MaxCacheDTNum:]: CacheData.pop(iDT, None)
+            CacheDTs = CacheDTs[:MaxCacheDTNum]
         else:# 准备缓冲区
             CurInd = Task[0] + rt.ErgodicMode.ForwardPeriod + 1
             if CurInd < DTNum:# 未到结尾处, 需要再准备缓存数据
                 OldCacheDTs = CacheDTs
-                CacheDTs = rt.ErgodicMode._DateTimes[max((0, CurInd-rt.ErgodicMode.BackwardPeriod)):min((DTNum, CurInd+rt.ErgodicMode.ForwardPeriod+1))]
+                CacheDTs = rt.ErgodicMode._DateTimes[max((0, CurInd-rt.ErgodicMode.BackwardPeriod)):min((DTNum, CurInd+rt.ErgodicMode.ForwardPeriod+1))][:MaxCacheDTNum]
                 NewCacheDTs = sorted(set(CacheDTs).difference(OldCacheDTs))
                 DropDTs = set(OldCacheDTs).difference(CacheDTs)
-                for iDT in DropDTs: CacheData.pop(iDT)
+                for iDT in DropDTs: CacheData.pop(iDT, None)
                 if NewCacheDTs:
                     Cov = rt.__QS_readCov__(dts=NewCacheDTs)
                     for iDT in NewCacheDTs: CacheData[iDT] = {"Cov": Cov[iDT]}
@@ -174,6 +181,8 @@ class RiskTable(__QS_Object__):
         self.ErgodicMode._DTNum = self.ErgodicMode._DateTimes.shape[0]# 时点数
         self.ErgodicMode._CacheDTs = []
         self.ErgodicMode._CacheData = {}
+        self.ErgodicMode._CacheBudget = kwargs.get("cache_budget", None)
+        self.ErgodicMode._MaxCacheDTNum = self.ErgodicMode._DTNum# 最多缓冲的时点数
         self.ErgodicMode._Queue2SubProcess = Queue()
         self.ErgodicMode._Queue2MainProcess = Queue()
         if self.ErgodicMode.CacheSize>0:
@@ -203,6 +212,7 @@ class RiskTable(__QS_Object__):
                 self.ErgodicMode._Queue2SubProcess.put(DataLen)
                 DataLen = self.ErgodicMode._Queue2MainProcess.get()
             self.ErgodicMode._CacheData = pickle.loads(CacheData)
+            self._limitCacheData()
             if self.ErgodicMode._CurInd==PreInd+1:# 没有跳跃, 连续型遍历
                 self.ErgodicMode._Queue2SubProcess.put((self.ErgodicMode._CurInd, None))
                 self.ErgodicMode._CacheDTs = self.ErgodicMode._DateTimes[max((0, self.ErgodicMode._CurInd-self.ErgodicMode.BackwardPeriod)):min((self.ErgodicMode._DTNum, self.ErgodicMode._CurInd+self.ErgodicMode.ForwardPeriod+1))].tolist()
@@ -211,9 +221,28 @@ class RiskTable(__QS_Object__):
                 self.ErgodicMode._Queue2SubProcess.put((LastCacheInd+1, None))
                 self.ErgodicMode._CacheDTs = self.ErgodicMode._DateTimes[max((0, LastCacheInd+1-self.ErgodicMode.BackwardPeriod)):min((self.ErgodicMode._DTNum, LastCacheInd+1+self.ErgodicMode.ForwardPeriod+1))].tolist()
         return 0
+    # 按照内存预算限制缓冲的时点数, 超出预算的时点不再缓冲
+    def _limitCacheData(self):
+        Budget = self.ErgodicMode._CacheBudget
+        if Budget is None: return 0
+        Available, Usage, MaxCacheDTNum = Budget.getAvailable(self), 0, self.ErgodicMode._DTNum
+        CacheDTs = sorted(self.ErgodicMode._CacheData)
+        for i, iDT in enumerate(CacheDTs):
+            iSize = QSCacheBudget.getDataSize(self.ErgodicMode._CacheData[iDT])
+            if Usage+iSize>Available:
+                for jDT in CacheDTs[i:]: self.ErgodicMode._CacheData.pop(jDT)
+                MaxCacheDTNum = i
+                break
+            Usage += iSize
+        Budget.update(self, Usage)
+        if MaxCacheDTNum!=self.ErgodicMode._MaxCacheDTNum:
+            self.ErgodicMode._MaxCacheDTNum = MaxCacheDTNum
+            self.ErgodicMode._Queue2SubProcess.put((None, MaxCacheDTNum))
+        return 0
     def end(self):
         if not self.ErgodicMode._isStarted: return 0
         self.ErgodicMode._CacheData = None
+        if self.ErgodicMode._CacheBudget is not None: self.ErgodicMode._CacheBudget.release(self)
         self.ErgodicMode._Queue2SubProcess.put(None)
         self.ErgodicMode._Queue2SubProcess = self.ErgodicMode._Queue2MainProcess = self.ErgodicMode._CacheDataProcess = None
         self.ErgodicMode._isStarted = False
@@ -239,6 +268,7 @@ def _prepareFRTMMAPCacheData(rt, mmap_cache):
     CacheData, CacheDTs, MMAPCacheData, DTNum = {}, [], mmap_cache, len(rt.ErgodicMode._DateTimes)
     CacheSize = int(rt.ErgodicMode.CacheSize*2**20)
     if os.name=='nt': MMAPCacheData = mmap.mmap(-1, CacheSize, tagname=rt.ErgodicMode._TagName)
+    MaxCacheDTNum = DTNum# 最多缓冲的时点数, 由主进程根据内存预算调整
     while True:
         Task = rt.ErgodicMode._Queue2SubProcess.get()# 获取任务
         if Task is None: break# 结束进程
@@ -247,7 +277,7 @@ def _prepareFRTMMAPCacheData(rt, mmap_cache):
             DataLen = len(CacheDataByte)
             for i in range(int(DataLen/CacheSize)+1):
                 iStartInd = i*CacheSize
-                iEndInd = max((i+1)*CacheSize, DataLen)
+                iEndInd = min((i+1)*CacheSize, DataLen)
                 if iEndInd>iStartInd:
                     MMAPCacheData.seek(0)
                     MMAPCacheData.write(CacheDataByte[iStartInd:iEndInd])
@@ -256,14 +286,18 @@ def _prepareFRTMMAPCacheData(rt, mmap_cache):
             rt.ErgodicMode._Queue2MainProcess.put(0)
             del CacheDataByte
             gc.collect()
+        elif Task[0] is None:# 调整最多缓冲的时点数
+            MaxCacheDTNum = Task[1]
+            for iDT in CacheDTs[MaxCacheDTNum:]: CacheData.pop(iDT, None)
+            CacheDTs = CacheDTs[:MaxCacheDTNum]
         else:# 准备缓冲区
             CurInd = Task[0] + rt.ErgodicMode.ForwardPeriod + 1
             if CurInd < DTNum:# 未到结尾处, 需要再准备缓存数据
                 OldCacheDTs = CacheDTs
-                CacheDTs = rt.ErgodicMode._DateTimes[max((0, CurInd-rt.ErgodicMode.BackwardPeriod)):min((DTNum, CurInd+rt.ErgodicMode.ForwardPeriod+1))]
+                CacheDTs = rt.ErgodicMode._DateTimes[max((0, CurInd-rt.ErgodicMode.BackwardPeriod)):min((DTNum, CurInd+rt.ErgodicMode.ForwardPeriod+1))][:MaxCacheDTNum]
                 NewCacheDTs = sorted(set(CacheDTs).difference(OldCacheDTs))
                 DropDTs = set(OldCacheDTs).difference(CacheDTs)
-                for iDT in DropDTs: CacheData.pop(iDT)
+                for iDT in DropDTs: CacheData.pop(iDT, None)
                 if NewCacheDTs:
                     FactorCov = rt.__QS_readFactorCov__(dts=NewCacheDTs)
                     SpecificRisk = rt.__QS_readSpecificRisk__(dts=NewCacheDTs)
@@ -399,6 +433,8 @@ class FactorRT(RiskTable):
         self.ErgodicMode._DTNum = self.ErgodicMode._DateTimes.shape[0]# 时点数
         self.ErgodicMode._CacheDTs = []
         self.ErgodicMode._CacheData = {}
+        self.ErgodicMode._CacheBudget = kwargs.get("cache_budget", None)
+        self.ErgodicMode._MaxCacheDTNum = self.ErgodicMode._DTNum# 最多缓冲的时点数
         self.ErgodicMode._Queue2SubProcess = Queue()
         self.ErgodicMode._Queue2MainProcess = Queue()
         if self.ErgodicMode.CacheSize>0:
@@ -32,6 +32,43 @@ def maskCategary(data_len,cat_data=None, mask=None):
                 iMask = (iMask & pd.isnull(cat_data[:,j]))
         CatMask[tuple(iCat)] = iMask
     return CatMask
+# 给定面板数据的 mask 和分类数据, 返回每个元素所属的 (时点, 类别) 分段编号和分段数, 不在 mask 中的元素编号为 -1
+# mask: array(shape=(nDT, nID)); cat_data: 分类数据, array(shape=(nDT, nID)) 或者 array(shape=(nDT, nID, nCat)), 缺失值视为一个类别
+def _genPanelSegment(mask, cat_data=None):
+    Code = np.repeat(np.arange(mask.shape[0]), mask.shape[1])
+    if cat_data is not None:
+        cat_data = np.asarray(cat_data)
+        if cat_data.ndim==mask.ndim: cat_data = cat_data[..., np.newaxis]
+        for i in range(cat_data.shape[-1]):
+            iCode, iCats = pd.factorize(cat_data[..., i].ravel())
+            iCode[iCode<0] = len(iCats)
+            Code = pd.factorize(Code * (len(iCats)+1) + iCode)[0]
+    Segment = np.full(mask.shape, -1, dtype=np.int64)
+    Segment[mask] = pd.factorize(Code.reshape(mask.shape)[mask])[0]
+    return (Segment, int(Segment.max())+1 if Segment.size>0 else 0)
+# 按照分段排序, 返回排序后的位置, 每个元素在分段内的排名(从 0 开始), 以及每个分段的元素个数; segment, values: 一维 array, values 中不能有缺失值
+def _sortSegment(segment, values, n_segment):
+    Order = np.lexsort((values, segment))
+    Count = np.bincount(segment, minlength=n_segment)
+    Start = np.cumsum(Count) - Count
+    Rank = np.empty(segment.shape[0], dtype=np.int64)
+    Rank[Order] = np.arange(segment.shape[0]) - Start[segment[Order]]
+    return (Order, Rank, Count, Start)
+# 每个分段的中位数, 空的分段为 nan
+def _segmentMedian(segment, values, n_segment):
+    Order, _, Count, Start = _sortSegment(segment, values, n_segment)
+    SortedValues = values[Order]
+    Median = np.full(n_segment, np.nan)
+    Mask = (Count>0)
+    Median[Mask] = (SortedValues[(Start + (Count - 1) // 2)[Mask]] + SortedValues[(Start + Count // 2)[Mask]]) / 2
+    return Median
+# 每个分段的归约值, ufunc: 归约运算, 比如 np.maximum; 空的分段为 fill_value
+def _segmentReduce(segment, values, n_segment, ufunc, fill_value=np.nan):
+    Order, _, Count, Start = _sortSegment(segment, values, n_segment)
+    Rslt = np.full(n_segment, fill_value)
+    Mask = (Count>0)
+    if np.any(Mask): Rslt[Mask] = ufunc.reduceat(values[Order], Start[Mask])
+    return Rslt
 # 准备回归的数据
 def prepareRegressData(Y, X=None, x_varnames=None, has_constant=False, dummy_data=None, drop_dummy_na=False):
     NotNAMask = pd.notnull(Y)
@@ -135,6 +172,49 @@ def standardizeZScore(data, mask=None, cat_data=None, avg_statistics="平均值"
         StdData[~mask] = data[~mask]
     return StdData
 
+# 面板数据的 Z-Score 标准化, 所有时点同时计算, 结果和逐时点调用 standardizeZScore 一致
+# data: 待标准化的数据, array(shape=(nDT, nID)); mask, avg_weight, dispersion_weight: array(shape=(nDT, nID)); cat_data: 分类数据, array(shape=(nDT, nID)) 或者 array(shape=(nDT, nID, nCat))
+def standardizeZScorePanel(data, mask=None, cat_data=None, avg_statistics="平均值", dispersion_statistics="标准差", avg_weight=None, dispersion_weight=None, other_handle='填充None'):
+    """面板数据的 Z-Score 标准化"""
+    data = np.array(data, dtype="float")
+    StdData = np.full(data.shape, np.nan)
+    if mask is None:
+        mask = np.full(data.shape, True)
+    Segment, nSegment = _genPanelSegment(mask, cat_data=cat_data)
+    if (avg_statistics!='平均值') or (avg_weight is None):
+        avg_weight = np.ones(data.shape)
+    avg_weight = np.array(avg_weight, dtype="float")
+    if (dispersion_statistics!='标准差') or (dispersion_weight is None):
+        dispersion_weight = np.ones(data.shape)
+    dispersion_weight = np.array(dispersion_weight, dtype="float")
+    with np.errstate(divide="ignore", invalid="ignore"):
+        TotalMask = (pd.notnull(data) & pd.notnull(avg_weight) & (Segment>=0))
+        iSegment, iData = Segment[TotalMask], data[TotalMask]
+        if avg_statistics=='平均值':
+            TotalWeight = np.bincount(iSegment, weights=avg_weight[TotalMask], minlength=nSegment)
+            Avg = np.bincount(iSegment, weights=iData*avg_weight[TotalMask], minlength=nSegment) / TotalWeight
+            Invalid = (TotalWeight==0)
+        elif avg_statistics=='中位数':
+            Avg = _segmentMedian(iSegment, iData, nSegment)
+            Invalid = np.full(nSegment, False)
+        TotalMask = (pd.notnull(data) & pd.notnull(dispersion_weight) & (Segment>=0))
+        iSegment, iData = Segment[TotalMask], data[TotalMask]
+        if dispersion_statistics=='标准差':
+            TotalWeight = np.bincount(iSegment, weights=dispersion_weight[TotalMask], minlength=nSegment)
+            Mean = np.bincount(iSegment, weights=iData, minlength=nSegment) / np.bincount(iSegment, minlength=nSegment)
+            Std = np.sqrt(np.bincount(iSegment, weights=(iData-Mean[iSegment])**2*dispersion_weight[TotalMask], minlength=nSegment) / TotalWeight)
+            Invalid = (Invalid | (TotalWeight==0))
+        elif dispersion_statistics=='MAD':
+            Median = _segmentMedian(iSegment, iData, nSegment)
+            Std = 1.483*_segmentMedian(iSegment, np.abs(iData-Median[iSegment]), nSegment)
+        iStd = Std[iSegment]
+        iStdData = np.where(iStd!=0, (iData-Avg[iSegment])/iStd, 0.0)
+    iStdData[Invalid[iSegment]] = np.nan
+    StdData[TotalMask] = iStdData
+    if other_handle=="保持不变":
+        StdData[~mask] = data[~mask]
+    return StdData
+
 # Rank 标准化
 # data: 待标准化的数据, array; cat_data: 分类数据, array
 # ascending: 是否升序, 可选: True, False; uniformization: 是否归一
@@ -168,6 +248,33 @@ def standardizeRank(data, mask=None, cat_data=None, ascending=True, uniformizati
         StdData[jCatMask] = jData
     return StdData
 
+# 面板数据的 Rank 标准化, 所有时点同时计算, 结果和逐时点调用 standardizeRank 一致
+# data: 待标准化的数据, array(shape=(nDT, nID)); cat_data: 分类数据, array(shape=(nDT, nID)) 或者 array(shape=(nDT, nID, nCat))
+def standardizeRankPanel(data, mask=None, cat_data=None, ascending=True, uniformization=True, perturbation=False, offset=0.5, other_handle='填充None'):
+    """面板数据的 Rank 标准化"""
+    data = np.array(data, dtype="float")
+    if other_handle=="保持不变":
+        StdData = np.copy(data)
+    else:
+        StdData = np.full(data.shape, np.nan)
+    if mask is None:
+        mask = np.full(data.shape, True)
+    if perturbation and (data.shape[1]>1):# 扰动的幅度为每个截面上相邻不同值之间的最小差值的 1%
+        Diff = np.diff(np.sort(data, axis=1), axis=1)
+        Diff[~(Diff>0)] = np.inf
+        MinDiff = np.min(Diff, axis=1)
+        MinDiff[np.isinf(MinDiff)] = 0
+        data = data+np.random.rand(*data.shape)*MinDiff[:, np.newaxis]*0.01
+    Segment, nSegment = _genPanelSegment(mask, cat_data=cat_data)
+    TotalMask = (pd.notnull(data) & (Segment>=0))
+    iSegment = Segment[TotalMask]
+    _, Rank, Count, _ = _sortSegment(iSegment, (data[TotalMask] if ascending else -data[TotalMask]), nSegment)
+    Rank = Rank.astype('float')
+    if uniformization:
+        Rank = (Rank+offset)/Count[iSegment]
+    StdData[TotalMask] = Rank
+    return StdData
+
 # 分位数变换(Quantile Transformation)标准化
 # data: 待标准化的数据, array; cat_data: 分类数据, array
 # ascending: 是否升序, 可选: True, False
@@ -181,6 +288,18 @@ def standardizeQuantile(data, mask=None, cat_data=None, ascending=True, perturba
         StdData[~mask] = data[~mask]
     return StdData
 
+# 面板数据的分位数变换标准化, 所有时点同时计算, 结果和逐时点调用 standardizeQuantile 一致
+def standardizeQuantilePanel(data, mask=None, cat_data=None, ascending=True, perturbation=False, other_handle='填充None'):
+    """面板数据的分位数变换标准化"""
+    data = np.array(data, dtype="float")
+    if mask is None:
+        mask = np.full(data.shape, True)
+    StdData = standardizeRankPanel(data, mask=mask, cat_data=cat_data, ascending=ascending, uniformization=True, perturbation=perturbation, offset=0.5, other_handle='填充None')
+    StdData = norm.ppf(StdData)
+    if other_handle=="保持不变":
+        StdData[~mask] = data[~mask]
+    return StdData
+
 # 动态分组标准化
 # data: 待标准化的数据, array; corr_matrix: 相关系数矩阵, array;
 # cat_data: 分类数据, array; n_group: 同类数量, double
@@ -230,13 +349,16 @@ def fillNaByLookback(data, lookback, dts=None):
     else: isDF = True
     if dts is None: dts = data.index.values
     else: dts = np.array(dts)
-    Ind = pd.DataFrame(np.r_[0, np.diff(dts).astype("float")].reshape((data.shape[0], 1)).repeat(data.shape[1], axis=1).cumsum(axis=0))
-    Ind1 = Ind.where(pd.notnull(data.values), other=np.nan)
-    Ind1.fillna(method="pad", inplace=True)
-    data = data.fillna(method="pad")
-    data.where(((Ind.values-Ind1.values)/10**9<=lookback), np.nan, inplace=True)
-    if isDF: return data
-    else: return data.values
+    Elapsed = np.r_[0, np.diff(dts).astype("float")].cumsum()
+    # 每个位置之前(含)最近一个非缺失值的行号, 没有则为 -1
+    nDT, nID = data.shape
+    LastInd = np.where(pd.notnull(data.values), np.arange(nDT).reshape((nDT, 1)), -1)
+    LastInd = np.maximum.accumulate(LastInd, axis=0) if nDT>0 else LastInd
+    Mask = ((LastInd>=0) & ((Elapsed.reshape((nDT, 1)) - Elapsed[np.maximum(LastInd, 0)])/10**9<=lookback))
+    Rslt = np.full(data.shape, np.nan, dtype=(data.values.dtype if data.values.dtype==np.dtype("O") else "float"))
+    Rslt[Mask] = data.values[LastInd[Mask], np.nonzero(Mask)[1]]
+    if isDF: return pd.DataFrame(Rslt, index=data.index, columns=data.columns)
+    else: return Rslt
 # 以固定值进行缺失值填充
 # data: 待填充的数据, array; mask: True-False mask, 标记需要填充的范围, array; value: 缺失填充值, double or string
 def fillNaNByVal(data, mask=None, value=0.0):
@@ -255,6 +377,39 @@ def fillNaNByFun(data, mask=None, cat_data=None, val_fun=(lambda x,n:np.zeros(n)
         iMask = (iCatMask & NAMask)
         StdData[iMask] = val_fun(data[iCatMask],np.sum(iMask))
     return StdData
+# 面板数据的缺失值填充, 所有时点同时计算, 结果和逐时点调用 fillNaNByFun 一致
+# data: 待填充的数据, array(shape=(nDT, nID)); cat_data: 分类数据, array(shape=(nDT, nID)) 或者 array(shape=(nDT, nID, nCat))
+# val_fun: 填充值, 可选: 平均值, 中位数, 最大值, 最小值, 高斯随机数, 均匀随机数
+def fillNaNByFunPanel(data, mask=None, cat_data=None, val_fun="平均值"):
+    data = np.array(data, dtype="float")
+    StdData = np.copy(data)
+    if mask is None:
+        mask = np.full(data.shape, True)
+    Segment, nSegment = _genPanelSegment(mask, cat_data=cat_data)
+    Valid = ((Segment>=0) & pd.notnull(data))
+    iSegment, iData = Segment[Valid], data[Valid]
+    NAMask = ((Segment>=0) & pd.isnull(data))
+    NASegment = Segment[NAMask]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        Count = np.bincount(iSegment, minlength=nSegment)
+        Mean = np.bincount(iSegment, weights=iData, minlength=nSegment) / Count
+        if val_fun=="平均值":
+            StdData[NAMask] = Mean[NASegment]
+        elif val_fun=="中位数":
+            StdData[NAMask] = _segmentMedian(iSegment, iData, nSegment)[NASegment]
+        elif val_fun=="最大值":
+            StdData[NAMask] = _segmentReduce(iSegment, iData, nSegment, np.maximum)[NASegment]
+        elif val_fun=="最小值":
+            StdData[NAMask] = _segmentReduce(iSegment, iData, nSegment, np.minimum)[NASegment]
+        elif val_fun=="高斯随机数":
+            Std = np.sqrt(np.bincount(iSegment, weights=(iData-Mean[iSegment])**2, minlength=nSegment) / Count)
+            StdData[NAMask] = np.random.randn(NASegment.shape[0])*Std[NASegment]+Mean[NASegment]
+        elif val_fun=="均匀随机数":
+            Max, Min = _segmentReduce(iSegment, iData, nSegment, np.maximum), _segmentReduce(iSegment, iData, nSegment, np.minimum)
+            StdData[NAMask] = np.random.rand(NASegment.shape[0])*(Max-Min)[NASegment]+Min[NASegment]
+        else:
+            raise ValueError("不支持的填充方式: '%s'" % (val_fun, ))
+    return StdData
 # 回归方式进行缺失值填充
 # Y: 待处理的数据, 因变量, array; X: 自变量, array; mask: True-False mask, 标记需要处理的范围, array;
 # cat_data: 分类数据, array; constant: 是否有常数项, True or False; dummy_data: 哑变量, array; drop_dummy_na: 是否舍弃哑变量中的缺失值
@@ -324,6 +479,48 @@ def winsorize(data, mask=None, cat_data=None, method='截断', avg_statistics="
             iData[Mask] = LeftExtreme*(1-sMinus)+sMinus*iData[Mask]
         StdData[iCatMask] = iData
     return StdData
+# 面板数据的异常值处理, 所有时点同时计算, 结果和逐时点调用 winsorize 一致
+# data: 待处理的数据, array(shape=(nDT, nID)); cat_data: 分类数据, array(shape=(nDT, nID)) 或者 array(shape=(nDT, nID, nCat))
+def winsorizePanel(data, mask=None, cat_data=None, method='截断', avg_statistics="平均值", dispersion_statistics="标准差", std_multiplier=3, std_tmultiplier=3.5, other_handle='填充None'):
+    data = np.array(data, dtype="float")
+    if other_handle=='保持不变':
+        StdData = np.copy(data)
+    else:
+        StdData = np.empty(data.shape)+np.nan
+    if mask is None:
+        mask = np.full(data.shape, True)
+    Segment, nSegment = _genPanelSegment(mask, cat_data=cat_data)
+    Valid = ((Segment>=0) & pd.notnull(data))
+    iSegment, iData = Segment[Valid], data[Valid]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        Count = np.bincount(iSegment, minlength=nSegment)
+        Mean = np.bincount(iSegment, weights=iData, minlength=nSegment) / Count
+        if (avg_statistics=="中位数") or (dispersion_statistics=="MAD"):
+            Median = _segmentMedian(iSegment, iData, nSegment)
+        if avg_statistics=="平均值":
+            Avg = Mean
+        elif avg_statistics=="中位数":
+            Avg = Median
+        if dispersion_statistics=="标准差":
+            Std = np.sqrt(np.bincount(iSegment, weights=(iData-Mean[iSegment])**2, minlength=nSegment) / Count)
+        elif dispersion_statistics=="MAD":
+            Std = 1.483*_segmentMedian(iSegment, np.abs(iData-Median[iSegment]), nSegment)
+        LeftExtreme, RightExtreme = Avg-std_multiplier*Std, Avg+std_multiplier*Std
+        iLeft, iRight = LeftExtreme[iSegment], RightExtreme[iSegment]
+        if method=='截断':
+            iData = np.where(iData>iRight, iRight, np.where(iData<iLeft, iLeft, iData))
+        elif method=='丢弃':
+            iData = np.where((iData>iRight) | (iData<iLeft), np.nan, iData)
+        elif method=='变换':
+            Max, Min = _segmentReduce(iSegment, iData, nSegment, np.maximum), _segmentReduce(iSegment, iData, nSegment, np.minimum)
+            sPlus = (std_tmultiplier*Std-std_multiplier*Std)/(Max-RightExtreme)
+            sMinus = (std_tmultiplier*Std-std_multiplier*Std)/(LeftExtreme-Min)
+            sPlus, sMinus = np.clip(np.where(pd.isnull(sPlus), 1, sPlus), 0, 1)[iSegment], np.clip(np.where(pd.isnull(sMinus), 1, sMinus), 0, 1)[iSegment]
+            iData = np.where(iData>iRight, iRight*(1-sPlus)+sPlus*iData, iData)
+            iData = np.where(iData<iLeft, iLeft*(1-sMinus)+sMinus*iData, iData)
+    StdData[Segment>=0] = np.nan
+    StdData[Valid] = iData
+    return StdData
 # 正交化; 线性回归取残差作为新值
 # Y: 待处理的数据, 因变量, array; X: 自变量, array; mask: True-False mask, 标记需要处理的范围, array;
 # constant: 是否有常数项, True or False; dummy_data: 哑变量, array; drop_dummy_na: 是否舍弃哑变量中的缺失值; other_handle: 不在计算范围内的位置如何处理
@@ -340,6 +537,50 @@ def orthogonalize(Y, X, mask=None, constant=False, dummy_data=None, drop_dummy_n
     if other_handle=="保持不变":
         StdData[~mask] = Y[~mask]
     return StdData
+# 面板数据的正交化, 按时点分块批量回归, 结果和逐时点调用 orthogonalize 一致
+# Y: 待处理的数据, array(shape=(nDT, nID)); X: 自变量, array(shape=(nDT, nID)) 或者 array(shape=(nDT, nID, nX)); mask: array(shape=(nDT, nID));
+# dummy_data: 哑变量, array(shape=(nDT, nID)) 或者 array(shape=(nDT, nID, nDummy)), 每个类别对应一列, 共线性由伪逆处理, 残差和逐时点去掉一个类别的回归相同
+# block_size: 每次批量回归的最大元素数
+def orthogonalizePanel(Y, X=None, mask=None, constant=False, dummy_data=None, drop_dummy_na=False, other_handle='填充None', block_size=2**24):
+    Y = np.array(Y, dtype="float")
+    StdData = np.full(Y.shape, np.nan)
+    if mask is None:
+        mask = np.full(Y.shape, True)
+    Valid = (mask & pd.notnull(Y))
+    nRegressor, DummyCodes = 0, []# 哑变量只保存类别编码, 分块计算时再展开成 0-1 矩阵
+    if X is not None:
+        X = np.array(X, dtype="float")
+        if X.ndim==Y.ndim: X = X[..., np.newaxis]
+        Valid = (Valid & np.all(pd.notnull(X), axis=-1))
+        nRegressor += X.shape[-1]
+    if dummy_data is not None:
+        dummy_data = np.asarray(dummy_data)
+        if dummy_data.ndim==Y.ndim: dummy_data = dummy_data[..., np.newaxis]
+        if drop_dummy_na: Valid = (Valid & np.all(pd.notnull(dummy_data), axis=-1))
+        for i in range(dummy_data.shape[-1]):
+            iCode, iCats = pd.factorize(dummy_data[..., i].ravel())
+            iCode[iCode<0] = len(iCats)# 缺失值视为一个类别
+            DummyCodes.append((iCode.reshape(Y.shape), len(iCats)+1))
+            nRegressor += len(iCats) + 1
+    if constant: nRegressor += 1
+    Valid = (Valid & (np.sum(Valid, axis=1)>=2).reshape((Y.shape[0], 1)))
+    if nRegressor==0:
+        StdData[Valid] = Y[Valid]
+    else:
+        nBlock = max(1, block_size // max(1, Y.shape[1]*nRegressor))
+        for i in range(0, Y.shape[0], nBlock):
+            iRegressors = ([X[i:i+nBlock]] if X is not None else [])
+            iRegressors += [(iCode[i:i+nBlock, ..., np.newaxis]==np.arange(inCat)).astype("float") for iCode, inCat in DummyCodes]
+            if constant: iRegressors.append(np.ones(Y[i:i+nBlock].shape+(1,)))
+            iValid = Valid[i:i+nBlock]
+            iX = np.where(iValid[..., np.newaxis], np.concatenate(iRegressors, axis=-1), 0)
+            iY = np.where(iValid, Y[i:i+nBlock], 0)
+            iBeta = np.einsum("tkn,tn->tk", np.linalg.pinv(iX), iY)
+            iResid = iY - np.einsum("tnk,tk->tn", iX, iBeta)
+            StdData[i:i+nBlock][iValid] = iResid[iValid]
+    if other_handle=="保持不变":
+        StdData[~mask] = Y[~mask]
+    return StdData
 # 中性化;
 # Y: 待处理的数据, 因变量, array; X: 自变量, array; mask: True-False mask, 标记需要处理的范围, array;
 # constant: 是否有常数项, True or False; dummy_data: 哑变量, array; drop_dummy_na: 是否舍弃哑变量中的缺失值; other_handle: 不在计算范围内的位置如何处理
@@ -4,6 +4,10 @@ import pandas as pd
 from matplotlib.lines import Line2D
 from matplotlib.patches import Rectangle
 
+from QuantStudio import __QS_initMatplotlib__
+
+__QS_initMatplotlib__()
+
 # 绘制 K 线图
 # quotes: array(shape=(N, 4)), 列分别为开盘价, 最高价, 最低价, 收盘价
 def plotCandleStick(ax, quotes, xdata=None, width=0.2, colorup='#B70203', colordown='#3ACCCC', alpha=1.0):
@@ -299,6 +299,8 @@ if __name__=="__main__":
     #r4, sigma4 = calcEfficientFrontier(V, mu, rf=0.02, allow_short=True)
     #r5, sigma5 = calcEfficientFrontier(V, mu, rf=0.02, allow_short=False)
     import matplotlib.pyplot as plt
+    from QuantStudio import __QS_initMatplotlib__
+    __QS_initMatplotlib__()
     Fig, Axes = plt.subplots(1, 1)
     #Axes.plot(sigma1, r1, label="Efficient Frontier without Constraint")
     #Axes.plot(sigma2, r2, label="Efficient Frontier Fully Invested")
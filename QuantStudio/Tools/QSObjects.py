@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 import os
 import mmap
+import threading
 import uuid
 from multiprocessing import Queue, Lock
 import pickle
@@ -35,10 +36,12 @@ class QSSQLObject(__QS_Object__):
         self._Connector = None# 实际使用的数据库链接器
         self._AllTables = []# 数据库中的所有表名, 用于查询时解决大小写敏感问题
         self._PID = None# 保存数据库连接创建时的进程号
+        self._ThreadConnections = {}# 线程独立的连接, {线程 ID: 连接对象}
         return super().__init__(sys_args=sys_args, config_file=config_file, **kwargs)
     def __getstate__(self):
         state = self.__dict__.copy()
         state["_Connection"] = (True if self.isAvailable() else False)
+        state["_ThreadConnections"] = {}
         return state
     def __setstate__(self, state):
         super().__setstate__(state)
@@ -46,15 +49,40 @@ class QSSQLObject(__QS_Object__):
         else: self._Connection = None
     @property
     def Connection(self):
+        ThreadConnection = self._ThreadConnections.get(threading.get_ident(), None)
+        if ThreadConnection is not None: return ThreadConnection
         if self._Connection is not None:
             if os.getpid()!=self._PID: self._connect()# 如果进程号发生变化, 重连
         return self._Connection
+    # 支持为线程创建独立的连接
+    def isThreadConnectable(self):
+        return True
+    # 为当前线程创建独立的连接, 此后当前线程通过该连接访问数据库, 直到调用 closeThreadConnection
+    def openThreadConnection(self):
+        ThreadID = threading.get_ident()
+        if ThreadID in self._ThreadConnections: return 0
+        self._ThreadConnections[ThreadID] = self._newConnection()
+        return 0
+    def closeThreadConnection(self):
+        ThreadConnection = self._ThreadConnections.pop(threading.get_ident(), None)
+        if ThreadConnection is not None:
+            try:
+                ThreadConnection.close()
+            except Exception as e:
+                self._QS_Logger.warning("'%s' 断开线程的数据库连接错误: %s" % (self.Name, str(e)))
+        return 0
     def _connect(self):
         self._Connection = None
+        self._Connection = self._newConnection()
+        self._PID = os.getpid()
+        return 0
+    # 创建一个新的连接对象
+    def _newConnection(self):
+        Connection = None
         if (self.Connector=="cx_Oracle") or ((self.Connector=="default") and (self.DBType=="Oracle")):
             try:
                 import cx_Oracle
-                self._Connection = cx_Oracle.connect(self.User, self.Pwd, cx_Oracle.makedsn(self.IPAddr, str(self.Port), self.DBName))
+                Connection = cx_Oracle.connect(self.User, self.Pwd, cx_Oracle.makedsn(self.IPAddr, str(self.Port), self.DBName))
             except Exception as e:
                 Msg = ("'%s' 尝试使用 cx_Oracle 连接(%s@%s:%d)数据库 '%s' 失败: %s" % (self.Name, self.User, self.IPAddr, self.Port, self.DBName, str(e)))
                 self._QS_Logger.error(Msg)
@@ -64,7 +92,7 @@ class QSSQLObject(__QS_Object__):
         elif (self.Connector=="pymssql") or ((self.Connector=="default") and (self.DBType=="SQL Server")):
             try:
                 import pymssql
-                self._Connection = pymssql.connect(server=self.IPAddr, port=str(self.Port), user=self.User, password=self.Pwd, database=self.DBName, charset=self.CharSet)
+                Connection = pymssql.connect(server=self.IPAddr, port=str(self.Port), user=self.User, password=self.Pwd, database=self.DBName, charset=self.CharSet)
             except Exception as e:
                 Msg = ("'%s' 尝试使用 pymssql 连接(%s@%s:%d)数据库 '%s' 失败: %s" % (self.Name, self.User, self.IPAddr, self.Port, self.DBName, str(e)))
                 self._QS_Logger.error(Msg)
@@ -74,7 +102,7 @@ class QSSQLObject(__QS_Object__):
         elif (self.Connector=="mysql.connector") or ((self.Connector=="default") and (self.DBType=="MySQL")):
             try:
                 import mysql.connector
-                self._Connection = mysql.connector.connect(host=self.IPAddr, port=str(self.Port), user=self.User, password=self.Pwd, database=self.DBName, charset=self.CharSet, autocommit=True)
+                Connection = mysql.connector.connect(host=self.IPAddr, port=str(self.Port), user=self.User, password=self.Pwd, database=self.DBName, charset=self.CharSet, autocommit=True)
             except Exception as e:
                 Msg = ("'%s' 尝试使用 mysql.connector 连接(%s@%s:%d)数据库 '%s' 失败: %s" % (self.Name, self.User, self.IPAddr, self.Port, self.DBName, str(e)))
                 self._QS_Logger.error(Msg)
@@ -84,7 +112,7 @@ class QSSQLObject(__QS_Object__):
         elif self.Connector=="pymysql":
             try:
                 import pymysql
-                self._Connection = pymysql.connect(host=self.IPAddr, port=self.Port, user=self.User, password=self.Pwd, db=self.DBName, charset=self.CharSet)
+                Connection = pymysql.connect(host=self.IPAddr, port=self.Port, user=self.User, password=self.Pwd, db=self.DBName, charset=self.CharSet)
             except Exception as e:
                 Msg = ("'%s' 尝试使用 pymysql 连接(%s@%s:%d)数据库 '%s' 失败: %s" % (self.Name, self.User, self.IPAddr, self.Port, self.DBName, str(e)))
                 self._QS_Logger.error(Msg)
@@ -94,23 +122,23 @@ class QSSQLObject(__QS_Object__):
         elif (self.Connector=="sqlite3") or ((self.Connector=="default") and (self.DBType=="sqlite3")):
             try:
                 import sqlite3
-                self._Connection = sqlite3.connect(self.SQLite3File)
+                Connection = sqlite3.connect(self.SQLite3File)
             except Exception as e:
                 Msg = ("'%s' 尝试使用 sqlite3 连接数据库 '%s' 失败: %s" % (self.Name, self.SQLite3File, str(e)))
                 self._QS_Logger.error(Msg)
                 raise e
             else:
                 self._Connector = "sqlite3"
-        if self._Connection is None:
+        if Connection is None:
             if self.Connector not in ("default", "pyodbc"):
-                self._Connection = None
+                Connection = None
                 Msg = ("'%s' 连接数据库时错误: 不支持该连接器(connector) '%s'" % (self.Name, self.Connector))
                 self._QS_Logger.error(Msg)
                 raise __QS_Error__(Msg)
             elif self.DSN:
                 try:
                     import pyodbc
-                    self._Connection = pyodbc.connect("DSN=%s;PWD=%s" % (self.DSN, self.Pwd))
+                    Connection = pyodbc.connect("DSN=%s;PWD=%s" % (self.DSN, self.Pwd))
                 except Exception as e:
                     Msg = ("'%s' 尝试使用 pyodbc 连接数据库 'DSN: %s' 失败: %s" % (self.Name, self.DSN, str(e)))
                     self._QS_Logger.error(Msg)
@@ -118,14 +146,13 @@ class QSSQLObject(__QS_Object__):
             else:
                 try:
                     import pyodbc
-                    self._Connection = pyodbc.connect("DRIVER={%s};DATABASE=%s;SERVER=%s;UID=%s;PWD=%s" % (self.DBType, self.DBName, self.IPAddr+","+str(self.Port), self.User, self.Pwd))
+                    Connection = pyodbc.connect("DRIVER={%s};DATABASE=%s;SERVER=%s;UID=%s;PWD=%s" % (self.DBType, self.DBName, self.IPAddr+","+str(self.Port), self.User, self.Pwd))
                 except Exception as e:
                     Msg = ("'%s' 尝试使用 pyodbc 连接(%s@%s:%d)数据库 '%s' 失败: %s" % (self.Name, self.User, self.IPAddr, self.Port, self.DBName, str(e)))
                     self._QS_Logger.error(Msg)
                     raise e
             self._Connector = "pyodbc"
-        self._PID = os.getpid()
-        return 0
+        return Connection
     def connect(self):
         self._connect()
         if not self.AdjustTableName:
@@ -149,12 +176,16 @@ class QSSQLObject(__QS_Object__):
             Msg = ("'%s' 获取 cursor 失败: 数据库尚未连接!" % (self.Name,))
             self._QS_Logger.error(Msg)
             raise __QS_Error__(Msg)
-        if os.getpid()!=self._PID: self._connect()# 如果进程号发生变化, 重连
-        try:# 连接断开后重连
-            Cursor = self._Connection.cursor()
-        except:
-            self._connect()
-            Cursor = self._Connection.cursor()
+        ThreadConnection = self._ThreadConnections.get(threading.get_ident(), None)
+        if ThreadConnection is not None:
+            Cursor = ThreadConnection.cursor()
+        else:
+            if os.getpid()!=self._PID: self._connect()# 如果进程号发生变化, 重连
+            try:# 连接断开后重连
+                Cursor = self._Connection.cursor()
+            except:
+                self._connect()
+                Cursor = self._Connection.cursor()
         if sql_str is None: return Cursor
         if self.AdjustTableName:
             for iTable in self._AllTables:
@@ -459,4 +490,36 @@ class QSPipe(object):
             DataLen = self._PutQueue.get()
         return pickle.loads(DataByte)
     def empty(self):
-        return self._PutQueue.empty()
\ No newline at end of file
+        return self._PutQueue.empty()
+# 遍历模式缓冲数据的内存预算, 同一进程内的多个因子表和风险表共享
+class QSCacheBudget(object):
+    """缓冲内存预算"""
+    # budget_size: 内存预算, 单位是 MB, 小于等于 0 表示不限制
+    def __init__(self, budget_size=0):
+        self._BudgetSize = (int(budget_size*2**20) if budget_size>0 else np.inf)
+        self._Usage = {}# {id(缓冲区所有者): 占用字节数}
+    @property
+    def BudgetSize(self):
+        return self._BudgetSize / 2**20
+    @property
+    def Usage(self):
+        return sum(self._Usage.values()) / 2**20
+    # 所有者最多可以占用的字节数, 包括其已经占用的部分
+    def getAvailable(self, owner):
+        return self._BudgetSize - sum(self._Usage.values()) + self._Usage.get(id(owner), 0)
+    # 更新所有者占用的字节数
+    def update(self, owner, usage):
+        self._Usage[id(owner)] = usage
+        return 0
+    def release(self, owner):
+        self._Usage.pop(id(owner), None)
+        return 0
+    # 计算缓冲数据实际占用的字节数, data: DataFrame, Series, ndarray 或者以上对象组成的 dict, list
+    @staticmethod
+    def getDataSize(data):
+        if isinstance(data, pd.DataFrame): return int(data.memory_usage(index=False, deep=True).sum())
+        elif isinstance(data, pd.Series): return int(data.memory_usage(index=False, deep=True))
+        elif isinstance(data, np.ndarray): return data.nbytes
+        elif isinstance(data, dict): return sum(QSCacheBudget.getDataSize(iData) for iData in data.values())
+        elif isinstance(data, (list, tuple)): return sum(QSCacheBudget.getDataSize(iData) for iData in data)
+        return 0
@@ -38,9 +38,12 @@ def populateQTreeWidgetWithNestedDict(tree_widget, nested_dict):
 
 # 以 GUI 的方式查看数据集
 def showOutput(output, plot_engine="matplotlib"):
+    from QuantStudio import __QS_initMatplotlib__
     from QuantStudio.Tools.QtGUI.ResultDlg import PlotlyResultDlg, MatplotlibResultDlg
     if plot_engine=="plotly": Dlg = PlotlyResultDlg(None, output)
-    elif plot_engine=="matplotlib": Dlg = MatplotlibResultDlg(None, output)
+    elif plot_engine=="matplotlib":
+        __QS_initMatplotlib__()
+        Dlg = MatplotlibResultDlg(None, output)
     Dlg.show()
     App.exec_()
     return 0
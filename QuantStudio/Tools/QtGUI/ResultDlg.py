@@ -22,7 +22,7 @@ import seaborn as sns
 import plotly
 from traits.api import File, Enum, List
 
-from QuantStudio import __QS_MainPath__, __QS_Error__, __QS_Object__
+from QuantStudio import __QS_MainPath__, __QS_Error__, __QS_Object__, __QS_initMatplotlib__
 from QuantStudio.Tools.FileFun import writeDictSeries2CSV, exportOutput2CSV, readCSV2StdDF
 from QuantStudio.Tools.DataTypeFun import getNestedDictItems, getNestedDictValue, removeNestedDictItem
 from QuantStudio.Tools.AuxiliaryFun import genAvailableName, joinList
@@ -30,6 +30,8 @@ from QuantStudio.Tools import StrategyTestFun
 from QuantStudio.Tools.QtGUI.QtGUIFun import populateTableWithDataFrame, populateQTreeWidgetWithNestedDict
 from QuantStudio.Tools.QtGUI.Ui_ResultDlg import Ui_ResultDlg
 
+__QS_initMatplotlib__()
+
 # 展示的数据类型 output: 嵌套的字典, 叶节点是 DataFrame
 
 # 用于多选的 QTableWidget
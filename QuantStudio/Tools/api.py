@@ -1,8 +1,18 @@
 # -*- coding: utf-8 -*-
-from . import MathFun as Math
-from . import DateTimeFun as DateTime
-from . import StrategyTestFun as Strategy
-from . import DataPreprocessingFun as Preprocess
-from . import FileFun as File
-from .QtGUI import QtGUIFun as QtGUI
-from .AuxiliaryFun import genAvailableName
\ No newline at end of file
+# 工具模块在第一次访问时才导入, 避免无界面的脚本导入 Qt
+import sys
+
+from QuantStudio import __QS_LazyModule__
+
+__QS_LazyNames__ = {
+    "Math": (".MathFun", None),
+    "DateTime": (".DateTimeFun", None),
+    "Strategy": (".StrategyTestFun", None),
+    "Preprocess": (".DataPreprocessingFun", None),
+    "File": (".FileFun", None),
+    "QtGUI": (".QtGUI.QtGUIFun", None),
+    "genAvailableName": (".AuxiliaryFun", "genAvailableName"),
+}
+__all__ = list(__QS_LazyNames__)
+
+sys.modules[__name__].__class__ = __QS_LazyModule__
@@ -5,35 +5,73 @@ import platform
 import logging
 import json
 import operator
+import types
+import importlib
 import warnings
 warnings.filterwarnings("ignore")
 
 import numpy as np
 import pandas as pd
 from traits.api import HasTraits
-from traitsui.api import Item, View
-from traitsui.menu import OKButton, CancelButton
+
+__version__ = "0.0.9"
 
 __QS_MainPath__ = os.path.split(os.path.realpath(__file__))[0]
 __QS_LibPath__ = __QS_MainPath__+os.sep+"Lib"
 __QS_ConfigPath__ = os.path.expanduser("~")+os.sep+"QuantStudioConfig"
 
-from matplotlib.pylab import mpl
-if platform.system()=="Windows":
-    mpl.rcParams['font.sans-serif'] = ["SimHei"]
-elif platform.system()=="Darwin":
-    if os.path.isfile("/Library/Fonts/Arial Unicode.ttf"):
-        from matplotlib.font_manager import FontProperties
-        Font = FontProperties(fname="/Library/Fonts/Arial Unicode.ttf")
-        mpl.rcParams["font.family"] = Font.get_family()
-        mpl.rcParams["font.sans-serif"] = Font.get_name()
-mpl.rcParams['axes.unicode_minus'] = False
+# matplotlib 的中文字体设置, 由使用 matplotlib 绘图的模块在导入时调用, 只在第一次调用时设置
+# 注意: 导入 QuantStudio 时不再导入 matplotlib 和设置字体, 在自己的代码中直接用 matplotlib 绘制中文时需要先调用该函数
+__QS_MatplotlibInited__ = False
+def __QS_initMatplotlib__():
+    global __QS_MatplotlibInited__
+    if __QS_MatplotlibInited__: return 0
+    import matplotlib as mpl
+    if platform.system()=="Windows":
+        mpl.rcParams['font.sans-serif'] = ["SimHei"]
+    elif platform.system()=="Darwin":
+        if os.path.isfile("/Library/Fonts/Arial Unicode.ttf"):
+            from matplotlib.font_manager import FontProperties
+            Font = FontProperties(fname="/Library/Fonts/Arial Unicode.ttf")
+            mpl.rcParams["font.family"] = Font.get_family()
+            mpl.rcParams["font.sans-serif"] = Font.get_name()
+    mpl.rcParams['axes.unicode_minus'] = False
+    __QS_MatplotlibInited__ = True
+    return 0
+
+# 按需导入的模块, 访问 __QS_LazyNames__ 中的名字时才导入对应的模块并缓存, 用于 api 模块
+# __QS_LazyNames__: {名字: (模块名, 属性名)}, 模块名可以是相对于所在包的名字, 属性名为 None 表示模块本身
+# 用法: 在模块末尾执行 sys.modules[__name__].__class__ = __QS_LazyModule__
+class __QS_LazyModule__(types.ModuleType):
+    def __getattr__(self, name):
+        LazyNames = self.__dict__.get("__QS_LazyNames__", {})
+        if name not in LazyNames: raise AttributeError("module '%s' has no attribute '%s'" % (self.__name__, name))
+        ModuleName, AttrName = LazyNames[name]
+        Value = importlib.import_module(ModuleName, self.__package__)
+        if AttrName is not None: Value = getattr(Value, AttrName)
+        setattr(self, name, Value)
+        return Value
+    def __dir__(self):
+        return sorted(set(super().__dir__()).union(self.__dict__.get("__QS_LazyNames__", {})))
 
 # Quant Studio 系统错误
 class __QS_Error__(Exception):
     """Quant Studio 错误"""
     pass
 
+# 参数元数据, 同一个类的对象共享, {(类, (可见的 trait 名)): (标签-trait 名字典, 参数顺序)}, 对象增删参数时复制一份自己的元数据
+__QS_ArgMeta__ = {}
+# 解析过的配置文件, {文件路径: (修改时间, 配置)}
+__QS_ConfigCache__ = {}
+def __QS_loadConfig__(config_file):
+    MTime = os.path.getmtime(config_file)
+    Cache = __QS_ConfigCache__.get(config_file, None)
+    if (Cache is None) or (Cache[0]!=MTime):
+        with open(config_file, "r", encoding="utf-8") as File:
+            FileStr = File.read()
+        Cache = __QS_ConfigCache__[config_file] = (MTime, (json.loads(FileStr) if FileStr else {}))
+    return Cache[1].copy()
+
 # Quant Studio 系统对象
 class __QS_Object__(HasTraits):
     """Quant Studio 系统对象"""
@@ -41,31 +79,44 @@ class __QS_Object__(HasTraits):
         self._QS_Logger = kwargs.pop("logger", None)
         if self._QS_Logger is None: self._QS_Logger = logging.getLogger()
         super().__init__(**kwargs)
-        self._LabelTrait = {}
-        self._ArgOrder = pd.Series()
-        for iTraitName in self.visible_traits():
-            iTrait = self.trait(iTraitName)
-            if iTrait.arg_type is None: continue
-            iLabel = (iTrait.label if iTrait.label is not None else iTraitName)
-            iOrder = (iTrait.order if iTrait.order is not None else np.inf)
-            self._LabelTrait[iLabel] = iTraitName
-            self._ArgOrder[iLabel] = iOrder
-        self._ArgOrder.sort_values(inplace=True)
+        VisibleTraits = tuple(self.visible_traits())
+        ArgMeta = __QS_ArgMeta__.get((type(self), VisibleTraits), None)
+        if ArgMeta is None:
+            LabelTrait, ArgOrder = {}, {}
+            for iTraitName in VisibleTraits:
+                iTrait = self.trait(iTraitName)
+                if iTrait.arg_type is None: continue
+                iLabel = (iTrait.label if iTrait.label is not None else iTraitName)
+                iOrder = (iTrait.order if iTrait.order is not None else np.inf)
+                LabelTrait[iLabel] = iTraitName
+                ArgOrder[iLabel] = iOrder
+            ArgMeta = __QS_ArgMeta__[(type(self), VisibleTraits)] = (LabelTrait, pd.Series(ArgOrder, dtype="float").sort_values())
+        self._LabelTrait, self._ArgOrder = ArgMeta
+        self._isArgMetaShared = True
         self.__QS_initArgs__()
         self._ConfigFile, Config = None, {}
         if config_file:
             if not os.path.isfile(config_file): config_file = __QS_ConfigPath__+os.sep+config_file
             if os.path.isfile(config_file):
                 self._ConfigFile = config_file
-                with open(self._ConfigFile, "r", encoding="utf-8") as File:
-                    FileStr = File.read()
-                    if FileStr: Config = json.loads(FileStr)
+                Config = __QS_loadConfig__(self._ConfigFile)
         Config.update(sys_args)
         for iArgName, iArgVal in Config.items():
-            if iArgName in self._ArgOrder.index: self[iArgName] = iArgVal
-        self.trait_view(name="QSView", view_element=View(*self.getViewItems()[0], buttons=[OKButton, CancelButton], resizable=True, title=getattr(self, "Name", "设置参数")))
+            if iArgName in self._LabelTrait: self[iArgName] = iArgVal
     def __setstate__(self, state, trait_change_notify=False):
         return super().__setstate__(state, trait_change_notify=trait_change_notify)
+    # 参数界面在请求时才生成
+    def trait_view(self, name=None, view_element=None):
+        if (name=="QSView") and (view_element is None):
+            from traitsui.api import View
+            from traitsui.menu import OKButton, CancelButton
+            return View(*self.getViewItems()[0], buttons=[OKButton, CancelButton], resizable=True, title=getattr(self, "Name", "设置参数"))
+        return super().trait_view(name=name, view_element=view_element)
+    # 增删参数之前复制共享的参数元数据
+    def _QS_detachArgMeta(self):
+        if self._isArgMetaShared:
+            self._LabelTrait, self._ArgOrder = self._LabelTrait.copy(), self._ArgOrder.copy()
+            self._isArgMetaShared = False
     @property
     def ArgNames(self):
         return self._ArgOrder.index.tolist()
@@ -76,10 +127,13 @@ class __QS_Object__(HasTraits):
     def Logger(self):
         return self._QS_Logger
     def getViewItems(self, context_name=""):
+        from traitsui.api import Item
         Prefix = (context_name+"." if context_name else "")
         Context = ({} if not Prefix else {context_name:self})
         return ([Item(Prefix+self._LabelTrait[iLabel]) for iLabel in self._ArgOrder.index], Context)
     def setArgs(self):
+        from traitsui.api import View
+        from traitsui.menu import OKButton, CancelButton
         Items, Context = self.getViewItems()
         if Context: return self.configure_traits(view=View(*Items, buttons=[OKButton, CancelButton], resizable=True, title=getattr(self, "Name", "设置参数"), kind="livemodal"), context=Context)
         return self.configure_traits(view=View(*Items, buttons=[OKButton, CancelButton], resizable=True, title=getattr(self, "Name", "设置参数"), kind="livemodal"))
@@ -91,6 +145,7 @@ class __QS_Object__(HasTraits):
         if iTrait.arg_type is None: return Rslt
         iLabel = (iTrait.label if iTrait.label is not None else name)
         iOrder = (iTrait.order if iTrait.order is not None else np.inf)
+        self._QS_detachArgMeta()
         self._LabelTrait[iLabel] = name
         self._ArgOrder[iLabel] = iOrder
         self._ArgOrder.sort_values(inplace=True)
@@ -99,6 +154,7 @@ class __QS_Object__(HasTraits):
         if (name not in self.visible_traits()) or (self.trait(name).arg_type is None): return super().remove_trait(name)
         iLabel = self.trait(name).label
         Rslt = super().remove_trait(name)
+        self._QS_detachArgMeta()
         self._LabelTrait.pop(iLabel)
         self._ArgOrder.pop(iLabel)
         return Rslt
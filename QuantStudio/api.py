@@ -1,7 +1,17 @@
 # -*- coding: utf-8 -*-
-import QuantStudio.FactorDataBase.api as FactorDB
-import QuantStudio.BackTest.api as BackTest
-import QuantStudio.RiskDataBase.api as RiskDB
-import QuantStudio.RiskModel.api as RiskModel
-import QuantStudio.Tools.api as Tools
-import QuantStudio.PortfolioConstructor.api as PortfolioConstructor
\ No newline at end of file
+# 各个子包的 api 在第一次访问时才导入
+import sys
+
+from QuantStudio import __QS_LazyModule__
+
+__QS_LazyNames__ = {
+    "FactorDB": ("QuantStudio.FactorDataBase.api", None),
+    "BackTest": ("QuantStudio.BackTest.api", None),
+    "RiskDB": ("QuantStudio.RiskDataBase.api", None),
+    "RiskModel": ("QuantStudio.RiskModel.api", None),
+    "Tools": ("QuantStudio.Tools.api", None),
+    "PortfolioConstructor": ("QuantStudio.PortfolioConstructor.api", None),
+}
+__all__ = list(__QS_LazyNames__)
+
+sys.modules[__name__].__class__ = __QS_LazyModule__
@@ -5,6 +5,7 @@ import unittest
 
 import numpy as np
 import pandas as pd
+import statsmodels.api as sm
 
 from QuantStudio.FactorDataBase.FactorOperation import PointOperation, TimeOperation, SectionOperation, PanelOperation
 from QuantStudio.FactorDataBase.FactorDB import DataFactor, Factorize
@@ -87,6 +88,11 @@ def TestPanelOperationMultiSectionMultiDTMultiIDFun(f, idt, iid, x, args):
     for i in range(1, x[1].shape[0]):
         Rslt[i, :] = 2 / (N+1) * (np.nanmean(x[1][i, :]) - np.nanmean(x[2][i, :])) + (1 - 2 / (N+1)) * Rslt[i-1, :]
     return Rslt
+# 滚动窗口面板运算测试算子
+def TestPanelOperationRollingSingleDTMultiIDFun(f, idt, iid, x, args):
+    return np.nanmean(x[0]) - np.nanmean(x[1])
+def TestPanelOperationRollingBlockFun(f, idt, iid, x, args):
+    return (np.nanmean(x[0], axis=(1, 2)) - np.nanmean(x[1], axis=(1, 2))).reshape((len(idt), 1))
 
 
 class TestFactorOperation(unittest.TestCase):
@@ -132,6 +138,12 @@ class TestFactorOperation(unittest.TestCase):
         TestData = TestFactor.readData(ids=self.IDs, dts=self.DTs)
         Err = (TestData - TargetData).abs()
         self.assertAlmostEqual(Err.max().max(), 0)
+        # 单时点, 单 ID, 向量化模式
+        TestFactor = PointOperation(name="TestFactor", descriptors=[self.Factor0, self.Factor1], 
+                                    sys_args={"算子": TestPointOperationSingleDTMultiIDFun, "运算时点":"单时点", "运算ID":"单ID", "向量化":True})
+        TestData = TestFactor.readData(ids=self.IDs, dts=self.DTs)
+        Err = (TestData - TargetData).abs()
+        self.assertAlmostEqual(Err.max().max(), 0)
         # 内置算子模式
         TestFactor = Factorize(self.Factor0 / self.Factor1, factor_name="TestFactor")
         TestData = TestFactor.readData(ids=self.IDs, dts=self.DTs)
@@ -243,6 +255,162 @@ class TestFactorOperation(unittest.TestCase):
         TestData = TestFactor.readData(ids=[self.MacroID], dts=self.DTs).iloc[:, 0]
         Err = (TestData - TargetData).abs()
         self.assertAlmostEqual(Err.max(), 0)
+    # 测试面板运算的向量化模式, 测试运算: 滚动窗口的截面均值之差
+    def test_7_PanelOperationVectorized(self):
+        N = 5# 移动窗口长度
+        TargetData = self.Data0.mean(axis=1).rolling(N, min_periods=1).mean() - self.GroupData.mean(axis=1).rolling(N, min_periods=1).mean()
+        # 逐时点模式
+        TestFactor = PanelOperation(name="TestFactor", descriptors=[self.Factor0, self.GroupFactor], 
+                                    sys_args={"算子": TestPanelOperationRollingSingleDTMultiIDFun, "回溯期数":[N-1,N-1], "描述子截面":[self.IDs, self.GroupIDs], 
+                                              "运算时点":"单时点", "输出形式":"全截面"})
+        TestData = TestFactor.readData(ids=[self.MacroID], dts=self.DTs).iloc[:, 0]
+        Err = (TestData - TargetData).abs()
+        self.assertAlmostEqual(Err.max(), 0)
+        # 向量化模式
+        TestFactor = PanelOperation(name="TestFactor", descriptors=[self.Factor0, self.GroupFactor], 
+                                    sys_args={"算子": TestPanelOperationRollingBlockFun, "回溯期数":[N-1,N-1], "描述子截面":[self.IDs, self.GroupIDs], 
+                                              "运算时点":"单时点", "输出形式":"全截面", "向量化":True})
+        TestData = TestFactor.readData(ids=[self.MacroID], dts=self.DTs).iloc[:, 0]
+        Err = (TestData - TargetData).abs()
+        self.assertAlmostEqual(Err.max(), 0)
+    # 测试时间序列运算的流式计算, 分段读取的结果应该和一次性计算的结果一致
+    def test_8_TimeOperationStreaming(self):
+        N = 5# 移动窗口长度
+        TestFactors = {"rolling_mean": fd.rolling_mean(self.Factor0, N), "rolling_std": fd.rolling_std(self.Factor0, N), "rolling_max": fd.rolling_max(self.Factor0, N),
+                       "rolling_var": fd.rolling_var(self.Factor0, N), "rolling_sum": fd.rolling_sum(self.Factor0, N)}
+        TargetData = {"rolling_mean": self.Data0.rolling(N, min_periods=1).mean(), "rolling_std": self.Data0.rolling(N, min_periods=1).std(ddof=1), "rolling_max": self.Data0.rolling(N, min_periods=1).max(),
+                      "rolling_var": self.Data0.rolling(N, min_periods=1).var(ddof=1), "rolling_sum": self.Data0.rolling(N, min_periods=1).sum()}
+        for iName, iFactor in TestFactors.items():
+            iFactor["流式计算"] = True
+            iFactor.start(self.DTs)
+            for jStartInd, jEndInd in [(0, 10), (8, 20), (20, 30)]:
+                jDTs = self.DTs[jStartInd:jEndInd]
+                TestData = iFactor.readData(ids=self.IDs, dts=jDTs, dt_ruler=self.DTs)
+                Err = (TestData - TargetData[iName].loc[jDTs]).abs()
+                self.assertAlmostEqual(Err.max().max(), 0, msg=iName)
+            iFactor.end()
+        # 扩张窗口和指数加权的结果依赖于读取的起始时点, 打开流式计算后结果也不能依赖于之前的调用
+        for iName, iFactor in {"expanding_var": fd.expanding_var(self.Factor0), "ewm_mean": fd.ewm_mean(self.Factor0, span=N)}.items():
+            TargetData = iFactor.readData(ids=self.IDs, dts=self.DTs[8:20], dt_ruler=self.DTs)
+            iFactor["流式计算"] = True
+            iFactor.start(self.DTs)
+            iFactor.readData(ids=self.IDs, dts=self.DTs[0:10], dt_ruler=self.DTs)
+            TestData = iFactor.readData(ids=self.IDs, dts=self.DTs[8:20], dt_ruler=self.DTs)
+            iFactor.end()
+            Err = (TestData - TargetData).abs()
+            self.assertAlmostEqual(Err.max().max(), 0, msg=iName)
+            self.assertTrue((pd.isnull(TestData)==pd.isnull(TargetData)).all().all(), msg=iName)
+    # 测试滚动协方差和相关系数, 包含缺失值和常数窗口
+    def test_9_RollingCovCorr(self):
+        N = 5# 移动窗口长度
+        Data0, Data1 = self.Data0.copy(), self.Data1.copy()
+        Data0.iloc[3:6, 2] = np.nan
+        Data1.iloc[10, :5] = np.nan
+        Data0.iloc[12:20, 4] = 3.3
+        Data1.iloc[15:, 6] = 1e3 + 0.1
+        Factor0, Factor1 = DataFactor(name="Factor0", data=Data0), DataFactor(name="Factor1", data=Data1)
+        CovTarget = Data0.rolling(N, min_periods=3).cov(Data1)
+        CorrTarget = Data0.rolling(N, min_periods=3).corr(Data1)
+        # 常数窗口的协方差为 0, 相关系数为 nan
+        CovTarget.iloc[16:20, 4] = CovTarget.iloc[19:, 6] = 0
+        CorrTarget.iloc[16:20, 4] = CorrTarget.iloc[19:, 6] = np.nan
+        for iName, iFun, iTargetData in [("cov", fd.rolling_cov, CovTarget), ("corr", fd.rolling_corr, CorrTarget)]:
+            for iStreaming in (False, True):
+                iFactor = iFun(Factor0, Factor1, N, min_periods=3)
+                iFactor["流式计算"] = iStreaming
+                iFactor.start(self.DTs)
+                TestData = pd.concat([iFactor.readData(ids=self.IDs, dts=self.DTs[jStartInd:jEndInd], dt_ruler=self.DTs) for jStartInd, jEndInd in [(0, 10), (10, 20), (20, 30)]])
+                iFactor.end()
+                Err = (TestData - iTargetData).abs()
+                self.assertAlmostEqual(Err.max().max(), 0, msg=str((iName, iStreaming)))
+                self.assertTrue((pd.isnull(TestData)==pd.isnull(iTargetData)).all().all(), msg=str((iName, iStreaming)))
+    # 测试分组聚合运算
+    def test_10_AggregateByCategory(self):
+        CatData = pd.DataFrame(np.random.choice(np.array(["A", "B", "C"], dtype="O"), size=self.Data0.shape), index=self.DTs, columns=self.IDs)
+        CatFactor = DataFactor(name="CatFactor", data=CatData)
+        Data, Cat = self.Data0.stack(), CatData.stack()
+        Groups = [Data.index.get_level_values(0), Cat.values]
+        # 输出截面和描述子截面相同
+        for iFun, iName in [(fd.aggr_median, "median"), (fd.aggr_std, "std"), (fd.aggr_max, "max")]:
+            TargetData = Data.groupby(Groups).transform(iName).unstack()
+            TestData = iFun(self.Factor0, cat_data=CatFactor).readData(ids=self.IDs, dts=self.DTs)
+            Err = (TestData - TargetData).abs()
+            self.assertAlmostEqual(Err.max().max(), 0, msg=iName)
+        # 输出截面为类别
+        TargetData = Data.groupby(Groups).sum().unstack()
+        TestData = fd.aggr_sum(self.Factor0, cat_data=CatFactor, descriptor_ids=self.IDs).readData(ids=["A", "B", "C"], dts=self.DTs)
+        Err = (TestData - TargetData.loc[:, ["A", "B", "C"]].fillna(0)).abs()
+        self.assertAlmostEqual(Err.max().max(), 0)
+    # 测试衍生因子的确定性命名
+    def test_11_FactorSignature(self):
+        MA1, MA2, MA3 = fd.rolling_mean(self.Factor0, 3), fd.rolling_mean(self.Factor0, 3), fd.rolling_mean(self.Factor0, 5)
+        self.assertEqual(MA1.Name, MA2.Name)
+        self.assertNotEqual(MA1.Name, MA3.Name)
+        self.assertEqual(fd.rolling_mean(self.Factor0, 3, factor_name="MA").Name, "MA")
+        self.assertEqual((MA1 + self.Factor1).Name, "")
+        self.assertEqual((MA1 + self.Factor1).Signature, (MA2 + self.Factor1).Signature)
+        self.assertNotEqual((MA1 + 1).Signature, (MA1 + 2).Signature)
+        Factor = DataFactor(name="Factor0", data=self.Data0.copy())
+        self.assertEqual(fd.rolling_mean(Factor, 3).Name, MA1.Name)
+        # 同名函数的签名由代码和引用的全局变量的值决定
+        Code = "def TestFun(f, idt, iid, x, args):\n    return x[0] * Scale\n"
+        Sigs = []
+        for iScale, iCode in [(1, Code), (1, Code), (2, Code), (1, Code.replace("*", "+"))]:
+            iNamespace = {"__name__": "__main__", "Scale": iScale}
+            exec(iCode, iNamespace)
+            Sigs.append(PointOperation(None, [self.Factor0], {"算子": iNamespace["TestFun"], "运算时点": "多时点", "运算ID": "多ID"}).Signature)
+        self.assertEqual(Sigs[0], Sigs[1])
+        self.assertEqual(len(set(Sigs[1:])), 3)
+        # 引用了无法确定签名的全局变量时, 函数没有签名, 因子以随机名字命名
+        Factors = []
+        for iK in (1, 2):
+            iNamespace = {"__name__": "__main__"}
+            exec("class Model(object):\n    def __init__(self, k):\n        self.k = k\nM = Model(%d)\ndef TestFun(f, idt, iid, x, args):\n    return x[0] * M.k\n" % iK, iNamespace)
+            Factors.append(PointOperation(None, [self.Factor0], {"算子": iNamespace["TestFun"], "运算时点": "多时点", "运算ID": "多ID"}))
+        self.assertIsNone(Factors[0].Signature)
+        self.assertNotEqual(Factors[0].Name, Factors[1].Name)
+        # 共享子表达式的签名只生成一次, 构造因子时不生成签名
+        Factor = self.Factor0
+        for i in range(40): Factor = fd.rolling_cov(Factor, Factor, 2)
+        self.assertEqual(len(Factor.Name), 40)
+    # 测试滚动回归, 结果应该和逐窗口的加权最小二乘回归一致, 包含缺失值
+    def test_12_RollingRegress(self):
+        N = 8# 移动窗口长度
+        YData, X0Data = self.Data0.copy(), self.Data1.copy()
+        X1Data = pd.DataFrame(np.random.RandomState(1).randn(*YData.shape), index=self.DTs, columns=self.IDs)
+        YData.iloc[3:5, 2] = np.nan
+        X0Data.iloc[10, :5] = np.nan
+        Y, X0, X1 = DataFactor(name="Y", data=YData), DataFactor(name="X0", data=X0Data), DataFactor(name="X1", data=X1Data)
+        DTs = self.DTs[N-1:]
+        for iConstant, iHalfLife in [(True, np.inf), (False, np.inf), (True, 5)]:
+            TestData = fd.rolling_regress(Y, X0, X1, window=N, constant=iConstant, half_life=iHalfLife).readData(ids=self.IDs, dts=DTs, dt_ruler=self.DTs)
+            Weight = (0.5**(1/iHalfLife))**np.arange(N)
+            Weight = Weight[::-1]/np.sum(Weight)
+            for i, iDT in enumerate(DTs):
+                for jID in self.IDs:
+                    iX = np.c_[X0Data[jID].values[i:i+N], X1Data[jID].values[i:i+N]]
+                    if iConstant: iX = sm.add_constant(iX, has_constant="add")
+                    ijRslt = sm.WLS(YData[jID].values[i:i+N], iX, weights=Weight, missing="drop").fit()
+                    TargetData = np.r_[ijRslt.params, ijRslt.tvalues, ijRslt.fvalue, ijRslt.rsquared, ijRslt.rsquared_adj]
+                    self.assertTrue(np.allclose(np.array(TestData.loc[iDT, jID], dtype="float"), TargetData, rtol=1e-8, atol=1e-10), msg=str((iConstant, iHalfLife, iDT, jID)))
+    # 测试量级很大的数据的滚动标准差和方差, 窗口内数据相同时结果严格为 0
+    def test_13_RollingStdPrecision(self):
+        N = 5# 移动窗口长度
+        Data = self.Data0 + 1e8
+        Data.iloc[5:15, 0] = 1e8 + 0.1
+        Data.iloc[7, 1] = np.nan
+        iFactor = DataFactor(name="Factor0", data=Data)
+        for iFun, iNumpyFun in [(fd.rolling_std, np.nanstd), (fd.rolling_var, np.nanvar)]:
+            TargetData = Data.rolling(N, min_periods=2).apply(lambda x: iNumpyFun(x, ddof=1), raw=True)
+            for iStreaming in (False, True):
+                jFactor = iFun(iFactor, N, min_periods=2)
+                jFactor["流式计算"] = iStreaming
+                jFactor.start(self.DTs)
+                TestData = pd.concat([jFactor.readData(ids=self.IDs, dts=self.DTs[jStartInd:jEndInd], dt_ruler=self.DTs) for jStartInd, jEndInd in [(0, 10), (10, 20), (20, 30)]])
+                jFactor.end()
+                self.assertTrue((pd.isnull(TestData)==pd.isnull(TargetData)).all().all(), msg=str((iFun, iStreaming)))
+                self.assertTrue(np.allclose(TestData.values.astype("float"), TargetData.values, rtol=1e-8, atol=1e-6, equal_nan=True), msg=str((iFun, iStreaming)))
+                if iStreaming: self.assertTrue((TestData.iloc[9:15, 0]==0).all(), msg=str(iFun))
 
 if __name__=="__main__":
     unittest.main()
\ No newline at end of file
@@ -7,8 +7,19 @@ import unittest
 import numpy as np
 import pandas as pd
 
-from QuantStudio.FactorDataBase.FactorDB import CustomFT, DataFactor
+from QuantStudio import __QS_Error__
+from QuantStudio.FactorDataBase.FactorDB import CustomFT, DataFactor, Factorize, FactorResultCache
+from QuantStudio.FactorDataBase.FactorOperation import PointOperation, TimeOperation
 from QuantStudio.FactorDataBase.HDF5DB import HDF5DB
+from QuantStudio.FactorDataBase import FactorTools as fd
+
+# 迭代型时间序列运算: 累加
+def TestCumSumFun(f, idt, iid, x, args):
+    if x[0].shape[0]==0: return x[1][-1]
+    return x[0][-1] + x[1][-1]
+# 迭代型时间序列运算: 自身为扩张窗口, 累加自身所有的历史值
+def TestExpandingSumFun(f, idt, iid, x, args):
+    return np.nansum(x[0], axis=0) + x[1][-1]
 
 class TestFactorTable(unittest.TestCase):
     @classmethod
@@ -58,6 +69,174 @@ class TestFactorTable(unittest.TestCase):
             Err = (TestData.loc[iFactorName] - TargetData.loc[iFactorName]).abs()
             self.assertAlmostEqual(Err.max().max(), 0)
         FDB.disconnect()
+    # 测试遍历计算的缓冲淘汰策略
+    def test_4_ErgodicCachePolicy(self):
+        TargetData = self.Data1.mean(axis=1) - self.Data0.mean(axis=1)
+        self.CFT["遍历模式"]["向前缓冲时点数"] = 3
+        self.CFT["遍历模式"]["最大缓冲因子数"] = 1
+        for iPolicy in ("LFU", "LRU", "ARC"):
+            self.CFT["遍历模式"]["缓冲淘汰策略"] = iPolicy
+            TestData = pd.Series(np.nan, index=self.DTs)
+            self.CFT.start(self.DTs)
+            for iDT in self.DTs:
+                self.CFT.move(iDT)
+                iData = self.CFT.readData(factor_names=self.FactorNames, ids=self.IDs, dts=[iDT]).iloc[:, 0, :]
+                TestData.loc[iDT] = iData.mean(axis=0).diff().iloc[1]
+            self.CFT.end()
+            Err = (TestData - TargetData).abs()
+            self.assertAlmostEqual(Err.max(), 0)
+            Stat = self.CFT["遍历模式"].getCacheStatistics()
+            self.assertEqual(Stat["命中次数"]+Stat["未命中次数"], len(self.FactorNames)*len(self.DTs))
+        self.CFT["遍历模式"]["最大缓冲因子数"] = 60
+        self.CFT["遍历模式"]["缓冲淘汰策略"] = "LFU"
+    # 测试批量计算的公共子表达式合并
+    def test_5_CommonSubexpression(self):
+        TargetData = {"MA": self.Data0.rolling(3, min_periods=1).mean()}
+        TargetData["Diff"] = TargetData["MA"] - self.Data1
+        MA = fd.rolling_mean(self.Factor0, 3, factor_name="MA")
+        Diff = Factorize(fd.rolling_mean(self.Factor0, 3) - self.Factor1, factor_name="Diff")
+        DiffDescriptors = list(Diff.Descriptors)
+        CFT = CustomFT(name="TestCSE")
+        CFT.addFactors(factor_list=[MA, Diff])
+        CFT.setID(self.IDs)
+        CFT.setDateTime(self.DTs)
+        TempDir = tempfile.TemporaryDirectory()
+        FDB = HDF5DB(sys_args={"主目录": TempDir.name})
+        FDB.connect()
+        CFT.write2FDB(["MA", "Diff"], self.IDs, self.DTs, FDB, CFT.Name, if_exists="update", subprocess_num=0)
+        self.assertEqual(sum(isinstance(iFactor, TimeOperation) for iFactor in CFT.OperationMode._FactorDict.values()), 1)
+        # 合并只作用于本次运算, 用户的因子对象保持不变
+        self.assertTrue(all((iDescriptor is jDescriptor) for iDescriptor, jDescriptor in zip(Diff.Descriptors, DiffDescriptors)))
+        TestData = FDB.getTable(CFT.Name).readData(factor_names=["MA", "Diff"], ids=self.IDs, dts=self.DTs)
+        for iFactorName in TargetData:
+            Err = (TestData.loc[iFactorName] - TargetData[iFactorName]).abs()
+            self.assertAlmostEqual(Err.max().max(), 0)
+        FDB.disconnect()
+    # 测试批量计算的增量模式
+    def test_6_IncrementalCalc(self):
+        TargetData = {"CumSum": self.Data0.cumsum(), "MA": self.Data0.rolling(3, min_periods=1).mean()}
+        CumSum = TimeOperation(name="CumSum", descriptors=[self.Factor0], sys_args={"算子":TestCumSumFun, "回溯期数":[0], "自身回溯期数":1, "运算时点":"单时点", "运算ID":"多ID"})
+        MA = fd.rolling_mean(self.Factor0, 3, factor_name="MA")
+        CFT = CustomFT(name="TestIncremental")
+        CFT.addFactors(factor_list=[CumSum, MA])
+        CFT.setID(self.IDs)
+        CFT.setDateTime(self.DTs)
+        TempDir = tempfile.TemporaryDirectory()
+        FDB = HDF5DB(sys_args={"主目录": TempDir.name})
+        FDB.connect()
+        CFT.write2FDB(["CumSum", "MA"], self.IDs, self.DTs[:6], FDB, CFT.Name, if_exists="update", subprocess_num=0)
+        CFT.write2FDB(["CumSum", "MA"], self.IDs, self.DTs, FDB, CFT.Name, if_exists="update", subprocess_num=0, incremental=True)
+        self.assertIsNone(CumSum.iInitData)
+        TestData = FDB.getTable(CFT.Name).readData(factor_names=["CumSum", "MA"], ids=self.IDs, dts=self.DTs)
+        for iFactorName in TargetData:
+            Err = (TestData.loc[iFactorName] - TargetData[iFactorName]).abs()
+            self.assertAlmostEqual(Err.max().max(), 0)
+        FDB.disconnect()
+    # 测试批量计算的调度顺序, 描述子先于其衍生因子, 需要多进程同步的截面运算在其他可计算的因子之后调度
+    def test_7_OperationSchedule(self):
+        MA = fd.rolling_mean(self.Factor0, 3, factor_name="MA")
+        Diff = Factorize(MA - fd.rolling_mean(self.Factor1, 5), factor_name="Diff")
+        ZScore = fd.standardizeZScore(self.Factor1, factor_name="ZScore")
+        Combo = Factorize(ZScore + MA, factor_name="Combo")
+        CFT = CustomFT(name="TestSchedule")
+        CFT.addFactors(factor_list=[Combo, Diff, MA, ZScore])
+        CFT.setID(self.IDs)
+        CFT.setDateTime(self.DTs)
+        CFT.OperationMode.SubProcessNum = 2
+        CFT.OperationMode.DTRuler = self.DTs
+        CFT.OperationMode.SectionIDs = None
+        CFT.OperationMode.FactorNames = ["Combo", "Diff", "MA", "ZScore"]
+        CFT.OperationMode.DateTimes = self.DTs
+        CFT.OperationMode.IDs = self.IDs
+        CFT._initOperation()
+        self.assertIn("ZScore", CFT.OperationMode._Event)
+        Schedule = [id(iFactor) for iFactor in CFT._genOperationSchedule()]
+        self.assertEqual(len(Schedule), len(CFT.OperationMode._FactorDict))
+        for iFactor in CFT.OperationMode._FactorDict.values():
+            for jDescriptor in iFactor.Descriptors:
+                self.assertLess(Schedule.index(id(jDescriptor)), Schedule.index(id(iFactor)))
+        # 不依赖于截面运算的因子都先于截面运算调度
+        SectionInd = Schedule.index(id(CFT.OperationMode._FactorDict["ZScore"]))
+        for iFactorName, iFactor in CFT.OperationMode._FactorDict.items():
+            if iFactorName not in ("ZScore", "Combo"): self.assertLess(Schedule.index(id(iFactor)), SectionInd)
+        CFT._exit()
+    # 测试衍生因子的结果缓存
+    def test_8_ResultCache(self):
+        TargetData = self.Data0.rolling(3, min_periods=1).mean()
+        CacheDir = tempfile.TemporaryDirectory()
+        Cache = FactorResultCache(sys_args={"缓存目录": CacheDir.name})
+        MA = fd.rolling_mean(self.Factor0, 3, factor_name="MA")
+        MA.ResultCache = Cache
+        TestData = MA.readData(ids=self.IDs, dts=self.DTs)
+        self.assertAlmostEqual((TestData - TargetData).abs().max().max(), 0)
+        CacheFiles = os.listdir(CacheDir.name)
+        self.assertEqual(len(CacheFiles), 1)
+        # 篡改缓存数据, 相同签名的因子应该直接读取缓存
+        np.save(CacheDir.name+os.sep+CacheFiles[0], np.zeros(TargetData.shape))
+        MA = fd.rolling_mean(self.Factor0, 3, factor_name="MA")
+        MA.ResultCache = Cache
+        self.assertAlmostEqual(MA.readData(ids=self.IDs, dts=self.DTs).abs().max().max(), 0)
+        # 同名算子的代码改变后缓存失效
+        for iCode, iTargetData in [("x[0] * 2", self.Data0 * 2), ("x[0] * 3", self.Data0 * 3)]:
+            iNamespace = {"__name__": "__main__"}
+            exec("def TestScaleFun(f, idt, iid, x, args):\n    return %s\n" % iCode, iNamespace)
+            iFactor = PointOperation("Scale", [self.Factor0], {"算子": iNamespace["TestScaleFun"], "运算时点": "多时点", "运算ID": "多ID"})
+            iFactor.ResultCache = Cache
+            self.assertAlmostEqual((iFactor.readData(ids=self.IDs, dts=self.DTs) - iTargetData).abs().max().max(), 0, msg=iCode)
+        # 同名算子引用了无法确定签名的全局变量时不使用缓存
+        for iK in (1, 2):
+            iNamespace = {"__name__": "__main__"}
+            exec("class Model(object):\n    def __init__(self, k):\n        self.k = k\nM = Model(%d)\ndef TestScaleFun(f, idt, iid, x, args):\n    return x[0] * M.k\n" % iK, iNamespace)
+            iFactor = PointOperation("Scale", [self.Factor0], {"算子": iNamespace["TestScaleFun"], "运算时点": "多时点", "运算ID": "多ID"})
+            iFactor.ResultCache = Cache
+            self.assertIsNone(iFactor.Signature)
+            iCacheFiles = sorted(os.listdir(CacheDir.name))
+            self.assertAlmostEqual((iFactor.readData(ids=self.IDs, dts=self.DTs) - self.Data0 * iK).abs().max().max(), 0, msg=str(iK))
+            self.assertEqual(sorted(os.listdir(CacheDir.name)), iCacheFiles)
+        # 运算模式
+        Cache.clear()
+        CFT = CustomFT(name="TestResultCache")
+        CFT.addFactors(factor_list=[fd.rolling_mean(self.Factor0, 3, factor_name="MA")])
+        CFT.setID(self.IDs)
+        CFT.setDateTime(self.DTs)
+        TempDir = tempfile.TemporaryDirectory()
+        FDB = HDF5DB(sys_args={"主目录": TempDir.name})
+        FDB.connect()
+        CFT.write2FDB(["MA"], self.IDs, self.DTs, FDB, CFT.Name, if_exists="update", subprocess_num=0, result_cache=Cache)
+        CacheFiles = os.listdir(CacheDir.name)
+        self.assertEqual(len(CacheFiles), 1)
+        np.save(CacheDir.name+os.sep+CacheFiles[0], np.zeros(TargetData.shape))
+        CFT.write2FDB(["MA"], self.IDs, self.DTs, FDB, CFT.Name, if_exists="update", subprocess_num=0, result_cache=Cache)
+        TestData = FDB.getTable(CFT.Name).readData(factor_names=["MA"], ids=self.IDs, dts=self.DTs).iloc[0]
+        self.assertAlmostEqual(TestData.abs().max().max(), 0)
+        FDB.disconnect()
+    # 测试增量模式下自身为扩张窗口的迭代型运算, 结果应该和全部重新计算一致
+    def test_9_IncrementalExpanding(self):
+        TargetData = np.zeros(self.Data0.shape)
+        for i in range(TargetData.shape[0]): TargetData[i] = TargetData[:i].sum(axis=0) + self.Data0.values[i]
+        TargetData = pd.DataFrame(TargetData, index=self.DTs, columns=self.IDs)
+        ExpandingSum = TimeOperation(name="ExpandingSum", descriptors=[self.Factor0], sys_args={"算子":TestExpandingSumFun, "回溯期数":[0], "自身回溯期数":0, "自身回溯模式":"扩张窗口", "运算时点":"单时点", "运算ID":"多ID"})
+        CFT = CustomFT(name="TestIncrementalExpanding")
+        CFT.addFactors(factor_list=[ExpandingSum])
+        CFT.setID(self.IDs)
+        CFT.setDateTime(self.DTs)
+        TempDir = tempfile.TemporaryDirectory()
+        FDB = HDF5DB(sys_args={"主目录": TempDir.name})
+        FDB.connect()
+        CFT.write2FDB(["ExpandingSum"], self.IDs, self.DTs[:6], FDB, CFT.Name, if_exists="update", subprocess_num=0)
+        CFT.write2FDB(["ExpandingSum"], self.IDs, self.DTs, FDB, CFT.Name, if_exists="update", subprocess_num=0, incremental=True)
+        self.assertIsNone(ExpandingSum.iInitData)
+        TestData = FDB.getTable(CFT.Name).readData(factor_names=["ExpandingSum"], ids=self.IDs, dts=self.DTs).iloc[0]
+        self.assertAlmostEqual((TestData - TargetData).abs().max().max(), 0)
+        # 迭代型运算作为中间因子时无法增量计算
+        CFT = CustomFT(name="TestIncrementalIntermediate")
+        CFT.addFactors(factor_list=[Factorize(ExpandingSum * 2, factor_name="Double")])
+        CFT.setID(self.IDs)
+        CFT.setDateTime(self.DTs)
+        CFT.write2FDB(["Double"], self.IDs, self.DTs[:6], FDB, CFT.Name, if_exists="update", subprocess_num=0)
+        with self.assertRaises(__QS_Error__):
+            CFT.write2FDB(["Double"], self.IDs, self.DTs, FDB, CFT.Name, if_exists="update", subprocess_num=0, incremental=True)
+        FDB.disconnect()
 
 if __name__=="__main__":
     unittest.main()
\ No newline at end of file
@@ -7,6 +7,7 @@ import unittest
 import numpy as np
 import pandas as pd
 
+from QuantStudio.FactorDataBase.FactorDB import _readCacheData
 from QuantStudio.FactorDataBase.HDF5DB import HDF5DB
 
 class TestHDF5DB(unittest.TestCase):
@@ -71,6 +72,21 @@ class TestHDF5DB(unittest.TestCase):
         self.FDB.deleteTable(table_name=self.TargetTable)
         self.assertListEqual(self.FDB.TableNames, [])
         #self.assertTrue(self.TargetTable not in os.listdir(self.TempDir.name))
+    # 测试共享缓冲服务, 窗口重叠的读取只读取缺失的时点, 结果应该和直接读取一致
+    def test_5_CacheServer(self):
+        Data = pd.Panel(np.random.randn(2, len(self.DTs), len(self.IDs)), items=["Factor0", "Factor1"], major_axis=self.DTs, minor_axis=self.IDs)
+        self.FDB.writeData(Data, "TestCacheServer")
+        FT = self.FDB.getTable("TestCacheServer")
+        self.FDB.startCacheServer(cache_size=16)
+        try:
+            for iDTs in [self.DTs[0:3], self.DTs[1:4], self.DTs[1:3]]:
+                TestData = _readCacheData(FT, ["Factor0", "Factor1"], self.IDs, iDTs)
+                self.assertTrue(np.allclose(TestData.values, Data.loc[:, iDTs, self.IDs].values))
+            Statistics = self.FDB.getCacheServerStatistics()
+            self.assertEqual(Statistics["读取次数"], 6)
+            self.assertEqual(Statistics["命中次数"], 2)
+        finally:
+            self.FDB.stopCacheServer()
 
 if __name__=="__main__":
     unittest.main()
\ No newline at end of file
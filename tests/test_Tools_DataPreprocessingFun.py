@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+import unittest
+
+import numpy as np
+import pandas as pd
+
+import QuantStudio.Tools.DataPreprocessingFun as DPF
+
+class TestDataPreprocessingFun(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        nDT, nID = 20, 50
+        np.random.seed(0)
+        TestDataPreprocessingFun.Data = np.random.randn(nDT, nID)
+        TestDataPreprocessingFun.Data[np.random.rand(nDT, nID)<0.1] = np.nan
+        TestDataPreprocessingFun.Mask = (np.random.rand(nDT, nID)<0.9)
+        TestDataPreprocessingFun.CatData = np.random.choice(np.array(["银行", "医药", "计算机", None], dtype="O"), size=(nDT, nID))
+        TestDataPreprocessingFun.Weight = np.random.rand(nDT, nID)
+    def assertArrayAlmostEqual(self, test_data, target_data):
+        self.assertTrue((pd.isnull(test_data)==pd.isnull(target_data)).all())
+        Err = np.abs(test_data - target_data)
+        self.assertAlmostEqual(np.nanmax(Err), 0)
+    # 测试面板数据的 Z-Score 标准化, 结果应该和逐时点计算一致
+    def test_1_standardizeZScorePanel(self):
+        for iArgs in ({}, {"avg_statistics":"中位数", "dispersion_statistics":"MAD", "other_handle":"保持不变"}):
+            TargetData = np.array([DPF.standardizeZScore(self.Data[i], mask=self.Mask[i], cat_data=self.CatData[i].copy(), avg_weight=self.Weight[i], **iArgs) for i in range(self.Data.shape[0])])
+            TestData = DPF.standardizeZScorePanel(self.Data, mask=self.Mask, cat_data=self.CatData, avg_weight=self.Weight, **iArgs)
+            self.assertArrayAlmostEqual(TestData, TargetData)
+    # 测试面板数据的 Rank 标准化和分位数变换标准化, 结果应该和逐时点计算一致
+    def test_2_standardizeRankPanel(self):
+        TargetData = np.array([DPF.standardizeRank(self.Data[i], mask=self.Mask[i], cat_data=self.CatData[i].copy(), ascending=False) for i in range(self.Data.shape[0])])
+        TestData = DPF.standardizeRankPanel(self.Data, mask=self.Mask, cat_data=self.CatData, ascending=False)
+        self.assertArrayAlmostEqual(TestData, TargetData)
+        TargetData = np.array([DPF.standardizeQuantile(self.Data[i], mask=self.Mask[i], other_handle="保持不变") for i in range(self.Data.shape[0])])
+        TestData = DPF.standardizeQuantilePanel(self.Data, mask=self.Mask, other_handle="保持不变")
+        self.assertArrayAlmostEqual(TestData, TargetData)
+    # 测试面板数据的异常值处理, 结果应该和逐时点计算一致
+    def test_3_winsorizePanel(self):
+        for iArgs in ({}, {"method":"丢弃", "other_handle":"保持不变"}, {"method":"变换", "avg_statistics":"中位数", "dispersion_statistics":"MAD", "std_multiplier":1}):
+            TargetData = np.array([DPF.winsorize(self.Data[i], mask=self.Mask[i], cat_data=self.CatData[i].copy(), **iArgs) for i in range(self.Data.shape[0])])
+            TestData = DPF.winsorizePanel(self.Data, mask=self.Mask, cat_data=self.CatData, **iArgs)
+            self.assertArrayAlmostEqual(TestData, TargetData)
+    # 测试面板数据的缺失值填充, 结果应该和逐时点计算一致
+    def test_4_fillNaNPanel(self):
+        TargetData = np.array([DPF.fillNaNByFun(self.Data[i], mask=self.Mask[i], cat_data=self.CatData[i].copy(), val_fun=(lambda x,n:np.zeros(n)+np.nanmedian(x))) for i in range(self.Data.shape[0])])
+        TestData = DPF.fillNaNByFunPanel(self.Data, mask=self.Mask, cat_data=self.CatData, val_fun="中位数")
+        self.assertArrayAlmostEqual(TestData, TargetData)
+        DTs = pd.date_range("2018-01-01", periods=self.Data.shape[0]).values
+        TargetData = pd.DataFrame(self.Data, index=DTs).fillna(method="pad", limit=2).values
+        TestData = DPF.fillNaByLookback(self.Data, lookback=2*24*3600, dts=DTs)
+        self.assertArrayAlmostEqual(TestData, TargetData)
+    # 测试面板数据的正交化, 结果应该和逐时点计算一致
+    def test_5_orthogonalizePanel(self):
+        X = np.random.randn(*(self.Data.shape+(2,)))
+        TargetData = np.array([DPF.orthogonalize(self.Data[i], X[i], mask=self.Mask[i], constant=True, dummy_data=self.CatData[i].copy()) for i in range(self.Data.shape[0])])
+        TestData = DPF.orthogonalizePanel(self.Data, X, mask=self.Mask, constant=True, dummy_data=self.CatData)
+        self.assertArrayAlmostEqual(TestData, TargetData)
+        # 分块计算的结果应该和不分块一致
+        TestData = DPF.orthogonalizePanel(self.Data, X, mask=self.Mask, constant=True, dummy_data=self.CatData, block_size=1)
+        self.assertArrayAlmostEqual(TestData, TargetData)
+
+if __name__=="__main__":
+    unittest.main()